@@ -1,9 +1,161 @@
-from django.contrib import admin
+"""Admin of the music app, made to stay usable with millions of performers:
+    - the changelists never count the whole table: the paginator reads the denormalized counters
+      (music/counters.py) for the unfiltered list and counts at most COUNT_LIMIT rows of a filtered one,
+      and show_full_result_count is off (it would add a COUNT(*) of the whole table to every filtered page)
+    - the festival of every performer row is joined in (list_select_related), instead of one query per row
+    - the festival of a performer is chosen with an autocomplete widget (autocomplete_fields),
+      instead of a dropdown with every festival in it
+    - the searches go through the full-text index (music/search.py), not LIKE '%...%' scans
+    - the lists are ordered by indexed columns (name and id, start and id)
+    - the bulk actions are single UPDATE statements (music/bulk.py), however many performers are selected
+    - deleting festivals detaches their performers with one UPDATE (music/bulk.py), and the confirmation page
+      shows how many performers are affected instead of listing them
+"""
 
-# Register your models here.
-# Each model should be registered using: admin.site.register(<Model>)
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.template.response import TemplateResponse
+from django.utils.functional import cached_property
 
-from music.models import Performer, Festival
+from music import bulk, counters, search
+from music.models import FestivalLineupStats, Performer, Festival
 
-admin.site.register(Performer)
-admin.site.register(Festival)
+
+COUNT_LIMIT = 10000
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that does not count all the rows of a large table:
+        - without filters, the count is read from the model's counter (one SELECT by primary key)
+        - with filters (a search, list_filter), at most COUNT_LIMIT rows are counted
+          (SELECT COUNT(*) FROM (SELECT ... LIMIT COUNT_LIMIT)), so the last pages of a huge filtered list
+          are not reachable by page number; narrow the filters instead
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        query = queryset.query
+        if queryset.model in counters.COUNTED_MODELS and not query.where and not query.distinct:
+            return counters.get_counts([queryset.model])[queryset.model]
+        return queryset.order_by()[:COUNT_LIMIT].count()
+
+
+class ScalableModelAdmin(admin.ModelAdmin):
+    """ModelAdmin with the changelist settings above; subclasses set search_fields (required by
+    autocomplete_fields of other admins, but the search itself uses the full-text index).
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return search.filter_queryset(queryset, search_term), False
+
+
+class FestivalChoiceForm(forms.Form):
+    """The intermediate form of the 'reassign festival' action."""
+
+    festival = forms.ModelChoiceField(
+        queryset=Festival.objects.all(), required=False,
+        help_text='Leave empty to remove the performers from their festival.',
+        widget=AutocompleteSelect(Performer._meta.get_field('festival'), admin.site))
+
+
+@admin.register(Festival)
+class FestivalAdmin(ScalableModelAdmin):
+    list_display = ('name', 'start', 'end', 'location', 'lineup_size')
+    # The lineup size comes from the precomputed statistics (music/stats.py), joined in
+    list_select_related = ('lineup_stats',)
+    search_fields = ('name', 'location')
+    ordering = ('-start', '-id')
+
+    @admin.display(description='lineup')
+    def lineup_size(self, festival):
+        stats = getattr(festival, 'lineup_stats', None)
+        return stats.n_performers if stats else 0
+
+    def get_deleted_objects(self, objs, request):
+        """The summary of the delete confirmation page, without collecting the related rows
+        (see the module docstring). The permissions are still checked like Django does: the delete permission
+        of the registered models whose rows are deleted along (the lineup statistics), and the change permission
+        of the performers that are detached.
+        """
+
+        festivals = list(objs)
+        detached = sum(bulk.lineup_counts(festival)['performers'] for festival in festivals)
+        model_count = {'festivals': len(festivals), 'performers left without a festival': detached}
+        required = [(FestivalLineupStats, 'has_delete_permission')]
+        if detached:
+            required.append((Performer, 'has_change_permission'))
+        perms_needed = {model._meta.verbose_name for model, permission in required
+                        if self.admin_site.is_registered(model)
+                        and not getattr(self.admin_site._registry[model], permission)(request)}
+        return [str(festival) for festival in festivals], model_count, perms_needed, []
+
+    def delete_model(self, request, obj):
+        bulk.delete_festival(obj)
+
+    def delete_queryset(self, request, queryset):
+        bulk.delete_festivals(queryset)
+
+
+@admin.register(Performer)
+class PerformerAdmin(ScalableModelAdmin):
+    list_display = ('name', 'is_band', 'festival')
+    list_select_related = ('festival',)
+    list_filter = ('is_band',)
+    search_fields = ('name',)
+    ordering = ('name', 'id')
+    autocomplete_fields = ('festival',)
+    readonly_fields = ('updated_at',)
+    actions = ['reassign_festival', 'toggle_band', 'mark_as_band', 'mark_as_musician']
+
+    @admin.action(description='Reassign the selected performers to another festival')
+    def reassign_festival(self, request, queryset):
+        """Asks for the festival first (on an intermediate page, like the delete confirmation),
+        then moves the performers with one UPDATE.
+        """
+
+        form = FestivalChoiceForm(request.POST if 'apply' in request.POST else None)
+        selected = request.POST.getlist(helpers.ACTION_CHECKBOX_NAME)
+        select_across = request.POST.get('select_across', '0')
+        if form.is_valid():
+            festival = form.cleaned_data['festival']
+            updated = bulk.set_festival(queryset, festival.pk if festival else None)
+            target = festival.name if festival else 'no festival'
+            self.message_user(request, f'{updated} performers moved to {target}.', messages.SUCCESS)
+            return None
+        return TemplateResponse(request, 'admin/music/performer/reassign_festival.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Reassign festival',
+            'opts': self.model._meta,
+            'form': form,
+            'media': self.media + form.media,
+            'selected': selected,
+            'selected_count': (EstimatedCountPaginator(queryset, self.list_per_page).count
+                               if select_across == '1' else len(selected)),
+            'select_across': select_across,
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        })
+
+    @admin.action(description='Toggle band/solo musician of the selected performers')
+    def toggle_band(self, request, queryset):
+        updated = bulk.toggle_band(queryset)
+        self.message_user(request, f'{updated} performers toggled.', messages.SUCCESS)
+
+    @admin.action(description='Mark the selected performers as bands')
+    def mark_as_band(self, request, queryset):
+        updated = bulk.set_band(queryset, True)
+        self.message_user(request, f'{updated} performers marked as bands.', messages.SUCCESS)
+
+    @admin.action(description='Mark the selected performers as solo musicians')
+    def mark_as_musician(self, request, queryset):
+        updated = bulk.set_band(queryset, False)
+        self.message_user(request, f'{updated} performers marked as solo musicians.', messages.SUCCESS)
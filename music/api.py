@@ -0,0 +1,235 @@
+"""Read-only JSON API of the music app:
+    /music/api/performers/                  paginated list of performers (by name)
+    /music/api/performers/?ids=1,2,3        the performers with the given ids, in one query
+    /music/api/performers/<pk>/             one performer
+    /music/api/festivals/ ...               the same for festivals (listed by start date)
+Query parameters:
+    - fields - the fields to include (sparse fieldsets), e.g. ?fields=id,name; all of RESOURCES[...].fields by default
+    - limit - page size of the lists (default 50, at most MAX_LIMIT)
+    - cursor - the position in the list, taken from the next/previous links of a page (see music/pagination.py)
+The rows are read with values(), selecting just the columns of the requested fields, so no model instances
+are created, and serialized with orjson (if installed; with the standard json module otherwise).
+The responses are cached and support conditional GET, like the HTML pages
+(see music/pagecache.py and music/conditional.py).
+A page of a list:
+    {"results": [{"id": 1, "name": "Janis Joplin"}, ...], "next": "/music/api/performers/?cursor=...", "previous": null}
+"""
+
+import json
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.views.decorators.http import require_safe
+
+from music import urlbuilder
+from music.conditional import conditional_page, performer_state, festival_state, performer_list_state, \
+    festival_list_state
+from music.models import Performer, Festival
+from music.pagecache import cached_page
+from music.pagination import InvalidCursor, KeysetPaginator
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+MAX_IDS = 500
+
+
+class Resource:
+    """Describes how a model is exposed by the API:
+        - fields - API field name: the column (attribute name) it is read from
+        - annotations - API field name: the QuerySet method that annotates it (used only if the field is requested)
+        - ordering - the keyset ordering of the list (pk is appended)
+        - url_name - the route of the HTML detail page, for the 'url' field
+        - depends_on - the models whose changes invalidate the cached responses (see music/pagecache.py)
+    """
+
+    def __init__(self, model, fields, ordering, url_name, annotations=None, depends_on=None):
+        self.model = model
+        self.fields = fields
+        self.ordering = ordering
+        self.url_name = url_name
+        self.annotations = annotations or {}
+        self.depends_on = depends_on or (model,)
+
+    @property
+    def field_names(self):
+        return [*self.fields, *self.annotations, 'url']
+
+
+RESOURCES = {
+    'performers': Resource(
+        Performer,
+        fields={'id': 'id', 'name': 'name', 'is_band': 'is_band', 'festival': 'festival_id',
+                'updated_at': 'updated_at'},
+        ordering=('name',), url_name='performer-detail',
+    ),
+    'festivals': Resource(
+        Festival,
+        fields={'id': 'id', 'name': 'name', 'start': 'start', 'end': 'end', 'location': 'location',
+                'updated_at': 'updated_at'},
+        ordering=('start',), url_name='festival-detail',
+        annotations={'n_performers': 'with_performer_count'}, depends_on=(Festival, Performer),
+    ),
+}
+
+
+class ApiError(Exception):
+    """Raised for an invalid request; answered with the message and the status code as JSON."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def json_response(data, status=200):
+    if orjson is not None:
+        content = orjson.dumps(data)
+    else:
+        content = json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return HttpResponse(content, status=status, content_type='application/json')
+
+
+def requested_fields(request, resource):
+    """The API field names in ?fields=..., checked against the resource (all fields if not given)."""
+
+    value = request.GET.get('fields')
+    if not value:
+        return resource.field_names
+    fields = list(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in resource.field_names]
+    if unknown or not fields:
+        raise ApiError(f'Unknown fields: {", ".join(unknown) or value}. '
+                       f'Available fields: {", ".join(resource.field_names)}.')
+    return fields
+
+
+def rows_queryset(resource, fields, extra=()):
+    """A values() QuerySet of the resource's model selecting only the columns of fields
+    (plus the ones in extra, needed for ordering and the 'url' field), without creating model instances.
+    """
+
+    queryset = resource.model.objects.all()
+    for name in fields:
+        if name in resource.annotations:
+            queryset = getattr(queryset, resource.annotations[name])()
+    columns = [resource.fields.get(name, name) for name in fields if name != 'url']
+    return queryset.values(*dict.fromkeys([*extra, *columns]))
+
+
+def serialize(resource, fields, row):
+    """The API representation of a values() row, with just the requested fields in the requested order."""
+
+    data = {}
+    for name in fields:
+        if name == 'url':
+            data[name] = urlbuilder.pk_url(resource.url_name, row['id'])
+        else:
+            data[name] = row[resource.fields.get(name, name)]
+    return data
+
+
+def api_view(resource_name, state_func):
+    """Wraps an API view: the resource is looked up, ApiError is answered as JSON,
+    and the response is cached and supports conditional GET (see the module docstring).
+    """
+
+    resource = RESOURCES[resource_name]
+
+    def decorator(view):
+        @wraps(view)
+        def _view(request, **kwargs):
+            try:
+                return view(request, resource, **kwargs)
+            except ApiError as e:
+                return json_response({'error': str(e)}, status=e.status)
+        return require_safe(conditional_page(state_func)(cached_page(*resource.depends_on)(_view)))
+    return decorator
+
+
+def object_list(request, resource):
+    fields = requested_fields(request, resource)
+    if 'ids' in request.GET:
+        return batch(request, resource, fields)
+
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise ApiError('limit must be an integer.')
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ApiError(f'limit must be between 1 and {MAX_LIMIT}.')
+
+    paginator = KeysetPaginator(rows_queryset(resource, fields, extra=(*resource.ordering, 'id')),
+                                resource.ordering, limit)
+    try:
+        page = paginator.page(request.GET.get('cursor'))
+    except InvalidCursor as e:
+        raise ApiError(f'Invalid cursor: {e}')
+
+    def page_link(cursor):
+        if cursor is None:
+            return None
+        query = request.GET.copy()
+        query['cursor'] = cursor
+        return f'{request.path}?{urlencode(sorted(query.items()))}'
+
+    return json_response({
+        'results': [serialize(resource, fields, row) for row in page.object_list],
+        'next': page_link(page.next_cursor),
+        'previous': page_link(page.previous_cursor),
+    })
+
+
+def batch(request, resource, fields):
+    """The objects with the ids in ?ids=1,2,3 (in that order; unknown ids are left out), read in one query."""
+
+    try:
+        ids = list(dict.fromkeys(int(pk) for pk in request.GET['ids'].split(',') if pk.strip()))
+    except ValueError:
+        raise ApiError('ids must be a comma-separated list of integers.')
+    if len(ids) > MAX_IDS:
+        raise ApiError(f'At most {MAX_IDS} ids can be requested at once.')
+    rows = {row['id']: row for row in rows_queryset(resource, fields, extra=('id',)).filter(pk__in=ids)}
+    return json_response({'results': [serialize(resource, fields, rows[pk]) for pk in ids if pk in rows]})
+
+
+def object_detail(request, resource, pk):
+    fields = requested_fields(request, resource)
+    row = rows_queryset(resource, fields, extra=('id',)).filter(pk=pk).first()
+    if row is None:
+        raise ApiError(f'{resource.model._meta.verbose_name.capitalize()} {pk} not found.', status=404)
+    return json_response(serialize(resource, fields, row))
+
+
+@api_view('performers', performer_list_state)
+def performer_list(request, resource):
+    """The list of performers, or a batch of them (?ids=...), as JSON."""
+
+    return object_list(request, resource)
+
+
+@api_view('performers', performer_state)
+def performer_detail(request, resource, pk):
+    """One performer as JSON."""
+
+    return object_detail(request, resource, pk)
+
+
+@api_view('festivals', festival_list_state)
+def festival_list(request, resource):
+    """The list of festivals, or a batch of them (?ids=...), as JSON."""
+
+    return object_list(request, resource)
+
+
+@api_view('festivals', festival_state)
+def festival_detail(request, resource, pk):
+    """One festival as JSON."""
+
+    return object_detail(request, resource, pk)
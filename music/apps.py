@@ -3,3 +3,11 @@ from django.apps import AppConfig
 
 class MusicConfig(AppConfig):
     name = 'music'
+    # The type of the primary keys of the models that do not declare one (the one all their migrations use)
+    default_auto_field = 'django.db.models.AutoField'
+
+    def ready(self):
+        # Connect the signal handlers (counters etc.) and the database connection hooks
+        # (SQLite PRAGMAs, query instrumentation)
+        from music import signals  # noqa: F401
+        from woodstock_dj import database, instrumentation  # noqa: F401
@@ -0,0 +1,183 @@
+"""Static asset pipeline of the project: content-hashed file names, pre-compressed variants and responsive images.
+All of it happens once, at build time, when the static files are collected into STATIC_ROOT:
+    manage.py@<project_site>  > build_static
+The storage (STORAGES['staticfiles'] in settings/base.py) extends Django's ManifestStaticFilesStorage, which copies
+every file under a name containing the hash of its content (css/bootstrap.min.<hash>.css) and records the mapping
+in staticfiles.json, so that {% static %} links to the current version and the files can be cached by browsers
+"forever" (Cache-Control: max-age=<1 year>, immutable) - a changed file gets a new name. In addition:
+    - text files (CSS, JS, SVG...) get pre-compressed .gz and (if the brotli package is installed) .br variants,
+      served instead of the originals to clients that accept them (by a front-end web server, e.g. nginx's
+      gzip_static/brotli_static, or, in development, by serve() below)
+    - JPEG/PNG images get resized WebP and JPEG variants at several widths (if Pillow is installed),
+      recorded in responsive.json and emitted as srcset by the {% responsive_image %} template tag
+      (see music/templatetags/responsive.py), so that browsers download only the size they display
+Until build_static (or collectstatic) has been run, the storage falls back to the plain file names,
+so development and tests work without a build step.
+"""
+
+import gzip
+import io
+import json
+import os
+import re
+from urllib.parse import urljoin
+
+from django.conf import settings
+from django.contrib.staticfiles import views as staticfiles_views
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.encoding import filepath_to_uri
+from django.views import static
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
+
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.xml', '.map')
+MIN_COMPRESS_SIZE = 512
+RESIZABLE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+RESPONSIVE_WIDTHS = (320, 640, 960, 1280)
+MAX_WIDTH = 1600
+# (Pillow format, file extension, MIME type, save options)
+RESPONSIVE_FORMATS = (
+    ('WEBP', 'webp', 'image/webp', {'quality': 75, 'method': 6}),
+    ('JPEG', 'jpg', 'image/jpeg', {'quality': 80, 'optimize': True, 'progressive': True}),
+)
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.')
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+class AssetStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage that also writes the compressed and the responsive image variants
+    of the collected files (see the module docstring).
+    """
+
+    # The vendored bootstrap.min.css refers to a source map that is not shipped,
+    # so only url() and @import references are rewritten to the hashed names (not sourceMappingURL)
+    patterns = (
+        ('*.css', ManifestStaticFilesStorage.patterns[0][1][:2]),
+    )
+    responsive_manifest_name = 'responsive.json'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.responsive_images = self.load_responsive_manifest()
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            # Not built yet (development, tests): the files are found by the staticfiles finders
+            return name
+        return super().stored_name(name)
+
+    def load_responsive_manifest(self):
+        try:
+            with self.open(self.responsive_manifest_name) as manifest:
+                return json.loads(manifest.read().decode())
+        except FileNotFoundError:
+            return {}
+
+    def save_responsive_manifest(self):
+        self._write(self.responsive_manifest_name, json.dumps(self.responsive_images, indent=1).encode())
+
+    def _write(self, name, content):
+        if self.exists(name):
+            self.delete(name)
+        self._save(name, ContentFile(content))
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        self.responsive_images = {}
+        for name in sorted(paths):
+            hashed_name = self.hashed_files.get(self.hash_key(self.clean_name(name)))
+            if hashed_name is None:
+                continue
+            extension = os.path.splitext(name)[1].lower()
+            if extension in COMPRESSIBLE_EXTENSIONS:
+                self.compress(hashed_name)
+            elif extension in RESIZABLE_EXTENSIONS and Image is not None:
+                self.responsive_images[name] = self.resize(hashed_name)
+        self.save_responsive_manifest()
+
+    def compress(self, name):
+        """Writes name.gz (and name.br) next to the file, if the file is large enough and compresses well."""
+
+        with self.open(name) as file:
+            content = file.read()
+        if len(content) < MIN_COMPRESS_SIZE:
+            return
+        variants = [('.gz', gzip.compress(content, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(content, quality=11)))
+        for suffix, compressed in variants:
+            if len(compressed) < len(content):
+                self._write(name + suffix, compressed)
+
+    def resize(self, name):
+        """Writes the WebP/JPEG variants of the image at RESPONSIVE_WIDTHS (the ones smaller than the image,
+        plus the image's own width, capped at MAX_WIDTH) and returns their description for responsive.json.
+        The variant names derive from the hashed name, so they change whenever the image does.
+        """
+
+        with self.open(name) as file:
+            image = Image.open(file)
+            image.load()
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        width, height = image.size
+        widths = sorted({w for w in RESPONSIVE_WIDTHS if w < width} | {min(width, MAX_WIDTH)})
+        root = os.path.splitext(name)[0]
+        variants = []
+        for variant_width in widths:
+            variant_height = round(height * variant_width / width)
+            resized = image if variant_width == width else \
+                image.resize((variant_width, variant_height), Image.LANCZOS)
+            for image_format, extension, mime_type, save_options in RESPONSIVE_FORMATS:
+                buffer = io.BytesIO()
+                resized.save(buffer, image_format, **save_options)
+                variant_name = f'{root}.{variant_width}w.{extension}'
+                self._write(variant_name, buffer.getvalue())
+                variants.append({'name': variant_name, 'width': variant_width, 'type': mime_type})
+        return {'width': width, 'height': height, 'variants': variants}
+
+    def variant_url(self, name):
+        """The URL of a (hashed) variant name recorded in responsive.json."""
+
+        return urljoin(self.base_url, filepath_to_uri(name))
+
+
+def serve(request, path, document_root=None, **kwargs):
+    """Development view for the static files (used by urlpatterns += static(...) in woodstock_dj/urls.py),
+    which serves the built files like a front-end web server would:
+        - the .br/.gz variant of a file, if the client accepts it and the variant exists
+        - the hashed files with Cache-Control: max-age=<1 year>, immutable
+    Files that have not been built into STATIC_ROOT are served from the apps' static directories, as usual.
+    """
+
+    document_root = document_root or settings.STATIC_ROOT
+    if not document_root or not os.path.isfile(os.path.join(document_root, path)):
+        return staticfiles_views.serve(request, path, **kwargs)
+
+    accepted = request.headers.get('Accept-Encoding', '')
+    served_path = path
+    for suffix, encoding in (('.br', 'br'), ('.gz', 'gzip')):
+        if encoding in accepted and os.path.isfile(os.path.join(document_root, path + suffix)):
+            served_path = path + suffix
+            break
+    response = static.serve(request, served_path, document_root=document_root)
+    if served_path != path:
+        del response.headers['Content-Disposition']
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if HASHED_NAME_RE.search(path):
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    return response
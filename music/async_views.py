@@ -0,0 +1,109 @@
+"""Async versions of the read-only views of the music app (index, the list views and the detail views).
+They are used instead of the views in music/views.py when the project is served through ASGI
+(woodstock_dj/asgi.py sets ASYNC_VIEWS, see music/urls.py), so that a request waiting for the database
+does not tie up a worker thread. They use the async ORM interface (aget(), afirst(), async for...),
+which requires Django 4.1+, and reuse the configuration of the corresponding class-based views
+(template names, page sizes, keyset orderings, fragment names...).
+Anything that may touch the database outside the async ORM interface (rendering the cached fragments,
+whose templates follow relations, and the cache calls) runs through sync_to_async().
+"""
+
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from music import counters, fragments, search
+from music.conditional import conditional_page, performer_state, festival_state, performer_list_state, \
+    festival_list_state
+from music.models import Performer, Festival
+from music.pagecache import cached_page
+from music.pagination import KeysetPaginator, InvalidCursor
+from music.views import PerformerListView, PerformerDetailView, FestivalListView, FestivalDetailView
+
+
+@cached_page(Performer, Festival)
+async def index(request):
+    """The async version of views.index(); both counts are read with one query, like get_counts() does
+    (the async ORM runs the queries of a request one at a time on one thread, so two queries would not overlap).
+    """
+
+    counts = await counters.aget_counts([Performer, Festival])
+    context = {
+        'n_p': counts[Performer],
+        'n_f': counts[Festival]
+    }
+    return render(request, 'index.html', context=context)
+
+
+async def _list(request, view_class, queryset):
+    """Renders one keyset-paginated, optionally searched page of a list view (see KeysetPaginationMixin)."""
+
+    query = request.GET.get(view_class.search_kwarg, '').strip()
+    if query:
+        queryset = search.filter_queryset(queryset, query)
+    paginator = KeysetPaginator(queryset, view_class.keyset_ordering, view_class.paginate_by)
+    try:
+        page = await paginator.apage(request.GET.get(view_class.cursor_kwarg))
+    except InvalidCursor as e:
+        raise Http404(f'Invalid cursor: {e}')
+    context = {
+        'paginator': paginator,
+        'page_obj': page,
+        'is_paginated': page.has_other_pages(),
+        'object_list': page.object_list,
+        f'{queryset.model._meta.model_name}_list': page.object_list,
+        'search_query': query,
+    }
+    return render(request, view_class.template_name, context=context)
+
+
+@conditional_page(performer_list_state)
+@cached_page(Performer)
+async def performer_list(request):
+    """The async version of PerformerListView."""
+
+    return await _list(request, PerformerListView, Performer.objects.for_list())
+
+
+@conditional_page(festival_list_state)
+@cached_page(Festival, Performer)
+async def festival_list(request):
+    """The async version of FestivalListView."""
+
+    return await _list(request, FestivalListView, Festival.objects.with_performer_count())
+
+
+async def _detail(request, pk, view_class, queryset):
+    """Renders a detail page from its cached fragment, loading the object only on a miss (see FragmentCacheMixin)."""
+
+    view = view_class()
+    html = await sync_to_async(fragments.get_fragment)(view.fragment_name, pk)
+    if html is None:
+        try:
+            obj = await queryset.aget(pk=pk)
+        except queryset.model.DoesNotExist:
+            raise Http404(f'No {queryset.model._meta.verbose_name} found matching the query')
+        context = {'object': obj, queryset.model._meta.model_name: obj}
+        html = await sync_to_async(render_to_string)(view.fragment_template_name, context)
+        await sync_to_async(fragments.set_fragment)(view.fragment_name, pk, html,
+                                                    view.get_fragment_dependencies(obj))
+    page_context = await sync_to_async(view.get_page_context_data)()
+    return render(request, view.template_name, context={'fragment': mark_safe(html), **page_context})
+
+
+@conditional_page(performer_state)
+@cached_page(Performer, Festival)
+async def performer_detail(request, pk):
+    """The async version of PerformerDetailView."""
+
+    return await _detail(request, pk, PerformerDetailView, Performer.objects.with_festival())
+
+
+@conditional_page(festival_state)
+@cached_page(Festival, Performer)
+async def festival_detail(request, pk):
+    """The async version of FestivalDetailView."""
+
+    return await _detail(request, pk, FestivalDetailView, Festival.objects.with_lineup())
@@ -0,0 +1,259 @@
+"""A repeatable benchmark of every route of the music app (music/urls.py), for comparing runs across commits.
+Every route is requested by concurrent workers, either:
+    - through the test client, in this process (mode 'client'; no network and no server needed), or
+    - over HTTP, from a local WSGI server started in a background thread of this process (mode 'server';
+      adds the HTTP parsing and the WSGI layer, like a real deployment, but served by one process)
+and its throughput, latency percentiles and number of SQL queries per request are reported. The number of queries
+is read from the Server-Timing header set by woodstock_dj/instrumentation.py, so it is the same in both modes.
+The routes' URL parameters are filled in from the database (the first performer and the festival with
+the largest lineup, see sample_kwargs()), so seed it first (see music/seeding.py).
+The results are saved as JSON, with the commit and the size of the catalogue, and can be compared:
+    manage.py@<project_site>  > benchmark --output before.json
+    manage.py@<project_site>  > benchmark --output after.json --compare before.json
+"""
+
+import re
+import socket
+import subprocess
+import threading
+import time
+from datetime import datetime, timezone
+from socketserver import ThreadingMixIn
+from urllib.parse import urlencode
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+import http.client
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import URLPattern, reverse
+
+from music import counters, loadtest, urls
+from music.models import Festival, FestivalLineupStats, Performer
+
+
+QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+# Query strings of the routes that need one to do any work
+QUERY_STRINGS = {
+    'search': {'q': 'jim'},
+    'festival-lookup': {'q': 'wood'},
+}
+
+
+def routes():
+    """The names of the routes in music/urls.py, in the order they are declared."""
+
+    return list(dict.fromkeys(pattern.name for pattern in urls.urlpatterns
+                              if isinstance(pattern, URLPattern) and pattern.name))
+
+
+def sample_kwargs():
+    """Values for the URL parameters of the routes, taken from the database."""
+
+    festival = (FestivalLineupStats.objects.order_by('-n_performers').values_list('festival_id', flat=True).first()
+                or Festival.objects.values_list('pk', flat=True).first())
+    performer = Performer.objects.order_by('name', 'id').values_list('pk', flat=True).first()
+    start = Festival.objects.filter(pk=festival).values_list('start', flat=True).first()
+    return {
+        'performer': performer,
+        'festival': festival,
+        'year': start.year if start else datetime.now().year,
+        'model_name': 'performers',
+    }
+
+
+def route_path(name, samples):
+    """The path (with the query string, if any) to request for route name, or None if the route cannot be
+    requested (e.g., there is no performer for performer-detail).
+    """
+
+    pattern = next(pattern for pattern in urls.urlpatterns if getattr(pattern, 'name', None) == name)
+    kwargs = {}
+    for parameter in pattern.pattern.converters:
+        if parameter == 'pk':
+            value = samples['festival'] if 'festival' in name else samples['performer']
+        else:
+            value = samples.get(parameter)
+        if value is None:
+            return None
+        kwargs[parameter] = value
+    path = reverse(name, kwargs=kwargs)
+    if name in QUERY_STRINGS:
+        path = f'{path}?{urlencode(QUERY_STRINGS[name])}'
+    return path
+
+
+def commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# Clients; fetch(path) returns (status, number of queries or None)
+
+def queries_in(server_timing):
+    match = QUERIES_RE.search(server_timing or '')
+    return int(match.group(1)) if match else None
+
+
+class TestClientFetcher:
+    """Requests the paths through the test client (one per worker thread)."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def __call__(self, path):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = Client()
+        response = client.get(path)
+        return response.status_code, queries_in(response.get('Server-Timing'))
+
+    def close(self):
+        pass
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class ServerFetcher:
+    """Starts the project's WSGI application on a free local port and requests the paths over HTTP
+    (one keep-alive connection per worker thread).
+    """
+
+    def __init__(self):
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        self.server = make_server('127.0.0.1', port, WSGIHandler(), server_class=_ThreadingWSGIServer,
+                                  handler_class=_QuietHandler)
+        self.address = f'127.0.0.1:{port}'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self._local = threading.local()
+
+    def __call__(self, path):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = http.client.HTTPConnection(self.address, timeout=30)
+        try:
+            connection.request('GET', path)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            self._local.connection = None
+            raise
+        return response.status, queries_in(response.getheader('Server-Timing'))
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+FETCHERS = {'client': TestClientFetcher, 'server': ServerFetcher}
+
+
+# Running
+
+def measure(fetch, path, requests, concurrency, cold=False):
+    """Requests path requests times from concurrency threads; returns the summary of music.loadtest.summarize(),
+    with the statuses and the number of queries per request (mean and max) added.
+    With cold, the cache is cleared before every request, so the cached pages are rendered every time.
+    """
+
+    remaining = iter(range(requests))
+    lock = threading.Lock()
+    latencies, queries, statuses, errors = [], [], {}, [0]
+
+    def worker():
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            if cold:
+                cache.clear()
+            started = time.perf_counter()
+            try:
+                status, count = fetch(path)
+            except (OSError, http.client.HTTPException):
+                status, count = None, None
+            latency = time.perf_counter() - started
+            with lock:
+                statuses[status] = statuses.get(status, 0) + 1
+                if status is None or status >= 500:
+                    errors[0] += 1
+                    continue
+                latencies.append(latency)
+                if count is not None:
+                    queries.append(count)
+
+    threads = [threading.Thread(target=worker) for _ in range(max(concurrency, 1))]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    result = loadtest.summarize(latencies, time.perf_counter() - started, errors[0])
+    result['statuses'] = {str(status): n for status, n in sorted(statuses.items(), key=str)}
+    result['queries_mean'] = sum(queries) / len(queries) if queries else None
+    result['queries_max'] = max(queries) if queries else None
+    return result
+
+
+def run(mode='client', names=None, requests=200, concurrency=8, warmup=10, cold=False, on_route=None):
+    """Benchmarks the given routes (all of them by default); returns the results as a JSON-serializable dictionary."""
+
+    on_route = on_route or (lambda name, result: None)
+    samples = sample_kwargs()
+    counts = counters.get_counts()
+    results = {
+        'commit': commit(),
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'mode': mode,
+        'settings': settings.SETTINGS_MODULE,
+        'requests': requests,
+        'concurrency': concurrency,
+        'cold': cold,
+        'catalogue': {'performers': counts[Performer], 'festivals': counts[Festival]},
+        'routes': {},
+    }
+    # The test client and the local server use hosts that the deployment settings may not allow
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver', '127.0.0.1']):
+        fetch = FETCHERS[mode]()
+        try:
+            for name in names or routes():
+                path = route_path(name, samples)
+                if path is None:
+                    continue
+                measure(fetch, path, warmup, concurrency, cold)
+                result = {'path': path, **measure(fetch, path, requests, concurrency, cold)}
+                results['routes'][name] = result
+                on_route(name, result)
+        finally:
+            fetch.close()
+    return results
+
+
+def compare(old, new):
+    """Yields (route, metric, old value, new value, relative change) for the routes present in both runs."""
+
+    for name, result in new['routes'].items():
+        previous = old.get('routes', {}).get(name)
+        if previous is None:
+            continue
+        for metric in ('rps', 'p50_ms', 'p95_ms', 'p99_ms', 'queries_mean'):
+            before, after = previous.get(metric), result.get(metric)
+            if before is None or after is None:
+                continue
+            yield name, metric, before, after, (after - before) / before if before else None
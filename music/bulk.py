@@ -0,0 +1,145 @@
+"""Set-based bulk changes of performers and festivals, used by the admin actions (see music/admin.py)
+and the lineup management views (FestivalDeleteView and FestivalLineupView in music/views.py).
+Each change of performers is a single UPDATE statement over the selected performers, however many they are,
+instead of loading and saving them one by one:
+    - set_festival(), set_band(), toggle_band() - the admin actions
+    - move_lineup() - all the performers of a festival move to another festival
+    - merge_festivals() - move_lineup(), then the emptied festival is deleted
+    - delete_festivals() - the performers are detached (UPDATE ... SET festival_id = NULL) before the festivals
+      are deleted, so Django's collector does not load every performer in order to set its festival to NULL
+Each operation runs in one transaction. QuerySet.update() sends no signals and does not set the auto_now fields,
+so what the signal handlers (music/signals.py) would have done is done here explicitly:
+    - updated_at is set in the same UPDATE (it drives conditional GET, see music/conditional.py)
+    - the band/solo musician split and the lineups of the affected festivals are refreshed (music/stats.py),
+      from one grouped query over the selection taken before the update
+    - one performers_updated signal per UPDATE is sent when the transaction commits, with the pks of the updated
+      performers and the affected festivals; its handler in music/signals.py invalidates their fragments
+      and the cached pages showing performers (music/fragments.py, music/pagecache.py)
+The row counts of performers do not change, so their counter (music/counters.py) is left alone; the festivals
+themselves are deleted with Festival.delete(), so their own signal handlers run as usual (one festival at a time).
+The pks of the selection are kept in a compact array (8 bytes per performer) for the signal,
+since the update can change which performers match the selection's filters (e.g., is_band=True).
+"""
+
+from array import array
+
+from django.db import router, transaction
+from django.db.models import Case, Count, Q, Value, When
+from django.dispatch import Signal
+from django.utils import timezone
+
+from music import stats
+from music.models import Festival, FestivalLineupStats, Performer
+
+
+CHUNK_SIZE = 10000
+
+# Sent (with sender=Performer, pks and festival_ids) after the transaction of a bulk update has been committed
+performers_updated = Signal()
+
+
+def selection_groups(queryset):
+    """{festival id: (performers, bands)} of the performers in queryset, from one GROUP BY festival query."""
+
+    rows = (queryset.order_by()
+            .values('festival_id')
+            .annotate(n=Count('id'), bands=Count('id', filter=Q(is_band=True)))
+            .values_list('festival_id', 'n', 'bands'))
+    return {festival_id: (n, bands) for festival_id, n, bands in rows}
+
+
+def update_performers(queryset, values, bands_after=None):
+    """Updates the performers in queryset with values (a dictionary of field: value or expression)
+    in one UPDATE statement, and does the bookkeeping described in the module docstring.
+    If the update can change is_band, bands_after(performers, bands) must return the number of bands
+    among the updated performers after the update. Returns the number of updated performers.
+    """
+
+    # The selection is read from the database it is written to, never from a lagging read replica
+    queryset = queryset.order_by().using(router.db_for_write(queryset.model))
+    with transaction.atomic(using=queryset.db):
+        groups = selection_groups(queryset)
+        pks = array('q', queryset.values_list('pk', flat=True).iterator(chunk_size=CHUNK_SIZE))
+        updated = queryset.update(**values, updated_at=timezone.now())
+
+        festival_ids = set(groups)
+        if 'festival_id' in values:
+            festival_ids.add(values['festival_id'])
+        if bands_after is not None:
+            performers, bands = (sum(column) for column in zip((0, 0), *groups.values()))
+            delta = bands_after(performers, bands) - bands
+            if delta:
+                stats.adjust_kind(True, delta)
+                stats.adjust_kind(False, -delta)
+        stats.refresh_lineups(festival_ids)
+        transaction.on_commit(lambda: performers_updated.send(sender=Performer, pks=pks, festival_ids=festival_ids),
+                              using=queryset.db)
+    return updated
+
+
+def set_festival(queryset, festival_id):
+    """Moves the performers in queryset to the festival with festival_id (or to no festival, with None)."""
+
+    return update_performers(queryset, {'festival_id': festival_id})
+
+
+def set_band(queryset, is_band):
+    """Marks the performers in queryset as bands (is_band=True) or solo musicians."""
+
+    return update_performers(queryset, {'is_band': is_band},
+                             bands_after=lambda performers, bands: performers if is_band else 0)
+
+
+def toggle_band(queryset):
+    """Turns the bands in queryset into solo musicians and vice versa."""
+
+    return update_performers(queryset, {'is_band': Case(When(is_band=True, then=Value(False)), default=Value(True))},
+                             bands_after=lambda performers, bands: performers - bands)
+
+
+def lineup_counts(festival):
+    """{'performers': ..., 'bands': ..., 'musicians': ...} of a festival's lineup, read from the precomputed
+    statistics (music/stats.py), for the confirmation pages; no performer is loaded or counted.
+    """
+
+    row = (FestivalLineupStats.objects.filter(festival_id=festival.pk)
+           .values_list('n_performers', 'n_bands', 'n_musicians').first())
+    if row is None:
+        row = stats.lineup_query([festival.pk]).get(festival.pk, (0, 0, 0))
+    return dict(zip(('performers', 'bands', 'musicians'), row))
+
+
+def move_lineup(source, target):
+    """Moves all the performers of the festival source to the festival target; returns their number."""
+
+    return set_festival(Performer.objects.filter(festival_id=source.pk), target.pk)
+
+
+def merge_festivals(source, target):
+    """Moves the lineup of source to target and deletes source, in one transaction; returns the number of moved
+    performers.
+    """
+
+    with transaction.atomic():
+        moved = move_lineup(source, target)
+        source.delete()
+    return moved
+
+
+def delete_festivals(queryset):
+    """Deletes the festivals in queryset, detaching their performers with one UPDATE first;
+    returns the number of detached performers.
+    """
+
+    queryset = queryset.using(router.db_for_write(queryset.model))
+    with transaction.atomic(using=queryset.db):
+        detached = set_festival(Performer.objects.filter(festival__in=queryset.values('pk')), None)
+        for festival in queryset:
+            festival.delete()
+    return detached
+
+
+def delete_festival(festival):
+    """Deletes one festival, see delete_festivals()."""
+
+    return delete_festivals(Festival.objects.filter(pk=festival.pk))
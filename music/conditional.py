@@ -0,0 +1,115 @@
+"""HTTP conditional GET for the catalogue pages (ETag, 304 Not Modified).
+Before a page is rendered, a cheap "state" of everything the page shows is computed
+from the updated_at fields (max(updated_at), which is an index lookup) and the row counts
+(from the denormalized counters, see music/counters.py); the ETag is a hash of the state.
+If the client (or a reverse proxy in front of the server) already has the page with the same ETag,
+the response is 304 Not Modified and the view (the queries and the template rendering) is skipped altogether.
+The row counts are needed because deleting an object, or moving a performer out of a festival,
+does not change max(updated_at) of what remains. For the same reason, the pages have no Last-Modified date:
+a date taken from max(updated_at) would not move forward on such a change, and a client revalidating
+with If-Modified-Since alone would be told that its copy (still showing the deleted object) is current.
+Responses get Cache-Control: public, no-cache - a reverse proxy may store them,
+but has to revalidate them on every request (which costs one of the cheap state queries).
+Usage (works with both sync and async views):
+    @conditional_page(performer_state)
+    def performer_detail(request, pk): ...
+"""
+
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+from music import counters
+from music.models import Performer, Festival
+
+
+def _state(*parts):
+    """Returns the ETag of a page state made of the given parts."""
+
+    return hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+
+
+def performer_state(pk=None, **kwargs):
+    """The state of a performer's detail page: the performer, its festival,
+    and all festivals (for the "More festivals" panel, see PerformerDetailView).
+    """
+
+    row = (Performer.objects
+           .filter(pk=pk)
+           .values_list('updated_at', 'festival_id', 'festival__updated_at')
+           .first())
+    if row is None:
+        return None
+    return _state(*row, Festival.objects.aggregate(m=Max('updated_at'))['m'],
+                  counters.get_counts([Festival])[Festival])
+
+
+def festival_state(pk=None, **kwargs):
+    """The state of a festival's detail page: the festival and its lineup."""
+
+    row = (Festival.objects
+           .filter(pk=pk)
+           .annotate(lineup_updated_at=Max('performer__updated_at'), lineup_size=Count('performer'))
+           .values_list('updated_at', 'lineup_updated_at', 'lineup_size')
+           .first())
+    return _state(*row) if row else None
+
+
+def performer_list_state(**kwargs):
+    """The state of the performer list pages: all performers."""
+
+    return _state(Performer.objects.aggregate(m=Max('updated_at'))['m'],
+                  counters.get_counts([Performer])[Performer])
+
+
+def festival_list_state(**kwargs):
+    """The state of the festival list pages: all festivals and (for the lineup sizes shown) all performers."""
+
+    counts = counters.get_counts([Performer, Festival])
+    return _state(Festival.objects.aggregate(m=Max('updated_at'))['m'], counts[Festival],
+                  Performer.objects.aggregate(m=Max('updated_at'))['m'], counts[Performer])
+
+
+def _not_modified(request, etag):
+    return get_conditional_response(request, etag=quote_etag(etag) if etag else None)
+
+
+def _finish(request, etag, response):
+    if request.method in ('GET', 'HEAD') and response.status_code in (200, 304):
+        if etag and not response.has_header('ETag'):
+            response.headers['ETag'] = quote_etag(etag)
+        patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+def conditional_page(state_func):
+    """View decorator that answers conditional GET/HEAD requests with 304 Not Modified
+    when the ETag of the page state (computed by state_func(**view kwargs)) has not changed.
+    With method_decorator(), it can be applied to the dispatch() of class-based views.
+    """
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def _async_view(request, *args, **kwargs):
+                if request.method not in ('GET', 'HEAD'):
+                    return await view(request, *args, **kwargs)
+                etag = await sync_to_async(state_func)(**kwargs)
+                response = _not_modified(request, etag) or await view(request, *args, **kwargs)
+                return _finish(request, etag, response)
+            return _async_view
+
+        @wraps(view)
+        def _view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            etag = state_func(**kwargs)
+            response = _not_modified(request, etag) or view(request, *args, **kwargs)
+            return _finish(request, etag, response)
+        return _view
+
+    return decorator
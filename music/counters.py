@@ -0,0 +1,76 @@
+"""Denormalized counters of Performer and Festival objects (see CatalogueCounter in music/models.py).
+A counter is incremented/decremented by the post_save/post_delete signal handlers (music/signals.py)
+with a single UPDATE ... SET value = value + <delta>, and read with a single SELECT by primary key.
+Bulk operations that bypass the signals (QuerySet.update(), bulk_create(), raw SQL)
+should call adjust() themselves, or the counters should be repaired afterwards with reconcile().
+reconcile() counts the rows on the database the counters are written to (the primary, see woodstock_dj/routers.py),
+never on a read replica, which may lag behind.
+"""
+
+from asgiref.sync import sync_to_async
+from django.db import router
+from django.db.models import F
+
+from music.models import CatalogueCounter, Performer, Festival
+
+
+COUNTED_MODELS = [Performer, Festival]
+
+
+def counter_name(model):
+    """Returns the counter name for a model class, e.g. 'music.performer'."""
+
+    return model._meta.label_lower
+
+
+def adjust(model, delta):
+    """Adds delta to the counter of model. If the counter row does not exist yet,
+    it is created from the actual row count (which already includes the change).
+    """
+
+    updated = CatalogueCounter.objects.filter(name=counter_name(model)).update(value=F('value') + delta)
+    if not updated:
+        reconcile([model])
+
+
+def get_counts(models=None):
+    """Returns a dictionary {model class: count} for the given models (all counted models by default).
+    Missing counters are reconciled on the fly.
+    """
+
+    models = models or COUNTED_MODELS
+    values = dict(CatalogueCounter.objects
+                  .filter(name__in=[counter_name(model) for model in models])
+                  .values_list('name', 'value'))
+    missing = [model for model in models if counter_name(model) not in values]
+    if missing:
+        values.update({counter_name(model): count for model, count in reconcile(missing).items()})
+    return {model: values[counter_name(model)] for model in models}
+
+
+async def aget_counts(models=None):
+    """The async version of get_counts() (see music/async_views.py): one query for all the counters."""
+
+    models = models or COUNTED_MODELS
+    values = {name: value async for name, value in (CatalogueCounter.objects
+                                                    .filter(name__in=[counter_name(model) for model in models])
+                                                    .values_list('name', 'value'))}
+    missing = [model for model in models if counter_name(model) not in values]
+    if missing:
+        reconciled = await sync_to_async(reconcile)(missing)
+        values.update({counter_name(model): count for model, count in reconciled.items()})
+    return {model: values[counter_name(model)] for model in models}
+
+
+def reconcile(models=None):
+    """Recomputes the counters of the given models (all counted models by default) with COUNT(*)
+    and stores them. Returns a dictionary {model class: count}.
+    """
+
+    using = router.db_for_write(CatalogueCounter)
+    counts = {}
+    for model in models or COUNTED_MODELS:
+        counts[model] = model.objects.using(using).count()
+        CatalogueCounter.objects.using(using).update_or_create(name=counter_name(model),
+                                                               defaults={'value': counts[model]})
+    return counts
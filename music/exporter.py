@@ -0,0 +1,65 @@
+"""Streaming export of Performer and Festival objects as CSV or NDJSON (one JSON object per line).
+The rows are read with values_list(...).iterator(chunk_size=...), so no model instances are created
+and memory use stays flat no matter how big the tables are; the output is produced chunk by chunk
+(the first line immediately, then one chunk of text per chunk of rows).
+The columns match what music/importer.py expects, so an export can be imported again.
+Used by the export view (music/views.py) and by:
+    manage.py@<project_site>  > export_lineup --model performers|festivals [--format csv|ndjson] [--output <file>]
+"""
+
+import csv
+import io
+import itertools
+import json
+
+from music.models import Performer, Festival
+
+
+# model name: (model, exported columns, the corresponding values_list() lookups)
+EXPORTS = {
+    'performers': (Performer, ['id', 'name', 'is_band', 'festival'], ['id', 'name', 'is_band', 'festival__name']),
+    'festivals': (Festival, ['id', 'name', 'start', 'end', 'location'], ['id', 'name', 'start', 'end', 'location']),
+}
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+CHUNK_SIZE = 2000
+
+
+def _serialize(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def _csv_lines(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in itertools.chain([columns], rows):
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _ndjson_lines(columns, rows):
+    for row in rows:
+        yield json.dumps({column: _serialize(value) for column, value in zip(columns, row)}) + '\n'
+
+
+def export_chunks(model_name, file_format='csv', chunk_size=CHUNK_SIZE):
+    """Yields the export of the given model (see EXPORTS) in the given format (see FORMATS) as strings.
+    The first line (the CSV header, or the first NDJSON object) is yielded on its own, as soon as the query returns,
+    so that the download starts right away; the following lines are yielded chunk_size at a time.
+    """
+
+    model, columns, lookups = EXPORTS[model_name]
+    rows = model.objects.order_by('pk').values_list(*lookups).iterator(chunk_size=chunk_size)
+    lines = _csv_lines(columns, rows) if file_format == 'csv' else _ndjson_lines(columns, rows)
+    pending = []
+    for i, line in enumerate(lines):
+        pending.append(line)
+        if i == 0 or len(pending) == chunk_size:
+            yield ''.join(pending)
+            pending = []
+    if pending:
+        yield ''.join(pending)
@@ -0,0 +1,93 @@
+"""Forms of the music app.
+PerformerForm picks the festival of a performer with FestivalAutocompleteWidget instead of a <select>:
+a <select> lists every festival (one query over the whole table and one <option> per festival on every form page),
+while the widget renders just a text input with the label of the current festival (if any, one query by pk)
+and a hidden input with its id. As the user types, static/js/festival-autocomplete.js asks
+the festival lookup endpoint (the festival_lookup view, see music/views.py) for at most LOOKUP_LIMIT matches
+and offers them in a <datalist>. The size and the render time of the form page therefore no longer depend
+on the number of festivals. Without JavaScript, the festival can still be kept or cleared, but not changed.
+"""
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.forms.widgets import Media
+from django.urls import reverse_lazy
+from django.utils.html import format_html
+
+from music.models import Festival, Performer
+
+
+def festival_label(name, start, location):
+    """The label of a festival in the widget and the lookup results, e.g. 'Woodstock (1969), Bethel, NY'."""
+
+    year = f' ({start.year})' if start else ''
+    return f'{name}{year}, {location}'
+
+
+class FestivalAutocompleteWidget(forms.Widget):
+    """A text input with server-side suggestions, for a ForeignKey to Festival (see the module docstring).
+    The choices set on the widget by ModelChoiceField are never iterated, so no festival list is loaded.
+    """
+
+    lookup_url = reverse_lazy('festival-lookup')
+
+    @property
+    def media(self):
+        return Media(js=['js/festival-autocomplete.js'])
+
+    def label(self, value):
+        if value in (None, ''):
+            return ''
+        # The value is the submitted string when an invalid form is rendered again, e.g. ?festival=abc
+        try:
+            pk = Festival._meta.pk.to_python(value)
+        except ValidationError:
+            return ''
+        festival = Festival.objects.filter(pk=pk).values_list('name', 'start', 'location').first()
+        return festival_label(*festival) if festival else ''
+
+    def render(self, name, value, attrs=None, renderer=None):
+        attrs = self.build_attrs(self.attrs, attrs)
+        input_id = attrs.get('id', f'id_{name}')
+        return format_html(
+            '<input type="hidden" name="{name}" value="{value}" id="{id}_value">'
+            '<input type="text" id="{id}" value="{label}" list="{id}_options" autocomplete="off" '
+            'placeholder="Start typing a festival name" class="festival-autocomplete" '
+            'data-target="{id}_value" data-lookup-url="{url}">'
+            '<datalist id="{id}_options"></datalist>',
+            name=name, value='' if value is None else value, id=input_id, label=self.label(value),
+            url=self.lookup_url)
+
+    def value_from_datadict(self, data, files, name):
+        return data.get(name) or None
+
+
+class PerformerForm(forms.ModelForm):
+    """The form of PerformerCreateView and PerformerUpdateView."""
+
+    class Meta:
+        model = Performer
+        fields = ['name', 'is_band', 'festival']
+        widgets = {
+            'festival': FestivalAutocompleteWidget,
+        }
+
+
+class LineupForm(forms.Form):
+    """The form of FestivalLineupView: the festival to move the lineup of a festival to,
+    and whether the emptied festival is deleted afterwards (a merge).
+    """
+
+    target = forms.ModelChoiceField(queryset=Festival.objects.all(), widget=FestivalAutocompleteWidget,
+                                    label='Move the lineup to')
+    merge = forms.BooleanField(required=False, label='Merge (delete this festival afterwards)')
+
+    def __init__(self, *args, festival, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.festival = festival
+
+    def clean_target(self):
+        target = self.cleaned_data['target']
+        if target.pk == self.festival.pk:
+            raise forms.ValidationError('Choose another festival.')
+        return target
@@ -0,0 +1,176 @@
+"""Per-object fragment cache for the detail pages of the music app.
+A fragment (the rendered content of, e.g., a performer's detail page) is cached under a key made of
+the fragment name and the object's pk, together with the versions of everything it depends on:
+    music:fragment:performer-detail:<pk>  ->  {'html': ..., 'deps': {'music:version:performer:<pk>': 3, ...}}
+A fragment is a hit only if all the recorded versions are still current.
+The signal handlers in music/signals.py bump the versions when Performer and Festival objects are saved or deleted
+(once the transaction is committed, see bump_on_commit()), which invalidates exactly the fragments that depend
+on them; stale entries are simply left to expire/be evicted.
+The version scopes are:
+    - 'performer' - a Performer object itself
+    - 'festival' - a Festival object itself
+    - 'lineup' - the set of performers of a festival
+    - 'model' - all the objects of a model (e.g., 'music.performer'), used by the page cache (music/pagecache.py)
+Works with any Django cache backend shared by the server processes
+(a file-based cache or Redis in production, see CACHES in settings/prod.py).
+Hit/miss statistics are kept in the cache as well, see stats() and:
+    manage.py@<project_site>  > fragment_cache_stats [--reset]
+"""
+
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+
+FRAGMENT_TIMEOUT = 24 * 60 * 60
+STATS_KEYS = ('hits', 'misses', 'stale')
+FRAGMENT_NAMES = ('performer-detail', 'festival-detail')
+
+
+def version_key(scope, pk):
+    return f'music:version:{scope}:{pk}'
+
+
+def fragment_key(name, pk):
+    return f'music:fragment:{name}:{pk}'
+
+
+def stats_key(name, outcome):
+    return f'music:fragment-stats:{name}:{outcome}'
+
+
+def _incr(key, delta=1, timeout=None):
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # The key does not exist (never set, expired or evicted)
+        if cache.add(key, delta, timeout):
+            return delta
+        return cache.incr(key, delta)
+
+
+def bump(scope, *pks):
+    """Bumps the versions of the given objects in the given scope, invalidating the fragments that depend on them.
+    Missing version keys are set to a fresh, time-based version, which can never match a recorded one.
+    """
+
+    for pk in {pk for pk in pks if pk is not None}:
+        key = version_key(scope, pk)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+
+def bump_on_commit(scope, *pks, using=None):
+    """bump() once the current transaction is committed (right away outside a transaction).
+    Bumping earlier would let a concurrent request, which still sees the uncommitted state, cache it
+    under the new versions, where it would stay until FRAGMENT_TIMEOUT; a transaction that is rolled back
+    bumps nothing.
+    """
+
+    transaction.on_commit(lambda: bump(scope, *pks), using=using)
+
+
+def bump_many(scope, pks, chunk_size=1000):
+    """bump() for a large number of objects (e.g., after a QuerySet.update(), see music/bulk.py):
+    the versions are replaced with a fresh, time-based version, one set_many() per chunk_size objects
+    instead of one round trip per object. pks can be any iterable (e.g., a QuerySet iterator).
+    """
+
+    chunk = []
+    for pk in pks:
+        if pk is not None:
+            chunk.append(version_key(scope, pk))
+        if len(chunk) >= chunk_size:
+            cache.set_many(dict.fromkeys(chunk, time.time_ns()), None)
+            chunk = []
+    if chunk:
+        cache.set_many(dict.fromkeys(chunk, time.time_ns()), None)
+
+
+def current_versions(deps):
+    """Returns {version key: version} for deps, a list of (scope, pk) pairs, initializing missing versions."""
+
+    keys = [version_key(scope, pk) for scope, pk in deps if pk is not None]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return versions
+
+
+def get_fragment(name, pk):
+    """Returns the cached HTML of fragment name for the object with the given pk, or None on a miss."""
+
+    entry = cache.get(fragment_key(name, pk))
+    if entry is None:
+        _incr(stats_key(name, 'misses'))
+        return None
+    deps = entry['deps']
+    if cache.get_many(list(deps)) != deps:
+        _incr(stats_key(name, 'stale'))
+        return None
+    _incr(stats_key(name, 'hits'))
+    return entry['html']
+
+
+def set_fragment(name, pk, html, deps):
+    """Caches the HTML of fragment name for the object with the given pk,
+    recording the current versions of deps (a list of (scope, pk) pairs).
+    """
+
+    cache.set(fragment_key(name, pk), {'html': html, 'deps': current_versions(deps)}, FRAGMENT_TIMEOUT)
+
+
+def stats(names=FRAGMENT_NAMES):
+    """Returns {fragment name: {'hits': ..., 'misses': ..., 'stale': ..., 'hit_ratio': ...}}."""
+
+    result = {}
+    for name in names:
+        values = cache.get_many([stats_key(name, outcome) for outcome in STATS_KEYS])
+        counts = {outcome: values.get(stats_key(name, outcome), 0) for outcome in STATS_KEYS}
+        total = sum(counts.values())
+        counts['hit_ratio'] = counts['hits'] / total if total else 0.0
+        result[name] = counts
+    return result
+
+
+def reset_stats(names=FRAGMENT_NAMES):
+    cache.delete_many([stats_key(name, outcome) for name in names for outcome in STATS_KEYS])
+
+
+class FragmentCacheMixin:
+    """DetailView mixin that caches the rendered content of the page per object (see the module docstring).
+    Views using it specify:
+        - fragment_name (e.g., 'performer-detail')
+        - fragment_template_name (the template of the content, rendered without the request,
+          so it must not contain anything request-specific, like csrf tokens)
+        - get_fragment_dependencies(obj) (a list of (scope, pk) pairs the content depends on)
+    On a hit, the object is not loaded from the database at all;
+    the page template (template_name) gets the cached HTML as {{ fragment }},
+    along with anything returned by get_page_context_data() (which must not depend on the object).
+    """
+
+    fragment_name = None
+    fragment_template_name = None
+
+    def get_fragment_dependencies(self, obj):
+        return []
+
+    def get_page_context_data(self):
+        return {}
+
+    def get(self, request, *args, **kwargs):
+        pk = kwargs.get(self.pk_url_kwarg)
+        html = get_fragment(self.fragment_name, pk)
+        if html is None:
+            self.object = self.get_object()
+            context = self.get_context_data(object=self.object)
+            html = render_to_string(self.fragment_template_name, context)
+            set_fragment(self.fragment_name, pk, html, self.get_fragment_dependencies(self.object))
+        return self.render_to_response({'fragment': mark_safe(html), **self.get_page_context_data()})
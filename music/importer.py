@@ -0,0 +1,208 @@
+"""Bulk import of Performer and Festival objects from CSV or NDJSON (one JSON object per line) files.
+The file is streamed row by row, so memory use does not depend on the file size:
+    - each row is validated against the model fields (Field.clean(), e.g. max_length and date formats)
+    - festivals of performers are given by name and resolved through an in-memory name -> id map,
+      built with one query before the import starts; with create_festivals, the missing festivals are created
+      in the transaction of the batch that first names them, so a batch that fails leaves none behind
+    - valid rows are written with bulk_create() in batches, each batch in its own transaction
+Expected columns/keys:
+    - performers: name, is_band (true/false, 1/0, band/musician; optional), festival (festival name; optional)
+    - festivals: name, start (YYYY-MM-DD; optional), end (YYYY-MM-DD; optional), location (optional)
+bulk_create() sends no signals, so after each batch the denormalized counters (music/counters.py),
+the affected statistics (music/stats.py) and the affected lineup fragments and cached pages
+(music/fragments.py, music/pagecache.py) are updated explicitly.
+See also:
+    manage.py@<project_site>  > import_lineup <file> --model performers|festivals [--batch-size <n>]
+"""
+
+import csv
+import json
+import sys
+import time
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from music import counters, fragments, stats
+from music.models import Performer, Festival
+
+
+TRUE_VALUES = {'1', 'true', 't', 'yes', 'y', 'band'}
+FALSE_VALUES = {'0', 'false', 'f', 'no', 'n', 'musician', ''}
+
+
+class RowError(Exception):
+    """Raised for a row that cannot be imported; the message says why."""
+
+
+def read_rows(path, file_format=None):
+    """Yields the rows of a CSV or NDJSON file as dictionaries, one at a time.
+    path can be '-' for the standard input; the format is guessed from the extension if not given.
+    """
+
+    file_format = file_format or ('ndjson' if path.endswith(('.ndjson', '.jsonl', '.json')) else 'csv')
+    stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+    try:
+        if file_format == 'csv':
+            yield from csv.DictReader(stream)
+        else:
+            for line in stream:
+                line = line.strip()
+                if line:
+                    try:
+                        yield json.loads(line)
+                    except ValueError as e:
+                        yield RowError(f'invalid JSON: {e}')
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def clean_field(model, name, value):
+    field = model._meta.get_field(name)
+    if value in (None, '') and (field.null or field.has_default()):
+        return None if field.null else field.get_default()
+    try:
+        return field.clean(value, None)
+    except ValidationError as e:
+        raise RowError(f'{name}: {"; ".join(e.messages)}')
+
+
+def clean_bool(value):
+    if isinstance(value, bool):
+        return value
+    normalized = str(value if value is not None else '').strip().lower()
+    if normalized in TRUE_VALUES:
+        return True
+    if normalized in FALSE_VALUES:
+        return False
+    raise RowError(f'is_band: invalid value {value!r}')
+
+
+class LineupImporter:
+    """Imports the rows of one model (performers or festivals), see the module docstring.
+    Usage:
+        importer = LineupImporter('performers', batch_size=5000)
+        importer.run(read_rows('lineup.csv'))
+    After run(), the importer's created, errors and elapsed attributes describe the result.
+    """
+
+    def __init__(self, model_name, batch_size=5000, create_festivals=False, on_error=None, on_batch=None):
+        self.model = {'performers': Performer, 'festivals': Festival}[model_name]
+        self.batch_size = batch_size
+        self.create_festivals = create_festivals
+        self.on_error = on_error or (lambda number, message: None)
+        self.on_batch = on_batch or (lambda importer: None)
+        self.festival_ids = None
+        self.created = 0
+        self.errors = 0
+        self.elapsed = 0.0
+        self.started = None
+
+    @property
+    def rows_per_second(self):
+        return (self.created + self.errors) / self.elapsed if self.elapsed else 0.0
+
+    def load_festival_ids(self):
+        # Built once, with a single query; with duplicate names, the oldest festival wins
+        self.festival_ids = dict(Festival.objects.order_by('-id').values_list('name', 'id').iterator())
+
+    def resolve_festival(self, name):
+        """The id of the festival named name (None for no festival, or for one that flush() has to create)."""
+
+        if name in (None, ''):
+            return None
+        festival_id = self.festival_ids.get(name)
+        if festival_id is None:
+            if not self.create_festivals:
+                raise RowError(f'festival: unknown festival {name!r}')
+            clean_field(Festival, 'name', name)
+        return festival_id
+
+    def create_festivals_of(self, batch):
+        """Creates the festivals that the performers of the batch name but that do not exist yet
+        (see build()), sets the performers' festival_id and returns the {name: id} of the new festivals.
+        """
+
+        created = {}
+        for obj in batch:
+            name = getattr(obj, '_new_festival', None)
+            if name is None:
+                continue
+            if name not in created:
+                created[name] = Festival.objects.create(name=clean_field(Festival, 'name', name)).pk
+            obj.festival_id = created[name]
+        return created
+
+    def build(self, row):
+        """Returns an unsaved model instance built from a validated row."""
+
+        if isinstance(row, RowError):
+            raise row
+        if not isinstance(row, dict):
+            raise RowError('a row must be an object')
+        if self.model is Performer:
+            festival = row.get('festival')
+            performer = Performer(name=clean_field(Performer, 'name', row.get('name')),
+                                  is_band=clean_bool(row.get('is_band')),
+                                  festival_id=self.resolve_festival(festival))
+            if performer.festival_id is None and festival not in (None, ''):
+                # Created by flush(), in the batch's transaction
+                performer._new_festival = festival
+            return performer
+        festival = Festival(name=clean_field(Festival, 'name', row.get('name')),
+                            start=clean_field(Festival, 'start', row.get('start')),
+                            end=clean_field(Festival, 'end', row.get('end')),
+                            location=clean_field(Festival, 'location', row.get('location')))
+        if festival.start and festival.end and festival.end < festival.start:
+            raise RowError('end: the festival ends before it starts')
+        return festival
+
+    def refresh_stats(self, batch):
+        if self.model is Performer:
+            bands = sum(1 for obj in batch if obj.is_band)
+            if bands:
+                stats.adjust_kind(True, bands)
+            if len(batch) - bands:
+                stats.adjust_kind(False, len(batch) - bands)
+            stats.refresh_lineups({obj.festival_id for obj in batch})
+        else:
+            stats.refresh_lineups({obj.pk for obj in batch})
+            stats.refresh_locations({obj.location for obj in batch})
+            stats.refresh_years({stats.year_key(obj.start) for obj in batch})
+
+    def flush(self, batch):
+        if not batch:
+            return
+        with transaction.atomic():
+            new_festivals = self.create_festivals_of(batch) if self.model is Performer else {}
+            self.model.objects.bulk_create(batch)
+            counters.adjust(self.model, len(batch))
+            self.refresh_stats(batch)
+        if new_festivals:
+            self.festival_ids.update(new_festivals)
+        fragments.bump('model', self.model._meta.label_lower)
+        if self.model is Performer:
+            fragments.bump('lineup', *{obj.festival_id for obj in batch})
+        self.created += len(batch)
+        self.elapsed = time.perf_counter() - self.started
+        self.on_batch(self)
+
+    def run(self, rows):
+        self.started = time.perf_counter()
+        if self.model is Performer:
+            self.load_festival_ids()
+        batch = []
+        for number, row in enumerate(rows, start=1):
+            try:
+                batch.append(self.build(row))
+            except RowError as e:
+                self.errors += 1
+                self.on_error(number, str(e))
+                continue
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = []
+        self.flush(batch)
+        self.elapsed = time.perf_counter() - self.started
+        return self
@@ -0,0 +1,81 @@
+"""A small HTTP load generator, used to compare the WSGI and ASGI deployments (see manage.py loadtest).
+It keeps concurrency requests in flight (one thread and one keep-alive connection per simulated client)
+until the given number of requests has been sent, cycling through the given paths,
+and reports the throughput and the latency percentiles.
+"""
+
+import http.client
+import itertools
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def percentile(sorted_values, p):
+    """Returns the p-th percentile (0-100) of a sorted list, using the nearest-rank method."""
+
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(p / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(latencies, elapsed, errors=0):
+    """Returns a dictionary of throughput and latency statistics (latencies in seconds, reported in ms)."""
+
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'seconds': elapsed,
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'max_ms': (latencies[-1] if latencies else 0.0) * 1000,
+    }
+
+
+def run(base_url, paths, concurrency=50, requests=2000, timeout=30):
+    """Sends requests GET requests to base_url + each of paths (in turn) from concurrency clients."""
+
+    parts = urlsplit(base_url)
+    connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    prefix = parts.path.rstrip('/')
+    next_path = itertools.cycle(paths).__next__
+    remaining = itertools.count(requests, -1).__next__
+    lock = threading.Lock()
+    latencies, errors = [], [0]
+
+    def client():
+        connection = connection_class(parts.netloc, timeout=timeout)
+        while True:
+            with lock:
+                if remaining() <= 0:
+                    break
+                path = prefix + next_path()
+            started = time.perf_counter()
+            try:
+                connection.request('GET', path)
+                response = connection.getresponse()
+                response.read()
+                ok = response.status < 500
+            except (OSError, http.client.HTTPException):
+                ok = False
+                connection.close()
+                connection = connection_class(parts.netloc, timeout=timeout)
+            latency = time.perf_counter() - started
+            with lock:
+                if ok:
+                    latencies.append(latency)
+                else:
+                    errors[0] += 1
+        connection.close()
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, time.perf_counter() - started, errors[0])
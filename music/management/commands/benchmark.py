@@ -0,0 +1,75 @@
+"""Management command that benchmarks every route of the music app (see music/benchmark.py):
+    manage.py@<project_site>  > benchmark [--mode client|server] [--route <name> ...] [--requests <n>]
+                                          [--concurrency <n>] [--warmup <n>] [--cold]
+                                          [--output <results.json>] [--compare <previous results.json>]
+Seed the database first for meaningful numbers, e.g.:
+    manage.py@<project_site>  > seed_catalogue --performers 1M --clear
+With --compare, the changes of throughput, latency percentiles and queries per request against a previous run
+are reported, and the changes beyond --threshold are highlighted.
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from music import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Measures the throughput, latency percentiles and queries per request of the routes of the music app.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=sorted(benchmark.FETCHERS), default='client',
+                            help='Through the test client, or over HTTP from a local WSGI server (default: client).')
+        parser.add_argument('--route', action='append', dest='routes',
+                            help='Route to benchmark (the name of the URL pattern); can be repeated (default: all).')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per route (default: 200).')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent workers (default: 8).')
+        parser.add_argument('--warmup', type=int, default=10, help='Warm-up requests per route (default: 10).')
+        parser.add_argument('--cold', action='store_true', help='Clear the cache before every request.')
+        parser.add_argument('--output', help='Save the results to this JSON file.')
+        parser.add_argument('--compare', help='Compare with the results of a previous run (a JSON file).')
+        parser.add_argument('--threshold', type=float, default=0.1,
+                            help='Relative change to highlight with --compare (default: 0.1, i.e. 10%%).')
+
+    def handle(self, *args, **options):
+        unknown = set(options['routes'] or ()) - set(benchmark.routes())
+        if unknown:
+            raise CommandError(f'Unknown routes: {", ".join(sorted(unknown))}.')
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests and --concurrency must be positive.')
+        previous = None
+        if options['compare']:
+            try:
+                with open(options['compare'], encoding='utf-8') as f:
+                    previous = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Cannot read {options["compare"]}: {e}')
+
+        self.stdout.write(f'{"route":26}{"req/s":>9}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"queries":>9}'
+                          f'{"errors":>8}')
+
+        def on_route(name, result):
+            queries = '-' if result['queries_mean'] is None else f'{result["queries_mean"]:.1f}'
+            self.stdout.write(f'{name:26}{result["rps"]:9.1f}{result["p50_ms"]:9.2f}{result["p95_ms"]:9.2f}'
+                              f'{result["p99_ms"]:9.2f}{queries:>9}{result["errors"]:8d}')
+
+        results = benchmark.run(options['mode'], options['routes'], options['requests'], options['concurrency'],
+                                options['warmup'], options['cold'], on_route=on_route)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f'Results saved to {options["output"]}.')
+
+        if previous is not None:
+            self.stdout.write(f'Compared with {options["compare"]} (commit {previous.get("commit") or "unknown"}):')
+            for name, metric, before, after, change in benchmark.compare(previous, results):
+                line = f'  {name:26}{metric:14}{before:10.2f} -> {after:10.2f}'
+                if change is None:
+                    self.stdout.write(line)
+                    continue
+                line += f'  {change:+.1%}'
+                # Higher is better for the throughput, lower for the rest
+                worse = change < -options['threshold'] if metric == 'rps' else change > options['threshold']
+                better = change > options['threshold'] if metric == 'rps' else change < -options['threshold']
+                self.stdout.write(self.style.ERROR(line) if worse else self.style.SUCCESS(line) if better else line)
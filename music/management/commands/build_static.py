@@ -0,0 +1,69 @@
+"""Management command that builds the static files into STATIC_ROOT (see music/assets.py) and reports their sizes:
+    manage.py@<project_site>  > build_static [--no-clear]
+It runs collectstatic (content-hashed names, .gz/.br variants, resized WebP/JPEG variants of the images)
+and then shows the total original size and the total size actually transferred (with -v 2, for every file):
+the smallest compressed variant for text files, the range of the resized variants for images.
+The .br variants need the brotli package, the image variants need Pillow; without them these steps are skipped.
+"""
+
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from music import assets
+
+
+def file_size(name):
+    path = os.path.join(settings.STATIC_ROOT, name)
+    return os.path.getsize(path) if os.path.isfile(path) else None
+
+
+def kilobytes(size):
+    return f'{size / 1024:.1f} KB'
+
+
+class Command(BaseCommand):
+    help = 'Collects the static files with hashed names, compressed and resized variants, and reports their sizes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-clear', action='store_true',
+                            help='Keep the files of previous builds in STATIC_ROOT.')
+
+    def handle(self, *args, **options):
+        call_command('collectstatic', interactive=False, clear=not options['no_clear'],
+                     verbosity=max(options['verbosity'] - 1, 0))
+        if assets.brotli is None:
+            self.stdout.write('brotli is not installed: no .br variants were built.')
+        if assets.Image is None:
+            self.stdout.write('Pillow is not installed: no resized image variants were built.')
+
+        storage = staticfiles_storage
+        storage.hashed_files, storage.manifest_hash = storage.load_manifest()
+        storage.responsive_images = storage.load_responsive_manifest()
+        total_original = total_transferred = 0
+        for name in sorted(storage.hashed_files):
+            hashed_name = storage.hashed_files[name]
+            original = file_size(hashed_name)
+            if original is None:
+                continue
+            responsive = storage.responsive_images.get(name)
+            if responsive:
+                sizes = [file_size(variant['name']) for variant in responsive['variants']]
+                line = (f'{hashed_name}: {kilobytes(original)}, {len(sizes)} variants '
+                        f'of {kilobytes(min(sizes))} - {kilobytes(max(sizes))}')
+                transferred = min(original, max(sizes))
+            else:
+                encoded = [size for size in (file_size(hashed_name + '.br'), file_size(hashed_name + '.gz')) if size]
+                transferred = min(encoded + [original])
+                line = f'{hashed_name}: {kilobytes(original)} -> {kilobytes(transferred)}'
+            if options['verbosity'] >= 2:
+                self.stdout.write(line)
+            total_original += original
+            total_transferred += transferred
+        if total_original:
+            self.stdout.write(f'Total: {kilobytes(total_original)} -> at most {kilobytes(total_transferred)} '
+                              f'({1 - total_transferred / total_original:.0%} less), '
+                              f'cacheable for {assets.IMMUTABLE_MAX_AGE // 86400} days.')
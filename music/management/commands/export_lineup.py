@@ -0,0 +1,29 @@
+"""Management command that streams all performers or festivals to a CSV or NDJSON file (or the standard output):
+    manage.py@<project_site>  > export_lineup --model performers|festivals [--format csv|ndjson] [--output <file>]
+Memory use does not depend on the table size, see music/exporter.py.
+"""
+
+from django.core.management.base import BaseCommand
+
+from music.exporter import EXPORTS, FORMATS, CHUNK_SIZE, export_chunks
+
+
+class Command(BaseCommand):
+    help = 'Streams performers or festivals to a CSV/NDJSON file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=list(EXPORTS), required=True)
+        parser.add_argument('--format', choices=list(FORMATS), default='csv')
+        parser.add_argument('--output', default='-', help="Output file ('-' for the standard output, the default).")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                            help=f'Number of rows fetched from the database at a time (default: {CHUNK_SIZE}).')
+
+    def handle(self, *args, **options):
+        chunks = export_chunks(options['model'], options['format'], options['chunk_size'])
+        if options['output'] == '-':
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+            for chunk in chunks:
+                output.write(chunk)
@@ -0,0 +1,47 @@
+"""Management command that shows the precomputed lineup/catalogue statistics (see music/stats.py):
+    manage.py@<project_site>  > festival_stats [--rebuild] [--top <n>]
+The statistics are maintained incrementally by signals, so they can drift after bulk operations
+that bypass the signals, or raw SQL; --rebuild recomputes them from scratch first
+(one grouped query per statistic) and reports the rows that were out of date.
+"""
+
+from django.core.management.base import BaseCommand
+
+from music import stats
+from music.models import CatalogueStat, FestivalLineupStats
+
+
+def snapshot():
+    return (set(FestivalLineupStats.objects.values_list('festival_id', 'n_performers', 'n_bands', 'n_musicians')),
+            set(CatalogueStat.objects.values_list('dimension', 'key', 'value')))
+
+
+class Command(BaseCommand):
+    help = 'Shows (and optionally rebuilds) the festival lineup and catalogue statistics.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Recompute the statistics from scratch first.')
+        parser.add_argument('--top', type=int, default=10, help='Number of festivals/locations to show (default: 10).')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            before = snapshot()
+            stats.rebuild()
+            after = snapshot()
+            drift = sum(len(old ^ new) for old, new in zip(before, after))
+            self.stdout.write(f'Statistics rebuilt ({drift} rows were out of date).')
+
+        summary = stats.summary(limit=options['top'])
+        self.stdout.write(f'Performers: {summary["bands"]} bands, {summary["musicians"]} solo musicians')
+        self.stdout.write(f'Festivals: {summary["festivals"]}, '
+                          f'{summary["average_lineup"]:.1f} performers per lineup on average')
+        self.stdout.write('Largest lineups:')
+        for row in summary['ranking']:
+            self.stdout.write(f'  {row.festival.name}: {row.n_performers} '
+                              f'({row.n_bands} bands, {row.n_musicians} solo musicians)')
+        self.stdout.write('Festivals per year:')
+        for year, n in summary['years']:
+            self.stdout.write(f'  {year or "unknown"}: {n}')
+        self.stdout.write('Festivals per location:')
+        for location, n in summary['locations']:
+            self.stdout.write(f'  {location}: {n}')
@@ -0,0 +1,25 @@
+"""Management command that shows the hit/miss statistics of the detail page fragment cache:
+    manage.py@<project_site>  > fragment_cache_stats [--reset]
+The statistics are kept in the cache itself, so with LocMemCache they are per process
+(run the command against a shared backend, e.g. FileBasedCache, to see the numbers of the running server).
+'stale' counts the fragments that were found, but had been invalidated by a save/delete in the meantime.
+"""
+
+from django.core.management.base import BaseCommand
+
+from music import fragments
+
+
+class Command(BaseCommand):
+    help = 'Shows (and optionally resets) the hit/miss statistics of the fragment cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the statistics after showing them.')
+
+    def handle(self, *args, **options):
+        for name, counts in fragments.stats().items():
+            self.stdout.write(f'{name}: {counts["hits"]} hits, {counts["misses"]} misses, '
+                              f'{counts["stale"]} stale, hit ratio {counts["hit_ratio"]:.1%}')
+        if options['reset']:
+            fragments.reset_stats()
+            self.stdout.write('Statistics reset.')
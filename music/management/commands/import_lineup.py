@@ -0,0 +1,50 @@
+"""Management command that bulk-imports performers or festivals from a CSV or NDJSON file:
+    manage.py@<project_site>  > import_lineup <file> --model performers|festivals
+                                              [--format csv|ndjson] [--batch-size <n>] [--create-festivals]
+The file is streamed, validated row by row and written with bulk_create() in batches (see music/importer.py).
+Invalid rows are skipped and reported; the throughput (rows per second) is reported at the end.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from music.importer import LineupImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Streams performers or festivals from a CSV/NDJSON file into the database with bulk_create().'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or NDJSON file ('-' for the standard input).")
+        parser.add_argument('--model', choices=['performers', 'festivals'], required=True)
+        parser.add_argument('--format', choices=['csv', 'ndjson'],
+                            help='File format (default: guessed from the file extension).')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Number of rows per bulk_create()/transaction (default: 5000).')
+        parser.add_argument('--create-festivals', action='store_true',
+                            help='Create the festivals of performers that do not exist yet (by name).')
+        parser.add_argument('--max-reported-errors', type=int, default=20,
+                            help='Number of invalid rows to report individually (default: 20).')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive.')
+
+        def on_error(number, message):
+            if importer.errors <= options['max_reported_errors']:
+                self.stderr.write(f'row {number}: {message}')
+
+        def on_batch(importer):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{importer.created} rows imported ({importer.rows_per_second:.0f} rows/s)')
+
+        importer = LineupImporter(options['model'], batch_size=options['batch_size'],
+                                  create_festivals=options['create_festivals'],
+                                  on_error=on_error, on_batch=on_batch)
+        try:
+            importer.run(read_rows(options['path'], options['format']))
+        except OSError as e:
+            raise CommandError(f'Cannot read {options["path"]}: {e}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{importer.created} {options["model"]} imported, {importer.errors} invalid rows skipped, '
+            f'in {importer.elapsed:.2f} s ({importer.rows_per_second:.0f} rows/s).'))
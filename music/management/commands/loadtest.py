@@ -0,0 +1,49 @@
+"""Management command that load-tests running servers and compares them, e.g. the WSGI and the ASGI deployment:
+    manage.py@<project_site>  > loadtest --target wsgi=http://127.0.0.1:8000 --target asgi=http://127.0.0.1:8001
+                                         [--concurrency <n>] [--requests <n>] [--path <path> ...]
+Start the servers first, with the same number of workers, e.g.:
+    gunicorn woodstock_dj.wsgi --workers 4 --threads 8 --bind 127.0.0.1:8000
+    uvicorn woodstock_dj.asgi:application --workers 4 --port 8001
+The load generator (music/loadtest.py) runs in this process, so use another machine (or core)
+for the servers if the numbers are to be trusted.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from music import loadtest
+
+
+DEFAULT_PATHS = ['/music/', '/music/performers/', '/music/festivals/']
+
+
+class Command(BaseCommand):
+    help = 'Compares requests per second and latency percentiles of running servers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', required=True,
+                            help='<name>=<base URL> of a running server; can be repeated.')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help=f'Path to request; can be repeated (default: {" ".join(DEFAULT_PATHS)}).')
+        parser.add_argument('--concurrency', type=int, default=50, help='Concurrent clients (default: 50).')
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per target (default: 2000).')
+        parser.add_argument('--warmup', type=int, default=100, help='Warm-up requests per target (default: 100).')
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options['target']:
+            name, sep, url = target.partition('=')
+            if not sep or not url.startswith(('http://', 'https://')):
+                raise CommandError(f'Invalid target {target!r}, expected <name>=<base URL>.')
+            targets.append((name, url))
+        paths = options['paths'] or DEFAULT_PATHS
+
+        results = {}
+        for name, url in targets:
+            self.stdout.write(f'{name}: {options["requests"]} requests, {options["concurrency"]} concurrent, {url}')
+            loadtest.run(url, paths, options['concurrency'], options['warmup'])
+            results[name] = loadtest.run(url, paths, options['concurrency'], options['requests'])
+
+        self.stdout.write(f'{"":10}{"req/s":>10}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"errors":>8}')
+        for name, result in results.items():
+            self.stdout.write(f'{name:10}{result["rps"]:10.1f}{result["p50_ms"]:10.1f}{result["p95_ms"]:10.1f}'
+                              f'{result["p99_ms"]:10.1f}{result["errors"]:8d}')
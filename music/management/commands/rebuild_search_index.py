@@ -0,0 +1,19 @@
+"""Management command that (re-)creates the full-text search tables and triggers and rebuilds the index
+from the performer and festival tables (SQLite only), see music/search.py:
+    manage.py@<project_site>  > rebuild_search_index
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from music import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the FTS5 search index of performers and festivals.'
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('The full-text search index is only used with SQLite.')
+        search.install(connection, rebuild=True)
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt.'))
@@ -0,0 +1,22 @@
+"""Management command that repairs the denormalized Performer/Festival counters:
+    manage.py@<project_site>  > reconcile_counters
+The counters are maintained incrementally by signals, so they can drift after bulk operations
+that bypass the signals, or raw SQL. Run this command periodically (e.g., from cron) to fix any drift.
+"""
+
+from django.core.management.base import BaseCommand
+
+from music import counters
+from music.models import CatalogueCounter
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the denormalized Performer/Festival counters with COUNT(*).'
+
+    def handle(self, *args, **options):
+        stored = dict(CatalogueCounter.objects.values_list('name', 'value'))
+        for model, count in counters.reconcile().items():
+            name = counters.counter_name(model)
+            old = stored.get(name)
+            drift = '' if old == count else f' (was {old})'
+            self.stdout.write(f'{name}: {count}{drift}')
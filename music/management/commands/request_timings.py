@@ -0,0 +1,59 @@
+"""Management command that shows the rolling per-route request timings recorded by woodstock_dj/instrumentation.py:
+    manage.py@<project_site>  > request_timings [--route <name>] [--reset]
+For each route (the name of the URL pattern), over its last settings.TIMING_WINDOW requests:
+the number of requests, the p50/p90/p99/max of the total time, the p90 of the time spent in SQL queries
+and in templates, and the average number of queries.
+The timings are published to the cache by each process of the server every settings.TIMING_PUBLISH_SECONDS,
+so with LocMemCache they are per process (run the command against a shared backend, e.g. FileBasedCache,
+to see the numbers of the running server).
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from music.loadtest import percentile
+from woodstock_dj import instrumentation
+
+
+def route_summary(samples):
+    """Percentiles (in ms) of the (total_ms, db_ms, queries, template_ms) samples of a route."""
+
+    totals, db, queries, templates = (sorted(values) for values in zip(*samples))
+    return {
+        'requests': len(samples),
+        'p50_ms': percentile(totals, 50),
+        'p90_ms': percentile(totals, 90),
+        'p99_ms': percentile(totals, 99),
+        'max_ms': totals[-1],
+        'db_p90_ms': percentile(db, 90),
+        'template_p90_ms': percentile(templates, 90),
+        'queries': sum(queries) / len(queries),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Shows (and optionally resets) the request time percentiles per route.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--route', help='Show only this route (the name of the URL pattern).')
+        parser.add_argument('--reset', action='store_true', help='Reset the timings after showing them.')
+
+    def handle(self, *args, **options):
+        routes = instrumentation.collect()
+        if options['route']:
+            if options['route'] not in routes:
+                raise CommandError(f'No timings recorded for the route {options["route"]!r}.')
+            routes = {options['route']: routes[options['route']]}
+
+        if not routes:
+            self.stdout.write('No timings recorded yet.')
+        else:
+            self.stdout.write(f'{"route":32}{"requests":>9}{"p50":>9}{"p90":>9}{"p99":>9}{"max":>9}'
+                              f'{"db p90":>9}{"tpl p90":>9}{"queries":>9}   (times in ms)')
+        summaries = {route: route_summary(samples) for route, samples in routes.items()}
+        for route, summary in sorted(summaries.items(), key=lambda item: -item[1]['p90_ms']):
+            self.stdout.write(f'{route:32}{summary["requests"]:9}{summary["p50_ms"]:9.1f}{summary["p90_ms"]:9.1f}'
+                              f'{summary["p99_ms"]:9.1f}{summary["max_ms"]:9.1f}{summary["db_p90_ms"]:9.1f}'
+                              f'{summary["template_p90_ms"]:9.1f}{summary["queries"]:9.1f}')
+        if options['reset']:
+            instrumentation.reset()
+            self.stdout.write('Timings reset.')
@@ -0,0 +1,50 @@
+"""Management command that fills the database with a synthetic catalogue (see music/seeding.py):
+    manage.py@<project_site>  > seed_catalogue --performers 1k|100k|1M|10M [--festivals <n>] [--seed <n>]
+                                                [--batch-size <n>] [--clear]
+The festivals default to one per PERFORMERS_PER_FESTIVAL performers, with skewed lineup sizes.
+The same --performers, --festivals and --seed always produce the same catalogue; with --clear,
+the existing performers and festivals are deleted first, so benchmark runs start from the same data.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from music import seeding
+
+
+class Command(BaseCommand):
+    help = 'Generates a synthetic catalogue of festivals and performers with bulk_create().'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--performers', default='1k',
+                            help='Number of performers, e.g. 5000, 100k or 10M (default: 1k).')
+        parser.add_argument('--festivals', help='Number of festivals (default: one per '
+                                                f'{seeding.PERFORMERS_PER_FESTIVAL} performers).')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the random generator (default: 0).')
+        parser.add_argument('--batch-size', type=int, default=10000,
+                            help='Number of rows per bulk_create()/transaction (default: 10000).')
+        parser.add_argument('--clear', action='store_true', help='Delete all performers and festivals first.')
+
+    def handle(self, *args, **options):
+        try:
+            performers = seeding.parse_count(options['performers'])
+            festivals = seeding.parse_count(options['festivals']) if options['festivals'] else None
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive.')
+
+        if options['clear']:
+            seeding.clear()
+            self.stdout.write('Existing performers and festivals deleted.')
+
+        def on_batch(seeder):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{seeder.festival_count} festivals, {seeder.performer_count} performers '
+                                  f'({seeder.elapsed:.1f} s)')
+
+        seeder = seeding.CatalogueSeeder(performers, festivals, seed=options['seed'],
+                                         batch_size=options['batch_size'], on_batch=on_batch).run()
+        rows = seeder.festival_count + seeder.performer_count
+        self.stdout.write(self.style.SUCCESS(
+            f'{seeder.festival_count} festivals and {seeder.performer_count} performers created '
+            f'in {seeder.elapsed:.2f} s ({rows / seeder.elapsed if seeder.elapsed else 0:.0f} rows/s).'))
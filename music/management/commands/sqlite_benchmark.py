@@ -0,0 +1,105 @@
+"""Management command that compares SQLite read/write throughput under concurrency,
+with the default connection settings and with the tuned ones (settings.SQLITE_PRAGMAS, see woodstock_dj/database.py):
+    manage.py@<project_site>  > sqlite_benchmark [--readers <n>] [--writers <n>] [--seconds <s>] [--rows <n>]
+Each configuration runs against a fresh temporary database (never against db.sqlite3) with a performer-like table.
+Reader threads run page-sized range queries by name (like the performer list), writer threads run short
+update/insert transactions (like PerformerUpdateView/PerformerCreateView); every thread has its own connection.
+"""
+
+import os
+import random
+import sqlite3
+import string
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from woodstock_dj.database import apply_pragmas, sqlite_pragmas
+
+
+def random_name():
+    return ''.join(random.choices(string.ascii_lowercase, k=12))
+
+
+class Command(BaseCommand):
+    help = 'Compares concurrent SQLite read/write throughput with default and tuned PRAGMAs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4, help='Number of reader threads (default: 4).')
+        parser.add_argument('--writers', type=int, default=2, help='Number of writer threads (default: 2).')
+        parser.add_argument('--seconds', type=float, default=5.0, help='Duration of each run (default: 5).')
+        parser.add_argument('--rows', type=int, default=100000, help='Number of rows in the table (default: 100000).')
+
+    def create_database(self, path, rows):
+        db = sqlite3.connect(path)
+        db.execute('CREATE TABLE performer (id INTEGER PRIMARY KEY, name VARCHAR(100), is_band BOOL)')
+        db.execute('CREATE INDEX performer_name_id_idx ON performer (name, id)')
+        db.executemany('INSERT INTO performer (name, is_band) VALUES (?, ?)',
+                       ((random_name(), random.random() < 0.5) for _ in range(rows)))
+        db.commit()
+        db.close()
+
+    def run_configuration(self, pragmas, options):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'benchmark.sqlite3')
+            self.create_database(path, options['rows'])
+            counts = {'reads': 0, 'writes': 0, 'busy': 0}
+            lock = threading.Lock()
+            deadline = time.perf_counter() + options['seconds']
+
+            def count(key):
+                with lock:
+                    counts[key] += 1
+
+            def reader():
+                db = sqlite3.connect(path, timeout=5)
+                apply_pragmas(db, pragmas)
+                while time.perf_counter() < deadline:
+                    try:
+                        db.execute('SELECT id, name FROM performer WHERE name >= ? ORDER BY name, id LIMIT 50',
+                                   (random_name(),)).fetchall()
+                        count('reads')
+                    except sqlite3.OperationalError:
+                        count('busy')
+                db.close()
+
+            def writer():
+                db = sqlite3.connect(path, timeout=5)
+                apply_pragmas(db, pragmas)
+                while time.perf_counter() < deadline:
+                    try:
+                        with db:
+                            db.execute('UPDATE performer SET name = ? WHERE id = ?',
+                                       (random_name(), random.randint(1, options['rows'])))
+                            db.execute('INSERT INTO performer (name, is_band) VALUES (?, 0)', (random_name(),))
+                        count('writes')
+                    except sqlite3.OperationalError:
+                        count('busy')
+                db.close()
+
+            threads = ([threading.Thread(target=reader) for _ in range(options['readers'])] +
+                       [threading.Thread(target=writer) for _ in range(options['writers'])])
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            return {key: value / options['seconds'] for key, value in counts.items()}
+
+    def handle(self, *args, **options):
+        configurations = [
+            ('default', {}),
+            ('tuned', sqlite_pragmas()),
+        ]
+        results = {}
+        for name, pragmas in configurations:
+            self.stdout.write(f'Running {name} configuration for {options["seconds"]:.0f} s...')
+            results[name] = self.run_configuration(pragmas, options)
+
+        self.stdout.write(f'{"":10}{"reads/s":>12}{"writes/s":>12}{"busy/s":>12}')
+        for name, result in results.items():
+            self.stdout.write(f'{name:10}{result["reads"]:12.0f}{result["writes"]:12.0f}{result["busy"]:12.1f}')
+        if results['default']['reads']:
+            speedup = results['tuned']['reads'] / results['default']['reads']
+            self.stdout.write(f'Read throughput: {speedup:.1f}x with the tuned settings.')
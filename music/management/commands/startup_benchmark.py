@@ -0,0 +1,70 @@
+"""Management command that measures the cold start of the project:
+    manage.py@<project_site>  > startup_benchmark [--runs <n>] [--max-seconds <s>] [--max-modules <n>]
+Every run starts a fresh Python interpreter (the current process has Django loaded already),
+times django.setup() and counts the modules imported in order to load woodstock_dj.wsgi.application.
+The command fails (exits with a non-zero status) if the median of either measurement exceeds its budget,
+so it can be used in CI to catch heavy imports (like a stray module-level import of nbconvert in music.models).
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Executed in a fresh interpreter; prints the measurements as JSON
+PROBE = """
+import json, os, sys, time
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', %(settings_module)r)
+modules_before = len(sys.modules)
+t0 = time.perf_counter()
+import django
+django.setup()
+t1 = time.perf_counter()
+from woodstock_dj.wsgi import application
+t2 = time.perf_counter()
+print(json.dumps({'setup': t1 - t0, 'wsgi': t2 - t0, 'modules': len(sys.modules) - modules_before}))
+"""
+
+
+class Command(BaseCommand):
+    help = 'Measures django.setup() time and the number of modules imported by the WSGI application.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5,
+                            help='Number of fresh interpreters to measure (default: 5).')
+        parser.add_argument('--max-seconds', type=float, default=1.0,
+                            help='Budget for the median django.setup() time in seconds (default: 1.0).')
+        parser.add_argument('--max-modules', type=int, default=800,
+                            help='Budget for the number of modules imported by the WSGI application (default: 800).')
+
+    def measure(self):
+        settings_module = os.environ.get('DJANGO_SETTINGS_MODULE', 'woodstock_dj.settings')
+        result = subprocess.run([sys.executable, '-c', PROBE % {'settings_module': settings_module}],
+                                cwd=settings.BASE_DIR, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise CommandError(f'Startup probe failed:\n{result.stderr}')
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def handle(self, *args, **options):
+        runs = [self.measure() for _ in range(max(options['runs'], 1))]
+        setup = statistics.median(run['setup'] for run in runs)
+        wsgi = statistics.median(run['wsgi'] for run in runs)
+        modules = max(run['modules'] for run in runs)
+
+        self.stdout.write(f'django.setup():          {setup * 1000:8.1f} ms (median of {len(runs)} runs)')
+        self.stdout.write(f'WSGI application ready:  {wsgi * 1000:8.1f} ms')
+        self.stdout.write(f'Modules imported:        {modules:8d}')
+
+        failures = []
+        if setup > options['max_seconds']:
+            failures.append(f'django.setup() took {setup:.3f} s, budget is {options["max_seconds"]:.3f} s')
+        if modules > options['max_modules']:
+            failures.append(f'{modules} modules imported, budget is {options["max_modules"]}')
+        if failures:
+            raise CommandError('Startup budget exceeded: ' + '; '.join(failures))
+        self.stdout.write(self.style.SUCCESS('Startup within budget.'))
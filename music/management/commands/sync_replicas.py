@@ -0,0 +1,35 @@
+"""Management command that copies the primary SQLite database to the local stand-in read replicas:
+    manage.py@<project_site>  > sync_replicas
+It uses SQLite's online backup API, so it is safe to run while the server is writing to the primary
+(run it, e.g., from cron to emulate replication lag). See woodstock_dj/routers.py.
+"""
+
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from woodstock_dj.routers import replicas
+
+
+class Command(BaseCommand):
+    help = 'Copies the primary SQLite database to the stand-in read replicas.'
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES['default']
+        if not replicas():
+            raise CommandError('No replicas configured (see DATABASE_REPLICAS in settings/base.py).')
+        for alias in replicas():
+            replica = settings.DATABASES[alias]
+            if 'sqlite3' not in primary['ENGINE'] or 'sqlite3' not in replica['ENGINE']:
+                raise CommandError(f'{alias}: only SQLite stand-in replicas can be synced by this command.')
+            connections[alias].close()
+            source = sqlite3.connect(primary['NAME'])
+            target = sqlite3.connect(replica['NAME'])
+            try:
+                source.backup(target)
+            finally:
+                source.close()
+                target.close()
+            self.stdout.write(f'{alias}: synced from {primary["NAME"]}')
@@ -0,0 +1,158 @@
+"""Management command that measures how long the templates of the music app take to render:
+    manage.py@<project_site>  > template_benchmark [--sizes <n> ...] [--repeat <n>] [--template <name> ...]
+Every template in templates/music/ (including the cached fragments) is rendered with synthetic contexts
+of 10 to 100,000 performers/festivals (unsaved model instances, so no query is run while rendering).
+For each template and size it reports the best render time of --repeat runs, the time per row,
+the number of {% url %} tags per row and the share of the render time spent reversing those URLs
+(estimated from the measured cost of one {% url %} tag) - a high share marks a page whose links are worth
+precomputing. It also compares loading a template through the plain loaders (re-reading and
+re-compiling it every time) and the cached loader (see settings/prod.py).
+"""
+
+import datetime
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.forms import modelform_factory
+from django.template import Context, Engine, Template
+from django.template.defaulttags import ForNode, URLNode
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from music.models import Performer, Festival
+
+
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000]
+TEMPLATE_DIR = os.path.join(settings.BASE_DIR, 'templates')
+PLAIN_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+
+def music_templates():
+    """The names of the templates in templates/music/, e.g. 'music/performer-list.html'."""
+
+    names = []
+    for directory, _, files in os.walk(os.path.join(TEMPLATE_DIR, 'music')):
+        for file_name in files:
+            if file_name.endswith('.html'):
+                names.append(os.path.relpath(os.path.join(directory, file_name), TEMPLATE_DIR).replace(os.sep, '/'))
+    return sorted(names)
+
+
+def synthetic_context(size):
+    """A context with size performers and size festivals, with the variables used by all the music templates."""
+
+    start = datetime.date(1969, 1, 1)
+    festivals = []
+    for i in range(1, size + 1):
+        festival = Festival(pk=i, name=f'Festival {i}', location=f'Location {i % 100}',
+                            start=start + datetime.timedelta(days=i % 365), end=None)
+        festival.n_performers = i % 50
+        festivals.append(festival)
+    festival = Festival(pk=size + 1, name='Woodstock', location='Bethel, NY',
+                        start=datetime.date(1969, 8, 15), end=datetime.date(1969, 8, 18))
+    performers = [Performer(pk=i, name=f'Performer {i}', is_band=bool(i % 2), festival=festival)
+                  for i in range(1, size + 1)]
+
+    # The festival's lineup, as prefetched by Festival.objects.with_lineup()
+    lineup = Performer.objects.none()
+    lineup._result_cache = performers
+    lineup._prefetch_done = True
+    festival._prefetched_objects_cache = {'performer_set': lineup}
+    festival.n_performers = size
+
+    months = [(datetime.date(1969, month, 1), [f for f in festivals if f.start.month == month])
+              for month in range(1, 13)]
+    performer_form = modelform_factory(Performer, fields=['name', 'is_band', 'festival'])()
+    performer_form.fields['festival'].choices = [('', '---------')] + [(f.pk, f.name) for f in festivals]
+    return {
+        'performer_list': performers, 'festival_list': festivals, 'is_paginated': False,
+        'performers': performers, 'festivals': festivals, 'search_query': 'festival',
+        'performer': performers[0] if performers else Performer(pk=1, name='Performer', festival=festival),
+        'festival': festival, 'more_festivals': festivals,
+        'year': 1969, 'previous_year': 1968, 'next_year': 1970, 'months': months,
+        'fragment': mark_safe(''), 'n_p': size, 'n_f': size, 'csrf_token': 'benchmark',
+        'forms': {
+            'music/performer-form.html': performer_form,
+            'music/festival-form.html': modelform_factory(Festival, fields=['name', 'start', 'end', 'location'])(),
+        },
+    }
+
+
+def urls_per_row(template):
+    """The number of {% url %} tags in the body of the template's (largest) {% for %} loop."""
+
+    loops = template.template.nodelist.get_nodes_by_type(ForNode)
+    return max((len(loop.nodelist_loop.get_nodes_by_type(URLNode)) for loop in loops), default=0)
+
+
+def best_time(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+class Command(BaseCommand):
+    help = 'Renders the music templates with synthetic contexts of 10 to 100k rows and reports the render times.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                            help=f'Numbers of performers/festivals in the contexts (default: {DEFAULT_SIZES}).')
+        parser.add_argument('--repeat', type=int, default=3, help='Renders per measurement (default: 3).')
+        parser.add_argument('--template', nargs='+', dest='templates',
+                            help='Templates to render (default: all of templates/music/).')
+
+    def url_cost(self, repeat):
+        """The cost of one {% url %} tag: the time of a loop with the tag minus the same loop without it."""
+
+        rows = [Performer(pk=i) for i in range(1, 10001)]
+        context = Context({'rows': rows})
+        with_url = Template("{% for p in rows %}{% url 'performer-detail' p.pk %}{% endfor %}")
+        without_url = Template("{% for p in rows %}{{ p.pk }}{% endfor %}")
+        difference = (best_time(lambda: with_url.render(context), repeat) -
+                      best_time(lambda: without_url.render(context), repeat))
+        return max(difference, 0) / len(rows)
+
+    def loader_cost(self, names, repeat):
+        """The average time of loading (finding, reading and compiling) a template with the plain and cached loaders."""
+
+        results = {}
+        libraries = Engine.get_default().libraries
+        for label, loaders in (('plain', PLAIN_LOADERS),
+                               ('cached', [('django.template.loaders.cached.Loader', PLAIN_LOADERS)])):
+            engine = Engine(dirs=[TEMPLATE_DIR], loaders=loaders, libraries=libraries)
+            start = time.perf_counter()
+            for _ in range(repeat * 10):
+                for name in names:
+                    engine.get_template(name)
+            results[label] = (time.perf_counter() - start) / (repeat * 10 * len(names))
+        return results
+
+    def handle(self, *args, **options):
+        names = options['templates'] or music_templates()
+        repeat = max(options['repeat'], 1)
+
+        url_cost = self.url_cost(repeat)
+        self.stdout.write(f'{{% url %}}: {url_cost * 1e6:.2f} us per tag')
+        loading = self.loader_cost(names, repeat)
+        self.stdout.write(f'Loading a template: {loading["plain"] * 1e6:.0f} us with the plain loaders, '
+                          f'{loading["cached"] * 1e6:.1f} us with the cached loader')
+
+        self.stdout.write(f'{"template":40}{"rows":>8}{"render ms":>12}{"us/row":>10}{"urls/row":>10}{"url share":>11}')
+        for size in options['sizes']:
+            context = synthetic_context(size)
+            for name in names:
+                template = get_template(name)
+                template_context = dict(context, form=context['forms'].get(name))
+                elapsed = best_time(lambda: template.render(template_context), repeat)
+                urls = urls_per_row(template)
+                share = min(size * urls * url_cost / elapsed, 1.0) if elapsed else 0.0
+                self.stdout.write(f'{name:40}{size:8}{elapsed * 1000:12.2f}{elapsed / size * 1e6:10.2f}'
+                                  f'{urls:10}{share:11.0%}')
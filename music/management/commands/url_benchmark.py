@@ -0,0 +1,67 @@
+"""Management command that compares building the URLs of many rows with reverse() and with music/urlbuilder.py:
+    manage.py@<project_site>  > url_benchmark [--rows <n>] [--repeat <n>]
+It measures, per URL:
+    - reverse('performer-detail', args=[pk]) and urlbuilder.pk_url('performer-detail', pk)
+    - a template loop with {% url 'performer-detail' performer.pk %}
+      and with {{ performer.pk|pk_url:'performer-detail' }}
+(the best of --repeat runs over --rows unsaved performers, so no query is involved).
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.template import Context, Template
+from django.urls import reverse
+
+from music import urlbuilder
+from music.models import Performer
+
+
+def best_time(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+class Command(BaseCommand):
+    help = 'Compares reverse() and {% url %} with the precomputed pk URLs of music/urlbuilder.py.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000, help='Number of URLs to build (default: 50000).')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (default: 3).')
+
+    def handle(self, *args, **options):
+        rows, repeat = max(options['rows'], 1), max(options['repeat'], 1)
+        performers = [Performer(pk=pk, name=f'Performer {pk}') for pk in range(1, rows + 1)]
+        pks = [performer.pk for performer in performers]
+
+        with_reverse = [reverse('performer-detail', args=[pk]) for pk in pks]
+        with_builder = [urlbuilder.pk_url('performer-detail', pk) for pk in pks]
+        if with_reverse != with_builder:
+            raise CommandError('urlbuilder.pk_url() and reverse() build different URLs.')
+
+        context = Context({'performers': performers})
+        url_tag = Template("{% for performer in performers %}"
+                           "<a href=\"{% url 'performer-detail' performer.pk %}\">{{ performer.name }}</a>"
+                           "{% endfor %}")
+        url_filter = Template("{% load music_urls %}{% for performer in performers %}"
+                              "<a href=\"{{ performer.pk|pk_url:'performer-detail' }}\">{{ performer.name }}</a>"
+                              "{% endfor %}")
+        if url_tag.render(context) != url_filter.render(context):
+            raise CommandError('The pk_url filter and {% url %} render different links.')
+
+        measurements = [
+            ('reverse()', lambda: [reverse('performer-detail', args=[pk]) for pk in pks]),
+            ('urlbuilder.pk_url()', lambda: [urlbuilder.pk_url('performer-detail', pk) for pk in pks]),
+            ('{% url %} loop', lambda: url_tag.render(context)),
+            ('|pk_url loop', lambda: url_filter.render(context)),
+        ]
+        results = {name: best_time(function, repeat) / rows for name, function in measurements}
+        for name, per_row in results.items():
+            self.stdout.write(f'{name:22}{per_row * 1e6:10.2f} us per URL')
+        self.stdout.write(f'urlbuilder.pk_url() is {results["reverse()"] / results["urlbuilder.pk_url()"]:.1f}x '
+                          f'faster than reverse(); the template loop is '
+                          f'{results["{% url %} loop"] / results["|pk_url loop"]:.1f}x faster with |pk_url.')
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0002_performer_festival'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='festival',
+            index=models.Index(fields=['start', 'id'], name='festival_start_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='performer',
+            index=models.Index(fields=['name', 'id'], name='performer_name_id_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:38
+
+from django.db import migrations, models
+
+
+def seed_counters(apps, schema_editor):
+    # Initialize the counters with the current row counts
+    db_alias = schema_editor.connection.alias
+    CatalogueCounter = apps.get_model('music', 'CatalogueCounter')
+    for model_name in ('performer', 'festival'):
+        model = apps.get_model('music', model_name)
+        CatalogueCounter.objects.using(db_alias).update_or_create(
+            name=f'music.{model_name}', defaults={'value': model.objects.using(db_alias).count()})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0003_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogueCounter',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('value', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:43
+
+from django.db import migrations, models
+
+
+def install_search(apps, schema_editor):
+    # The FTS5 tables and their triggers (SQLite only), see music/search.py
+    from music import search
+    search.install(schema_editor.connection)
+
+
+def uninstall_search(apps, schema_editor):
+    from music import search
+    search.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0004_cataloguecounter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='festival',
+            index=models.Index(fields=['name'], name='festival_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='festival',
+            index=models.Index(fields=['location'], name='festival_location_idx'),
+        ),
+        migrations.RunPython(install_search, uninstall_search),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0005_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='festival',
+            index=models.Index(fields=['start', 'end'], name='festival_start_end_idx'),
+        ),
+    ]
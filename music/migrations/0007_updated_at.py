@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0006_festival_start_end_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='festival',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='performer',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
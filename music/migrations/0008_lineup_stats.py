@@ -0,0 +1,71 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:04
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.db.models.functions import ExtractYear
+import django.db.models.deletion
+
+
+def build_stats(apps, schema_editor):
+    # Materialize the statistics of the existing performers and festivals (see music/stats.py),
+    # with one grouped query per statistic over the historical models
+    db_alias = schema_editor.connection.alias
+    Festival = apps.get_model('music', 'Festival')
+    Performer = apps.get_model('music', 'Performer')
+    FestivalLineupStats = apps.get_model('music', 'FestivalLineupStats')
+    CatalogueStat = apps.get_model('music', 'CatalogueStat')
+    festivals = Festival.objects.using(db_alias).order_by()
+
+    lineups = (festivals
+               .annotate(n=Count('performer'), bands=Count('performer', filter=Q(performer__is_band=True)))
+               .values_list('pk', 'n', 'bands'))
+    FestivalLineupStats.objects.using(db_alias).bulk_create(
+        FestivalLineupStats(festival_id=pk, n_performers=n, n_bands=bands, n_musicians=n - bands)
+        for pk, n, bands in lineups)
+
+    locations = festivals.values('location').annotate(n=Count('id')).values_list('location', 'n')
+    years = (festivals.annotate(year=ExtractYear('start'))
+             .values('year').annotate(n=Count('id')).values_list('year', 'n'))
+    kinds = (Performer.objects.using(db_alias).order_by()
+             .values('is_band').annotate(n=Count('id')).values_list('is_band', 'n'))
+    CatalogueStat.objects.using(db_alias).bulk_create([
+        *(CatalogueStat(dimension='location', key=location, value=n) for location, n in locations),
+        *(CatalogueStat(dimension='year', key='' if year is None else str(year), value=n) for year, n in years),
+        *(CatalogueStat(dimension='kind', key='band' if is_band else 'musician', value=n) for is_band, n in kinds),
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0007_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogueStat',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=20)),
+                ('key', models.CharField(max_length=100)),
+                ('value', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='FestivalLineupStats',
+            fields=[
+                ('festival', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='lineup_stats', serialize=False, to='music.festival')),
+                ('n_performers', models.IntegerField(default=0)),
+                ('n_bands', models.IntegerField(default=0)),
+                ('n_musicians', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-n_performers', 'festival'], name='lineup_stats_size_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='cataloguestat',
+            constraint=models.UniqueConstraint(fields=('dimension', 'key'), name='catalogue_stat_dimension_key_uniq'),
+        ),
+        migrations.RunPython(build_stats, migrations.RunPython.noop),
+    ]
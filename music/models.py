@@ -1,11 +1,11 @@
 from django.db import models
 
 # Create your models here.
-from django.db.models import CharField, BooleanField, DateField, ForeignKey
-from django.urls import reverse
-from nbconvert import export
+from django.db.models import CharField, BooleanField, DateField, DateTimeField, ForeignKey, IntegerField, OneToOneField
+from django.db.models import Count, OuterRef, Prefetch, Q, Subquery, Value
+from django.db.models.functions import Coalesce
 
-from woodstock_dj import settings
+from music.urlbuilder import pk_url
 
 """
 Create some model(s) in the <app>/models.py file
@@ -42,6 +42,66 @@ to see the SQL equivalent of a specific migration
 """
 
 
+class FestivalQuerySet(models.QuerySet):
+    """Custom QuerySet of Festival objects (available as Festival.objects.<method>()).
+    Its methods load everything a festival page renders in a constant number of queries,
+    no matter how many performers a festival has.
+    """
+
+    def with_performer_count(self):
+        """Annotates each festival with n_performers, the size of its lineup.
+        A correlated subquery (using the index on performer.festival_id) is used instead of JOIN + GROUP BY,
+        so that only the festivals actually fetched (e.g., one page of them) get counted.
+        """
+
+        lineup_size = (Performer.objects
+                       .filter(festival=OuterRef('pk'))
+                       .order_by()
+                       .values('festival')
+                       .annotate(n=Count('pk'))
+                       .values('n'))
+        return self.annotate(n_performers=Coalesce(Subquery(lineup_size, output_field=IntegerField()), Value(0)))
+
+    def with_lineup(self):
+        """Annotates each festival with n_performers and prefetches its lineup (festival.performer_set.all)
+        in one additional query, loading only the performer fields that the lineup shows.
+        """
+
+        lineup = Performer.objects.only('id', 'name', 'is_band', 'festival_id').order_by('name', 'id')
+        return self.with_performer_count().prefetch_related(Prefetch('performer_set', queryset=lineup))
+
+    def overlapping(self, start, end):
+        """Returns the festivals that run (at least partly) between the dates start and end (inclusive):
+            festival.start <= end AND festival.end >= start
+        Festivals without a start date never match; a festival without an end date is taken to last one day.
+        The index on (start, end) serves only one bound of the range: the database seeks to the festivals
+        with start <= end and checks the end condition on each of their index entries (without reading the table),
+        so the cost grows with the number of festivals that start before end, not with the number of matches.
+        """
+
+        return self.filter(Q(start__lte=end),
+                           Q(end__gte=start) | Q(end__isnull=True, start__gte=start))
+
+    def active_on(self, date):
+        """Returns the festivals that run on the given date."""
+
+        return self.overlapping(date, date)
+
+
+class PerformerQuerySet(models.QuerySet):
+    """Custom QuerySet of Performer objects (available as Performer.objects.<method>())."""
+
+    def for_list(self):
+        """Loads only the fields shown in lists of performers (the name and the pk for the link)."""
+
+        return self.only('id', 'name')
+
+    def with_festival(self):
+        """Loads each performer's festival in the same query (JOIN) instead of one query per performer."""
+
+        return self.select_related('festival')
+
+
 class Festival(models.Model):
     """The model class describing the concept of a festival.
     It includes a name, location and the start and end dates.
@@ -51,6 +111,33 @@ class Festival(models.Model):
     start = DateField(null=True, blank=True)
     end = DateField(null=True, blank=True)
     location = CharField(max_length=100, default='location unknown')
+    # Set on every save(); used for conditional GET (ETag), see music/conditional.py
+    updated_at = DateTimeField(auto_now=True, db_index=True)
+
+    objects = FestivalQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Supports keyset pagination of festival lists by (start, id)
+            models.Index(fields=['start', 'id'], name='festival_start_id_idx'),
+            # Exact-match lookups and ordering by name/location (full-text search is in music/search.py)
+            models.Index(fields=['name'], name='festival_name_idx'),
+            models.Index(fields=['location'], name='festival_location_idx'),
+            # Date-range and overlap queries, see FestivalQuerySet.overlapping()
+            models.Index(fields=['start', 'end'], name='festival_start_end_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remembers the location and the start date the festival has been loaded with,
+        so that the signal handlers (music/signals.py) can tell which statistics a save changes (see music/stats.py).
+        """
+
+        instance = super().from_db(db, field_names, values)
+        if 'location' in instance.__dict__ and 'start' in instance.__dict__:
+            instance._loaded_location = instance.location
+            instance._loaded_start = instance.start
+        return instance
 
     def __str__(self):
         return f'{self.name} ({self.start.isoformat()} - {self.end.isoformat()}), {self.location}'
@@ -58,9 +145,10 @@ class Festival(models.Model):
     def get_absolute_url(self):
         """Returns the URL to access a particular festival instance.
         Enables specific Festival pages in admin to include "View on site" button.
+        The URL is formatted without reverse(), see music/urlbuilder.py.
         """
 
-        return reverse('festival-detail', args=[str(self.id)])
+        return pk_url('festival-detail', self.id)
 
 
 class Performer(models.Model):
@@ -78,6 +166,30 @@ class Performer(models.Model):
                            choices=musician_or_band,
                            default=False)
     festival = ForeignKey(Festival, null=True, blank=True, on_delete=models.SET_NULL)
+    # Set on every save(); used for conditional GET (ETag), see music/conditional.py
+    updated_at = DateTimeField(auto_now=True, db_index=True)
+
+    objects = PerformerQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Supports keyset pagination of performer lists by (name, id),
+            # as well as exact-match lookups by name (full-text search is in music/search.py)
+            models.Index(fields=['name', 'id'], name='performer_name_id_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remembers the festival (and whether it is a band) the performer has been loaded with,
+        so that the signal handlers (music/signals.py) can tell when a performer moves to another festival.
+        """
+
+        instance = super().from_db(db, field_names, values)
+        if 'festival_id' in instance.__dict__:
+            instance._loaded_festival_id = instance.festival_id
+        if 'is_band' in instance.__dict__:
+            instance._loaded_is_band = instance.is_band
+        return instance
 
     def __str__(self):
         return f'{self.name} (band)' if self.is_band else f'{self.name} (musician)'
@@ -85,8 +197,64 @@ class Performer(models.Model):
     def get_absolute_url(self):
         """Returns the URL to access a particular performer instance.
         Enables specific Performer pages in admin to include "View on site" button.
+        The URL is formatted without reverse(), see music/urlbuilder.py.
         """
 
-        return reverse('performer-detail', args=[str(self.id)])
+        return pk_url('performer-detail', self.id)
+
+
+class CatalogueCounter(models.Model):
+    """The model class describing a denormalized row count of another model (e.g., 'music.performer').
+    The counters are maintained incrementally by the signal handlers in music/signals.py,
+    so that pages like the index page can read them in O(1) instead of running COUNT(*).
+    They can be repaired with:
+        manage.py@<project_site>  > reconcile_counters
+    """
+
+    name = CharField(max_length=100, primary_key=True)
+    value = IntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.name}: {self.value}'
+
+
+class FestivalLineupStats(models.Model):
+    """The model class describing the precomputed lineup statistics of a festival:
+    the number of its performers, and how many of them are bands and solo musicians.
+    The rows are refreshed incrementally by the signal handlers in music/signals.py (see music/stats.py),
+    so that rankings like "festivals by lineup size" are read from this table instead of grouping all performers.
+    """
+
+    festival = OneToOneField(Festival, primary_key=True, on_delete=models.CASCADE, related_name='lineup_stats')
+    n_performers = IntegerField(default=0)
+    n_bands = IntegerField(default=0)
+    n_musicians = IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Festivals ranked by lineup size, see stats.festival_ranking()
+            models.Index(fields=['-n_performers', 'festival'], name='lineup_stats_size_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.festival_id}: {self.n_performers} ({self.n_bands} bands, {self.n_musicians} musicians)'
+
+
+class CatalogueStat(models.Model):
+    """The model class describing one precomputed aggregate of the catalogue, e.g.
+    the number of festivals per location ('location', 'Bethel, NY'), per year ('year', '1969'),
+    or the number of bands/solo musicians ('kind', 'band').
+    The rows are refreshed incrementally by the signal handlers in music/signals.py (see music/stats.py).
+    """
+
+    dimension = CharField(max_length=20)
+    key = CharField(max_length=100)
+    value = IntegerField(default=0)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'key'], name='catalogue_stat_dimension_key_uniq'),
+        ]
 
+    def __str__(self):
+        return f'{self.dimension} {self.key}: {self.value}'
@@ -0,0 +1,152 @@
+"""Whole-page response cache for the read-only pages of the music app.
+A page is cached under a key made of its full path (including the query string) and the current versions
+of the models it shows, e.g. for the festival list:
+    music:page:<md5 of the path>:<version of music.festival>.<version of music.performer>
+The versions live in the cache (in the 'model' scope of music/fragments.py) and are bumped by the signal handlers
+in music/signals.py whenever a Performer or a Festival is saved or deleted, so a write changes the keys of exactly
+the pages that show that model; the stale entries are never read again and are left to expire/be evicted.
+There is no need to guess a TTL.
+Stampede protection: when a popular page is missing (e.g., right after a write), only one request per key
+recomputes it; the others wait (for at most LOCK_WAIT seconds) for the page to appear in the cache.
+Only successful (200) responses to GET/HEAD requests are cached, without cookies; never use this on pages
+with forms (they contain a request-specific CSRF token).
+The requests whose reads are pinned to the primary database (a client that has just written something,
+see woodstock_dj/routers.py) bypass the cache: the cached page may have been rendered from a lagging replica.
+Works with any Django cache backend, but the versions and the pages have to be shared by all the server processes,
+so production uses a file-based cache (or Redis, see CACHES in settings/prod.py); the local-memory cache
+of settings/base.py is per process, and only fit for development.
+Usage (works with both sync and async views; with method_decorator(), also with class-based views):
+    @cached_page(Performer, Festival)
+    def index(request): ...
+"""
+
+import asyncio
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from music import fragments
+from woodstock_dj.routers import reads_pinned
+
+
+PAGE_TIMEOUT = 24 * 60 * 60
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 5.0
+LOCK_POLL_INTERVAL = 0.05
+
+
+def page_key(request, models):
+    versions = fragments.current_versions([('model', model._meta.label_lower) for model in models])
+    path = hashlib.md5(request.get_full_path().encode(), usedforsecurity=False).hexdigest()
+    return f'music:page:{path}:' + '.'.join(str(version) for version in versions.values())
+
+
+def _to_response(entry):
+    content, status, headers = entry
+    response = HttpResponse(content, status=status)
+    for name, value in headers.items():
+        response.headers[name] = value
+    return response
+
+
+def _to_entry(response):
+    if hasattr(response, 'render') and not response.is_rendered:
+        response.render()
+    headers = {name: value for name, value in response.items() if name.lower() != 'set-cookie'}
+    return response.content, response.status_code, headers
+
+
+def _cacheable(request, response):
+    return (request.method in ('GET', 'HEAD') and response.status_code == 200
+            and not response.streaming and not response.cookies)
+
+
+def _lookup(request, models):
+    """Returns (key, cached response or None, whether this request holds the recompute lock)."""
+
+    key = page_key(request, models)
+    entry = cache.get(key)
+    if entry is not None:
+        return key, _to_response(entry), False
+    return key, None, cache.add(f'{key}:lock', 1, LOCK_TIMEOUT)
+
+
+def _wait(key):
+    """Waits for another request to store the page; returns the cached response,
+    or None if the page does not appear (the other request failed or its response was not cacheable).
+    """
+
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        entries = cache.get_many([key, f'{key}:lock'])
+        if key in entries:
+            return _to_response(entries[key])
+        if f'{key}:lock' not in entries:
+            return None
+    return None
+
+
+async def _await(key):
+    """The async version of _wait()."""
+
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(LOCK_POLL_INTERVAL)
+        entries = await cache.aget_many([key, f'{key}:lock'])
+        if key in entries:
+            return _to_response(entries[key])
+        if f'{key}:lock' not in entries:
+            return None
+    return None
+
+
+def _store(request, key, response, locked):
+    if _cacheable(request, response):
+        cache.set(key, _to_entry(response), PAGE_TIMEOUT)
+    if locked:
+        cache.delete(f'{key}:lock')
+    return response
+
+
+def cached_page(*models):
+    """View decorator that caches the page under the path and the versions of models (see the module docstring)."""
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def _async_view(request, *args, **kwargs):
+                if request.method not in ('GET', 'HEAD') or reads_pinned():
+                    return await view(request, *args, **kwargs)
+                key, response, locked = await sync_to_async(_lookup)(request, models)
+                if response is not None:
+                    return response
+                if not locked:
+                    response = await _await(key)
+                    if response is not None:
+                        return response
+                response = await view(request, *args, **kwargs)
+                return await sync_to_async(_store)(request, key, response, locked)
+            return _async_view
+
+        @wraps(view)
+        def _view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or reads_pinned():
+                return view(request, *args, **kwargs)
+            key, response, locked = _lookup(request, models)
+            if response is not None:
+                return response
+            if not locked:
+                # Another request is recomputing the page; wait for it rather than recomputing it as well
+                response = _wait(key)
+                if response is not None:
+                    return response
+            response = view(request, *args, **kwargs)
+            return _store(request, key, response, locked)
+        return _view
+
+    return decorator
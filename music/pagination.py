@@ -0,0 +1,222 @@
+"""Keyset (cursor) pagination for the music app.
+Unlike Django's Paginator, which uses OFFSET/LIMIT and therefore has to skip over all the rows
+of the previous pages, keyset pagination remembers the sort key of the last row shown
+and asks the database for the rows that come right after it:
+    SELECT ... WHERE name >= <last name> AND (name > <last name> OR id > <last id>) ORDER BY name, id LIMIT <n>
+(the same rows as (name, id) > (<last name>, <last id>), written so that the index can seek to them).
+With an index on the sort key, the first and the ten-thousandth page cost the same.
+The position is passed between requests as an opaque cursor token in the query string, e.g.:
+    /music/performers/?cursor=<token>
+Typical usage in a ListView:
+    class PerformerListView(KeysetPaginationMixin, ListView):
+        paginate_by = 50
+        keyset_ordering = ('name',)
+"""
+
+import base64
+import binascii
+import json
+from types import SimpleNamespace
+
+from django.db.models import F, Q
+from django.http import Http404
+
+
+class InvalidCursor(Exception):
+    """Raised when a cursor token cannot be decoded or does not match the paginator's ordering."""
+
+
+class KeysetPage:
+    """One page of objects returned by KeysetPaginator.
+    It mimics the parts of django.core.paginator.Page used in templates
+    (object_list, has_next(), has_previous(), has_other_pages()),
+    but instead of page numbers it exposes the cursors of the neighbouring pages.
+    """
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return self.paginator.encode_cursor(self.object_list[-1], 'n')
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return self.paginator.encode_cursor(self.object_list[0], 'p')
+
+
+class KeysetPaginator:
+    """Paginates a QuerySet by a tuple of (possibly nullable) model fields, always followed by pk.
+    The ordering is ascending, with NULLs first (as SQLite does it by default),
+    and pk is appended as a tie-breaker so that every row has a unique position.
+    Each page costs one query of per_page + 1 rows (the extra row tells whether there is a next page).
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.model = queryset.model
+        self.per_page = int(per_page)
+        self.fields = [self.model._meta.get_field(name) for name in ordering]
+        self.fields.append(self.model._meta.pk)
+
+    def encode_cursor(self, obj, direction):
+        """Returns an opaque, URL-safe token describing the position of obj in the ordering.
+        direction is 'n' for the page after obj, 'p' for the page before it.
+        obj can also be a dictionary (a row of a values() QuerySet) that includes the ordering fields.
+        """
+
+        if isinstance(obj, dict):
+            # A row of a values() QuerySet (see music/api.py); value_to_string() only needs the attribute
+            obj = SimpleNamespace(**obj)
+        values = [field.value_to_string(obj) if field.value_from_object(obj) is not None else None
+                  for field in self.fields]
+        payload = json.dumps({'d': direction, 'k': values}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Returns (direction, values) decoded from a token created by encode_cursor()."""
+
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            direction, raw_values = payload['d'], payload['k']
+        except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError):
+            raise InvalidCursor('Malformed cursor.')
+        if direction not in ('n', 'p') or not isinstance(raw_values, list) \
+                or len(raw_values) != len(self.fields) or raw_values[-1] is None:
+            raise InvalidCursor('Cursor does not match the ordering.')
+        try:
+            values = [None if value is None else field.to_python(value)
+                      for field, value in zip(self.fields, raw_values)]
+        except Exception:
+            raise InvalidCursor('Cursor contains invalid values.')
+        return direction, values
+
+    def _order_by(self, reverse=False):
+        if reverse:
+            return [F(field.attname).desc(nulls_last=True) for field in self.fields]
+        return [F(field.attname).asc(nulls_first=True) for field in self.fields]
+
+    def _sections(self, values, index, after):
+        """Returns the list of Q objects selecting the rows strictly after (or, with after=False, before)
+        the position given by values, among the rows whose keys before index equal those values.
+        Each Q object is one contiguous section of the ordering, and the sections are listed in the order
+        the rows are paged through (ascending with NULLs first for after, the reverse for before).
+        Within a section, the first key is bounded on both sides of the comparison, e.g. for (name, id):
+            name >= v  AND  (name > v  OR  id > k)
+        so that the database can seek to the position in the (name, id) index instead of scanning it
+        from the start (which a bare "name > v OR (name = v AND id > k)" makes it do).
+        The rows with a NULL key come first and cannot be bounded this way, so they get their own section.
+        """
+
+        field, value = self.fields[index], values[index]
+        name = field.attname
+        if index == len(self.fields) - 1:
+            return [Q(**{f'{name}__gt' if after else f'{name}__lt': value})]
+        rest = self._sections(values, index + 1, after)
+        if value is None:
+            equal = [Q(**{f'{name}__isnull': True}) & section for section in rest]
+            return equal + [Q(**{f'{name}__isnull': False})] if after else equal
+        beyond = Q(**{f'{name}__gt' if after else f'{name}__lt': value})
+        if len(rest) == 1:
+            sections = [Q(**{f'{name}__gte' if after else f'{name}__lte': value}) & (beyond | rest[0])]
+        else:
+            sections = [Q(**{name: value}) & section for section in rest] + [beyond]
+        if not after and field.null:
+            sections.append(Q(**{f'{name}__isnull': True}))
+        return sections
+
+    def _page_queries(self, cursor):
+        """Yields the QuerySets (one per section of the ordering, see _sections()) to fetch the per_page + 1 rows
+        of the page from, with the cursor's direction; the next one is only needed if the previous ones
+        returned fewer rows. Without a NULL key in the cursor, there is just one.
+        """
+
+        if not cursor:
+            yield self.queryset.order_by(*self._order_by()), None
+            return
+        direction, values = self.decode_cursor(cursor)
+        after = direction == 'n'
+        ordering = self._order_by(reverse=not after)
+        for section in self._sections(values, 0, after):
+            yield self.queryset.filter(section).order_by(*ordering), direction
+
+    def _make_page(self, rows, direction):
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction is None:
+            return KeysetPage(rows, self, more, False)
+        if direction == 'n':
+            return KeysetPage(rows, self, more, True)
+        rows.reverse()
+        return KeysetPage(rows, self, True, more)
+
+    def page(self, cursor=None):
+        """Returns the KeysetPage that starts (or ends, for backward cursors) at the given cursor.
+        Without a cursor, the first page is returned.
+        """
+
+        rows, direction = [], None
+        for qs, direction in self._page_queries(cursor):
+            rows += qs[:self.per_page + 1 - len(rows)]
+            if len(rows) > self.per_page:
+                break
+        return self._make_page(rows, direction)
+
+    async def apage(self, cursor=None):
+        """The async version of page(), for async views (see music/async_views.py)."""
+
+        rows, direction = [], None
+        for qs, direction in self._page_queries(cursor):
+            rows += [obj async for obj in qs[:self.per_page + 1 - len(rows)]]
+            if len(rows) > self.per_page:
+                break
+        return self._make_page(rows, direction)
+
+
+class KeysetPaginationMixin:
+    """ListView mixin that replaces the default OFFSET-based pagination with KeysetPaginator.
+    Views using it specify:
+        - paginate_by (the number of objects per page)
+        - keyset_ordering (a tuple of model field names; pk is always appended)
+        - cursor_kwarg (optional; the name of the query string parameter, 'cursor' by default)
+    The page is available in the template context as page_obj (and is_paginated is set as usual),
+    so the templates can render links like ?cursor={{ page_obj.next_cursor }}.
+    """
+
+    keyset_ordering = ()
+    cursor_kwarg = 'cursor'
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, self.keyset_ordering, page_size)
+        cursor = self.request.GET.get(self.cursor_kwarg)
+        try:
+            page = paginator.page(cursor)
+        except InvalidCursor as e:
+            raise Http404(f'Invalid cursor: {e}')
+        return paginator, page, page.object_list, page.has_other_pages()
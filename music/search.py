@@ -0,0 +1,151 @@
+"""Full-text search over performer names and festival names/locations.
+On SQLite, the search is backed by two FTS5 virtual tables, with the model tables as their external content:
+    - music_performer_fts (name)
+    - music_festival_fts (name, location)
+They are kept in sync by triggers on music_performer and music_festival, so every change is indexed,
+including bulk_create(), QuerySet.update() and raw SQL. Every search term is matched as a prefix
+('jim hen' finds 'Jimi Hendrix') and the results are ranked by bm25 (for festivals, a match in the name
+weighs more than a match in the location).
+The tables and triggers are created by migration 0005 and re-created, if missing, after every migrate
+(SQLite drops the triggers of a table when Django remakes it to alter a column), see install().
+The index can be rebuilt from scratch with:
+    manage.py@<project_site>  > rebuild_search_index
+On other databases, the search falls back to case-insensitive prefix matching (istartswith).
+"""
+
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from music.models import Performer, Festival
+
+
+# model: (FTS table, indexed columns, bm25 weights of the columns)
+FTS_TABLES = {
+    Performer: ('music_performer_fts', ['name'], [1.0]),
+    Festival: ('music_festival_fts', ['name', 'location'], [10.0, 1.0]),
+}
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+MAX_TERMS = 8
+
+
+def _install_statements(model):
+    fts_table, columns, _ = FTS_TABLES[model]
+    table = model._meta.db_table
+    column_list = ', '.join(columns)
+    new_values = ', '.join(f'new.{column}' for column in columns)
+    old_values = ', '.join(f'old.{column}' for column in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5("
+        f"{column_list}, content='{table}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts_table}(rowid, {column_list}) VALUES (new.id, {new_values}); END",
+
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts_table}({fts_table}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); END",
+
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE OF {column_list} ON {table} BEGIN "
+        f"INSERT INTO {fts_table}({fts_table}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {fts_table}(rowid, {column_list}) VALUES (new.id, {new_values}); END",
+    ]
+
+
+def install(using_connection=None, rebuild=False):
+    """Creates the FTS5 tables and triggers (if they do not exist yet) on an SQLite connection.
+    The index is rebuilt from the model tables when the FTS tables are created, or when rebuild is True.
+    """
+
+    using_connection = using_connection or connection
+    if using_connection.vendor != 'sqlite':
+        return
+    with using_connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        existing = {row[0] for row in cursor.fetchall()}
+        for model, (fts_table, _, _) in FTS_TABLES.items():
+            if model._meta.db_table not in existing:
+                continue
+            for statement in _install_statements(model):
+                cursor.execute(statement)
+            if rebuild or fts_table not in existing:
+                cursor.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+
+
+def uninstall(using_connection=None):
+    using_connection = using_connection or connection
+    if using_connection.vendor != 'sqlite':
+        return
+    with using_connection.cursor() as cursor:
+        for fts_table, _, _ in FTS_TABLES.values():
+            for suffix in ('ai', 'ad', 'au'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {fts_table}_{suffix}')
+            cursor.execute(f'DROP TABLE IF EXISTS {fts_table}')
+
+
+def search_terms(query):
+    """Splits a user query into (at most MAX_TERMS) word terms, dropping any FTS5 syntax."""
+
+    return TERM_RE.findall(query or '')[:MAX_TERMS]
+
+
+def fts_query(terms):
+    """Builds an FTS5 MATCH expression matching all the terms as prefixes: "jimi"* "hen"*"""
+
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def filter_queryset(queryset, query):
+    """Filters a Performer or Festival QuerySet to the objects matching query (keeping its ordering).
+    Used by the list views for their ?q= parameter.
+    """
+
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+    model = queryset.model
+    fts_table, columns, _ = FTS_TABLES[model]
+    if connection.vendor == 'sqlite':
+        matching = RawSQL(f'SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH %s', [fts_query(terms)])
+        return queryset.filter(pk__in=matching)
+    return queryset.filter(**{f'{columns[0]}__istartswith': ' '.join(terms)})
+
+
+def search(model, query, limit=20):
+    """Returns a list of at most limit Performer or Festival objects matching query, best matches first."""
+
+    terms = search_terms(query)
+    if not terms:
+        return []
+    fts_table, columns, weights = FTS_TABLES[model]
+    if connection.vendor != 'sqlite':
+        return list(filter_queryset(model.objects.all(), query).order_by(columns[0], 'id')[:limit])
+    bm25 = ', '.join(str(weight) for weight in weights)
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH %s '
+                       f'ORDER BY bm25({fts_table}, {bm25}) LIMIT %s', [fts_query(terms), limit])
+        ids = [row[0] for row in cursor.fetchall()]
+    objects = model.objects.in_bulk(ids)
+    return [objects[pk] for pk in ids if pk in objects]
+
+
+class SearchFilterMixin:
+    """ListView mixin that filters the list by the search query in the query string (?q=...).
+    The view's get_queryset() passes its QuerySet through search_queryset();
+    the query is available in the template context as search_query (e.g., to keep it in pagination links).
+    """
+
+    search_kwarg = 'q'
+
+    def get_search_query(self):
+        return self.request.GET.get(self.search_kwarg, '').strip()
+
+    def search_queryset(self, queryset):
+        query = self.get_search_query()
+        return filter_queryset(queryset, query) if query else queryset
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['search_query'] = self.get_search_query()
+        return context
@@ -0,0 +1,181 @@
+"""Synthetic catalogue data for measuring the music app at realistic scales (from 1k to 10M performers).
+The generated data is shaped like the real catalogue:
+    - festival sizes are skewed: the lineup weights follow a Pareto distribution, so a few festivals have
+      hundreds or thousands of performers and most have a handful (and a share of performers has no festival)
+    - locations are skewed as well (the popular ones host many festivals), the festivals start between
+      FIRST_YEAR and LAST_YEAR and last one to four days
+    - about BAND_SHARE of the performers are bands; the names are made of word lists, so they repeat
+      (like real names do) and exercise the search and the name ordering
+Rows are generated lazily, one batch at a time, and written with bulk_create() (each batch in its own
+transaction), so memory use does not depend on the scale. The generator is seeded, so a given
+(performers, festivals, seed) always produces the same catalogue, and benchmark runs are comparable.
+bulk_create() sends no signals, so the denormalized counters (music/counters.py) and the statistics
+(music/stats.py) are recomputed once at the end, and the cached pages are invalidated (music/fragments.py).
+Usage:
+    manage.py@<project_site>  > seed_catalogue --performers 1M [--festivals <n>] [--seed <n>] [--clear]
+"""
+
+import random
+import re
+import time
+from datetime import date, timedelta
+from itertools import accumulate
+
+from django.db import connection, transaction
+
+from music import counters, fragments, stats
+from music.models import CatalogueStat, Festival, FestivalLineupStats, Performer
+
+
+FIRST_YEAR, LAST_YEAR = 1960, 2025
+BAND_SHARE = 0.4
+# Share of the performers that do not play at any festival
+NO_FESTIVAL_SHARE = 0.1
+# Shape of the Pareto distribution of lineup sizes (smaller is more skewed)
+LINEUP_SKEW = 1.2
+PERFORMERS_PER_FESTIVAL = 50
+
+FIRST_NAMES = ['Janis', 'Jimi', 'Joan', 'Carlos', 'Richie', 'Joe', 'John', 'Grace', 'Arlo', 'Melanie',
+               'Ravi', 'Tim', 'Bert', 'Country', 'Sly', 'David', 'Stephen', 'Neil', 'Johnny', 'Nina',
+               'Aretha', 'Etta', 'Billie', 'Otis', 'Patti', 'Bob', 'Leonard', 'Joni', 'Van', 'Tina']
+LAST_NAMES = ['Joplin', 'Hendrix', 'Baez', 'Santana', 'Havens', 'Cocker', 'Sebastian', 'Slick', 'Guthrie',
+              'Safka', 'Shankar', 'Hardin', 'Sommer', 'Stone', 'Crosby', 'Stills', 'Young', 'Winter',
+              'Simone', 'Franklin', 'James', 'Holiday', 'Redding', 'Smith', 'Dylan', 'Cohen', 'Mitchell',
+              'Morrison', 'Turner', 'Waters']
+BAND_ADJECTIVES = ['Grateful', 'Electric', 'Jefferson', 'Canned', 'Incredible', 'Velvet', 'Rolling', 'Iron',
+                   'Creedence', 'Sweet', 'Ten Years', 'Flying', 'Crimson', 'Silver', 'Purple', 'Holy', 'Lonely',
+                   'Big', 'Mighty', 'Strawberry']
+BAND_NOUNS = ['Dead', 'Flag', 'Airplane', 'Heat', 'String Band', 'Underground', 'Stones', 'Butterfly',
+              'Revival', 'Water', 'After', 'Burrito Brothers', 'Kings', 'Apples', 'Haze', 'Modal Rounders',
+              'Hearts', 'Brother', 'Mountain', 'Alarm Clock']
+FESTIVAL_NAMES = ['Woodstock', 'Monterey Pop', 'Isle of Wight', 'Glastonbury', 'Roskilde', 'Reading', 'Newport Folk',
+                  'Exit', 'Coachella', 'Lollapalooza', 'Primavera', 'Sziget', 'Bonnaroo', 'Fuji Rock', 'Pinkpop',
+                  'Rock Werchter', 'Montreux Jazz', 'Summer Jam', 'Atlanta Pop', 'Altamont']
+LOCATIONS = ['Bethel, NY', 'Monterey, CA', 'Isle of Wight', 'Pilton', 'Roskilde', 'Reading', 'Newport, RI',
+             'Novi Sad', 'Indio, CA', 'Chicago, IL', 'Barcelona', 'Budapest', 'Manchester, TN', 'Niigata',
+             'Landgraaf', 'Werchter', 'Montreux', 'Watkins Glen, NY', 'Byron, GA', 'Tracy, CA', 'Belgrade',
+             'London', 'Berlin', 'Paris', 'Amsterdam', 'Austin, TX', 'Seattle, WA', 'Melbourne', 'Tokyo', 'Oslo']
+
+SUFFIXES = {'k': 1000, 'm': 1000 ** 2}
+
+
+def parse_count(value):
+    """Parses a row count like '5000', '10k' or '10M'."""
+
+    match = re.fullmatch(r'\s*(\d+)\s*([kKmM]?)\s*', str(value))
+    if not match:
+        raise ValueError(f'Invalid count {value!r}, expected e.g. 5000, 10k or 10M.')
+    number, suffix = match.groups()
+    return int(number) * SUFFIXES.get(suffix.lower(), 1)
+
+
+class CatalogueSeeder:
+    """Generates and stores a synthetic catalogue, see the module docstring.
+    Usage:
+        seeder = CatalogueSeeder(performers=100000, seed=1)
+        seeder.run()
+    After run(), the seeder's festival_count, performer_count and elapsed attributes describe the result.
+    """
+
+    def __init__(self, performers, festivals=None, seed=0, batch_size=10000, on_batch=None):
+        self.performers = performers
+        self.festivals = festivals if festivals is not None else max(performers // PERFORMERS_PER_FESTIVAL, 1)
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+        self.on_batch = on_batch or (lambda seeder: None)
+        self.festival_count = 0
+        self.performer_count = 0
+        self.elapsed = 0.0
+        self.started = None
+
+    # Generation
+
+    def weighted(self, values):
+        """Cumulative Pareto weights for values, so that random.choices() picks a few of them very often."""
+
+        return list(accumulate(self.random.paretovariate(LINEUP_SKEW) for _ in values))
+
+    def festival_batches(self):
+        location_weights = self.weighted(LOCATIONS)
+        first_day, days = date(FIRST_YEAR, 1, 1), (date(LAST_YEAR, 12, 31) - date(FIRST_YEAR, 1, 1)).days
+        batch = []
+        for number in range(1, self.festivals + 1):
+            start = first_day + timedelta(days=self.random.randrange(days))
+            batch.append(Festival(name=f'{self.random.choice(FESTIVAL_NAMES)} {start.year} #{number}',
+                                  start=start, end=start + timedelta(days=self.random.randrange(4)),
+                                  location=self.random.choices(LOCATIONS, cum_weights=location_weights)[0]))
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def performer_name(self, is_band):
+        if is_band:
+            return f'The {self.random.choice(BAND_ADJECTIVES)} {self.random.choice(BAND_NOUNS)}'
+        return f'{self.random.choice(FIRST_NAMES)} {self.random.choice(LAST_NAMES)}'
+
+    def performer_batches(self, festival_ids):
+        lineup_weights = self.weighted(festival_ids)
+        remaining = self.performers
+        while remaining > 0:
+            size = min(self.batch_size, remaining)
+            festivals = (self.random.choices(festival_ids, cum_weights=lineup_weights, k=size)
+                         if festival_ids else [None] * size)
+            batch = []
+            for festival_id in festivals:
+                is_band = self.random.random() < BAND_SHARE
+                if self.random.random() < NO_FESTIVAL_SHARE:
+                    festival_id = None
+                batch.append(Performer(name=self.performer_name(is_band), is_band=is_band, festival_id=festival_id))
+            remaining -= size
+            yield batch
+
+    # Storage
+
+    def run(self):
+        self.started = time.perf_counter()
+        festival_ids = []
+        for batch in self.festival_batches():
+            with transaction.atomic():
+                festival_ids.extend(festival.pk for festival in Festival.objects.bulk_create(batch))
+            self.festival_count += len(batch)
+            self.progress()
+        for batch in self.performer_batches(festival_ids):
+            with transaction.atomic():
+                Performer.objects.bulk_create(batch)
+            self.performer_count += len(batch)
+            self.progress()
+        self.finish()
+        return self
+
+    def progress(self):
+        self.elapsed = time.perf_counter() - self.started
+        self.on_batch(self)
+
+    def finish(self):
+        """Recomputes what bulk_create() did not maintain (see the module docstring)."""
+
+        counters.reconcile()
+        stats.rebuild()
+        fragments.bump('model', Performer._meta.label_lower, Festival._meta.label_lower)
+        self.elapsed = time.perf_counter() - self.started
+
+
+def clear():
+    """Deletes all performers and festivals (and their statistics) with plain DELETE statements;
+    the signal handlers would otherwise load and handle every row one by one.
+    The per-object fragments of the deleted rows are invalidated as well (a cached fragment is served
+    without loading its object, see FragmentCacheMixin), with their ids read before the DELETEs.
+    """
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        performer_ids = list(Performer.objects.values_list('pk', flat=True).iterator())
+        festival_ids = list(Festival.objects.values_list('pk', flat=True).iterator())
+        for model in (Performer, FestivalLineupStats, CatalogueStat, Festival):
+            cursor.execute(f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)}')
+    counters.reconcile()
+    fragments.bump_many('performer', performer_ids)
+    fragments.bump_many('festival', festival_ids)
+    fragments.bump_many('lineup', festival_ids)
+    fragments.bump('model', Performer._meta.label_lower, Festival._meta.label_lower)
@@ -0,0 +1,179 @@
+"""Signal handlers of the music app.
+They are connected when the app is ready (see MusicConfig.ready() in music/apps.py).
+"""
+
+from django.db import connections
+from django.db.models.signals import pre_save, post_save, post_delete, post_migrate
+from django.dispatch import receiver
+
+from music import bulk, counters, fragments, search, stats
+from music.models import Performer, Festival
+
+
+@receiver(post_save, sender=Performer)
+@receiver(post_save, sender=Festival)
+def count_created(sender, instance, created, raw=False, **kwargs):
+    """Increments the counter of the model whose object has just been created."""
+
+    if created and not raw:
+        counters.adjust(sender, 1)
+
+
+@receiver(post_delete, sender=Performer)
+@receiver(post_delete, sender=Festival)
+def count_deleted(sender, instance, **kwargs):
+    """Decrements the counter of the model whose object has just been deleted."""
+
+    counters.adjust(sender, -1)
+
+
+@receiver(pre_save, sender=Performer)
+def remember_festival(sender, instance, raw=False, using=None, **kwargs):
+    """Makes sure the festival the performer belonged to before the save (and whether it was a band) is known
+    (it is normally remembered by Performer.from_db(); otherwise, it is looked up on the database being written to).
+    """
+
+    if not raw and instance.pk is not None and not (hasattr(instance, '_loaded_festival_id')
+                                                    and hasattr(instance, '_loaded_is_band')):
+        instance._loaded_festival_id, instance._loaded_is_band = (
+            sender.objects.using(using).filter(pk=instance.pk).values_list('festival_id', 'is_band').first()
+            or (None, None))
+
+
+@receiver(pre_save, sender=Festival)
+def remember_location_and_start(sender, instance, raw=False, using=None, **kwargs):
+    """Makes sure the location and the start date of the festival before the save are known
+    (they are normally remembered by Festival.from_db();
+    otherwise, they are looked up on the database being written to).
+    """
+
+    if not raw and instance.pk is not None and not hasattr(instance, '_loaded_location'):
+        instance._loaded_location, instance._loaded_start = (
+            sender.objects.using(using).filter(pk=instance.pk).values_list('location', 'start').first()
+            or (None, None))
+
+
+# The statistics handlers use the values remembered above, so they have to run
+# before invalidate_performer_fragments(), which updates the remembered festival
+
+@receiver(post_save, sender=Performer)
+def refresh_performer_stats(sender, instance, created, raw=False, **kwargs):
+    """Refreshes the statistics a performer's save changes (see music/stats.py):
+    the band/solo musician split, and the lineups of its old and new festivals.
+    """
+
+    if raw:
+        return
+    old_is_band = None if created else getattr(instance, '_loaded_is_band', None)
+    old_festival_id = None if created else getattr(instance, '_loaded_festival_id', None)
+    if created:
+        stats.adjust_kind(instance.is_band, 1)
+    elif old_is_band != instance.is_band:
+        stats.adjust_kind(old_is_band, -1)
+        stats.adjust_kind(instance.is_band, 1)
+    if created or old_is_band != instance.is_band or old_festival_id != instance.festival_id:
+        stats.refresh_lineups({old_festival_id, instance.festival_id})
+    instance._loaded_is_band = instance.is_band
+
+
+@receiver(post_delete, sender=Performer)
+def refresh_deleted_performer_stats(sender, instance, **kwargs):
+    """Refreshes the band/solo musician split and the lineup of the deleted performer's festival."""
+
+    stats.adjust_kind(instance.is_band, -1)
+    stats.refresh_lineups({instance.festival_id})
+
+
+@receiver(post_save, sender=Festival)
+def refresh_festival_stats(sender, instance, created, raw=False, **kwargs):
+    """Refreshes the festival's lineup statistics (when created)
+    and the festivals per location and per year of its old and new location and year.
+    """
+
+    if raw:
+        return
+    locations, years = {instance.location}, {stats.year_key(instance.start)}
+    if created:
+        stats.refresh_lineups({instance.pk})
+    else:
+        locations.add(getattr(instance, '_loaded_location', None))
+        years.add(stats.year_key(getattr(instance, '_loaded_start', None)))
+    if created or len(locations) > 1:
+        stats.refresh_locations(locations - {None})
+    if created or len(years) > 1:
+        stats.refresh_years(years)
+    instance._loaded_location, instance._loaded_start = instance.location, instance.start
+
+
+@receiver(post_delete, sender=Festival)
+def refresh_deleted_festival_stats(sender, instance, **kwargs):
+    """Refreshes the festivals per location and per year of the deleted festival
+    (its lineup statistics are deleted along with it).
+    """
+
+    stats.refresh_locations({instance.location})
+    stats.refresh_years({stats.year_key(instance.start)})
+
+
+@receiver(post_save, sender=Performer)
+def invalidate_performer_fragments(sender, instance, using=None, **kwargs):
+    """Invalidates the fragments of the performer and the lineups of its old and new festivals
+    (when the transaction is committed, see fragments.bump_on_commit()).
+    """
+
+    fragments.bump_on_commit('performer', instance.pk, using=using)
+    fragments.bump_on_commit('lineup', getattr(instance, '_loaded_festival_id', None), instance.festival_id,
+                             using=using)
+    instance._loaded_festival_id = instance.festival_id
+
+
+@receiver(post_delete, sender=Performer)
+def invalidate_deleted_performer_fragments(sender, instance, using=None, **kwargs):
+    """Invalidates the fragments of the deleted performer and the lineup of its festival."""
+
+    fragments.bump_on_commit('performer', instance.pk, using=using)
+    fragments.bump_on_commit('lineup', instance.festival_id, using=using)
+
+
+@receiver(post_save, sender=Festival)
+@receiver(post_delete, sender=Festival)
+def invalidate_festival_fragments(sender, instance, using=None, **kwargs):
+    """Invalidates the fragments of the festival and of everything that shows it.
+    (Deleting a festival sets the festival of its performers to NULL without sending signals,
+    but their fragments depend on the festival's version as well.)
+    """
+
+    fragments.bump_on_commit('festival', instance.pk, using=using)
+
+
+@receiver(post_save, sender=Performer)
+@receiver(post_delete, sender=Performer)
+@receiver(post_save, sender=Festival)
+@receiver(post_delete, sender=Festival)
+def invalidate_pages(sender, using=None, **kwargs):
+    """Invalidates the cached pages that show objects of the model (see music/pagecache.py),
+    when the transaction is committed (see fragments.bump_on_commit()).
+    """
+
+    fragments.bump_on_commit('model', sender._meta.label_lower, using=using)
+
+
+@receiver(bulk.performers_updated)
+def invalidate_updated_performers(sender, pks, festival_ids, **kwargs):
+    """Invalidates the fragments of the performers updated in bulk (see music/bulk.py), the lineups
+    of their old and new festivals and the cached pages that show performers, in a few cache round trips.
+    """
+
+    fragments.bump_many('performer', pks)
+    fragments.bump('lineup', *festival_ids)
+    fragments.bump('model', sender._meta.label_lower)
+
+
+@receiver(post_migrate)
+def install_search(sender, using='default', **kwargs):
+    """Re-creates the full-text search triggers if a migration has dropped them
+    (SQLite drops the triggers of a table that Django remakes in order to alter it).
+    """
+
+    if sender.name == 'music':
+        search.install(connections[using])
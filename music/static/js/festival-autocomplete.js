@@ -0,0 +1,64 @@
+/*
+ * The festival picker of the performer form (see FestivalAutocompleteWidget in music/forms.py).
+ * As the user types into a text input with the festival-autocomplete class, the matching festivals are
+ * fetched from the input's data-lookup-url (?q=<text>) and offered in its <datalist>; choosing one
+ * stores its id in the hidden input named by data-target, and clearing the text clears the festival.
+ */
+(function () {
+    'use strict';
+
+    var DELAY = 200;
+    var MIN_LENGTH = 2;
+
+    function setUp(input) {
+        var target = document.getElementById(input.dataset.target);
+        var options = document.getElementById(input.getAttribute('list'));
+        var ids = {};
+        var timer = null;
+        var lastQuery = null;
+
+        function choose() {
+            var text = input.value.trim();
+            if (!text) {
+                target.value = '';
+            } else if (Object.prototype.hasOwnProperty.call(ids, text)) {
+                target.value = ids[text];
+            }
+        }
+
+        function lookup() {
+            var query = input.value.trim();
+            if (query.length < MIN_LENGTH || query === lastQuery) {
+                return;
+            }
+            lastQuery = query;
+            fetch(input.dataset.lookupUrl + '?q=' + encodeURIComponent(query), {credentials: 'same-origin'})
+                .then(function (response) { return response.ok ? response.json() : {results: []}; })
+                .then(function (data) {
+                    if (query !== lastQuery) {
+                        return;
+                    }
+                    ids = {};
+                    options.textContent = '';
+                    data.results.forEach(function (festival) {
+                        var option = document.createElement('option');
+                        option.value = festival.label;
+                        ids[festival.label] = festival.id;
+                        options.appendChild(option);
+                    });
+                    choose();
+                });
+        }
+
+        input.addEventListener('input', function () {
+            choose();
+            clearTimeout(timer);
+            timer = setTimeout(lookup, DELAY);
+        });
+        input.addEventListener('change', choose);
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        Array.prototype.forEach.call(document.querySelectorAll('input.festival-autocomplete'), setUp);
+    });
+})();
@@ -0,0 +1,201 @@
+"""Lineup and catalogue statistics of the music app:
+    - per festival: the lineup size and the band/solo musician split (FestivalLineupStats)
+    - globally: the band/solo musician split of all performers, the festivals per location and per year (CatalogueStat)
+Every statistic is computed by one grouped SQL query (grouped by festival / is_band / location / year),
+never by loading performers into Python, and materialized into the summary tables, which dashboards read.
+The rows are kept up to date incrementally by the signal handlers in music/signals.py: a save or a delete
+recomputes just the groups it affects (e.g., the lineups of the performer's old and new festivals,
+or the old and new location of a festival), with the grouped query restricted to those groups.
+The band/solo musician split of all performers is adjusted by +1/-1 instead (like the counters in music/counters.py),
+since recomputing it would mean scanning all performers.
+The grouped queries of the refresh_*() functions and rebuild() run on the database the summary tables are written to
+(the primary, see woodstock_dj/routers.py), never on a read replica, which may lag behind.
+Bulk operations that bypass the signals should call the refresh_*() functions themselves,
+or the tables should be rebuilt afterwards with:
+    manage.py@<project_site>  > festival_stats --rebuild
+"""
+
+from django.db import router, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import ExtractYear
+
+from music.models import CatalogueStat, Festival, FestivalLineupStats, Performer
+
+
+LOCATION, YEAR, KIND = 'location', 'year', 'kind'
+BAND, MUSICIAN = 'band', 'musician'
+UNKNOWN_YEAR = ''
+
+
+def kind_key(is_band):
+    return BAND if is_band else MUSICIAN
+
+
+# The grouped queries; each one returns {group: aggregate(s)} for the given groups (all groups if None)
+
+def lineup_query(festival_ids=None, using=None):
+    """{festival id: (performers, bands, musicians)} from one query grouping the performers by festival
+    (festival LEFT JOIN performer GROUP BY festival.id, so festivals without performers are included).
+    """
+
+    festivals = Festival.objects.using(using)
+    if festival_ids is not None:
+        festivals = festivals.filter(pk__in=festival_ids)
+    rows = (festivals
+            .order_by()
+            .annotate(n=Count('performer'), bands=Count('performer', filter=Q(performer__is_band=True)))
+            .values_list('pk', 'n', 'bands'))
+    return {pk: (n, bands, n - bands) for pk, n, bands in rows}
+
+
+def location_query(locations=None, using=None):
+    """{location: number of festivals} from one GROUP BY location query over the festivals."""
+
+    festivals = Festival.objects.using(using)
+    if locations is not None:
+        festivals = festivals.filter(location__in=locations)
+    return dict(festivals.order_by().values('location').annotate(n=Count('id')).values_list('location', 'n'))
+
+
+def year_query(years=None, using=None):
+    """{year (as a string, '' for unknown): number of festivals} from one GROUP BY year query over the festivals."""
+
+    festivals = Festival.objects.using(using)
+    if years is not None:
+        known = [int(year) for year in years if year != UNKNOWN_YEAR]
+        condition = Q(start__year__in=known) if known else Q(pk__in=[])
+        if UNKNOWN_YEAR in years:
+            condition |= Q(start__isnull=True)
+        festivals = festivals.filter(condition)
+    rows = festivals.order_by().annotate(year=ExtractYear('start')).values('year').annotate(n=Count('id'))
+    return {UNKNOWN_YEAR if row['year'] is None else str(row['year']): row['n'] for row in rows}
+
+
+def kind_query(using=None):
+    """{'band'/'musician': number of performers} from one GROUP BY is_band query over the performers."""
+
+    rows = Performer.objects.using(using).order_by().values('is_band').annotate(n=Count('id'))
+    counts = {BAND: 0, MUSICIAN: 0}
+    counts.update({kind_key(row['is_band']): row['n'] for row in rows})
+    return counts
+
+
+def year_key(date):
+    return UNKNOWN_YEAR if date is None else str(date.year)
+
+
+# Materialization
+
+def _primary(using):
+    return using or router.db_for_write(CatalogueStat)
+
+
+def refresh_lineups(festival_ids, using=None):
+    """Recomputes the lineup statistics of the given festivals (ignoring None and deleted festivals)
+    and stores them in one upsert.
+    """
+
+    festival_ids = {pk for pk in festival_ids if pk is not None}
+    if not festival_ids:
+        return
+    using = _primary(using)
+    _store_lineups(lineup_query(festival_ids, using=using), using=using)
+
+
+def _store_lineups(counts, using=None):
+    FestivalLineupStats.objects.using(using).bulk_create(
+        [FestivalLineupStats(festival_id=pk, n_performers=n, n_bands=bands, n_musicians=musicians)
+         for pk, (n, bands, musicians) in counts.items()],
+        update_conflicts=True, unique_fields=['festival'], update_fields=['n_performers', 'n_bands', 'n_musicians'])
+
+
+def _store(dimension, counts, keys, using=None):
+    """Stores the counts of the given keys of a dimension; the keys that no longer have any rows are deleted."""
+
+    stats = CatalogueStat.objects.using(using)
+    empty = [key for key in keys if not counts.get(key)]
+    if empty:
+        stats.filter(dimension=dimension, key__in=empty).delete()
+    rows = [CatalogueStat(dimension=dimension, key=key, value=value) for key, value in counts.items() if value]
+    stats.bulk_create(rows, update_conflicts=True, unique_fields=['dimension', 'key'], update_fields=['value'])
+
+
+def refresh_locations(locations, using=None):
+    """Recomputes the number of festivals in the given locations."""
+
+    locations = set(locations)
+    if locations:
+        using = _primary(using)
+        _store(LOCATION, location_query(locations, using=using), locations, using=using)
+
+
+def refresh_years(years, using=None):
+    """Recomputes the number of festivals in the given years (strings, see year_key())."""
+
+    years = set(years)
+    if years:
+        using = _primary(using)
+        _store(YEAR, year_query(years, using=using), years, using=using)
+
+
+def adjust_kind(is_band, delta, using=None):
+    """Adds delta to the number of bands (is_band=True) or solo musicians. If the row does not exist yet,
+    the split is recomputed from the performers (which already includes the change).
+    """
+
+    using = _primary(using)
+    updated = (CatalogueStat.objects.using(using)
+               .filter(dimension=KIND, key=kind_key(is_band))
+               .update(value=F('value') + delta))
+    if not updated:
+        _store(KIND, kind_query(using=using), (BAND, MUSICIAN), using=using)
+
+
+def rebuild(using=None):
+    """Recomputes all the statistics from scratch (in a transaction) with one grouped query per statistic."""
+
+    using = _primary(using)
+    with transaction.atomic(using=using):
+        FestivalLineupStats.objects.using(using).all().delete()
+        CatalogueStat.objects.using(using).all().delete()
+        _store_lineups(lineup_query(using=using), using=using)
+        _store(LOCATION, location_query(using=using), (), using=using)
+        _store(YEAR, year_query(using=using), (), using=using)
+        _store(KIND, kind_query(using=using), (BAND, MUSICIAN), using=using)
+
+
+# Reading the precomputed statistics
+
+def festival_ranking(limit=20):
+    """The festivals with the largest lineups: a list of FestivalLineupStats (with the festival loaded)."""
+
+    return list(FestivalLineupStats.objects
+                .select_related('festival')
+                .order_by('-n_performers', 'festival_id')[:limit])
+
+
+def dimension(name, limit=None):
+    """The precomputed (key, value) pairs of a dimension, largest first (years in chronological order)."""
+
+    rows = CatalogueStat.objects.filter(dimension=name)
+    rows = rows.order_by('key') if name == YEAR else rows.order_by('-value', 'key')
+    if limit:
+        rows = rows[:limit]
+    return list(rows.values_list('key', 'value'))
+
+
+def summary(limit=20):
+    """All the precomputed statistics, for the statistics page and the festival_stats command."""
+
+    kinds = dict(dimension(KIND))
+    lineups = FestivalLineupStats.objects.aggregate(festivals=Count('festival_id'), performers=Sum('n_performers'))
+    return {
+        'bands': kinds.get(BAND, 0),
+        'musicians': kinds.get(MUSICIAN, 0),
+        'festivals': lineups['festivals'],
+        'performers_in_lineups': lineups['performers'] or 0,
+        'average_lineup': (lineups['performers'] or 0) / lineups['festivals'] if lineups['festivals'] else 0,
+        'ranking': festival_ranking(limit),
+        'locations': dimension(LOCATION, limit),
+        'years': dimension(YEAR),
+    }
@@ -0,0 +1,19 @@
+"""Template filters for building the URLs of the music app's pk-based routes without reverse(), see music/urlbuilder.py.
+Usage in a template (instead of {% url 'performer-detail' performer.pk %} in a loop over many rows):
+    {% load music_urls %}
+    <a href="{{ performer.pk|pk_url:'performer-detail' }}">{{ performer.name }}</a>
+"""
+
+from django import template
+
+from music import urlbuilder
+
+
+register = template.Library()
+
+
+@register.filter
+def pk_url(pk, name):
+    """Returns the URL of the route name (e.g., 'performer-detail') for pk."""
+
+    return urlbuilder.pk_url(name, pk)
@@ -0,0 +1,47 @@
+"""Template tags for responsive images, built by the static asset pipeline (see music/assets.py).
+Usage in a template:
+    {% load responsive %}
+    {% responsive_image 'images/woodstock-iconic.jpg' alt='Woodstock' sizes='(min-width: 576px) 66vw, 100vw' %}
+renders a <picture> element with a WebP and a JPEG srcset of the resized variants, e.g.:
+    <picture>
+        <source type="image/webp" srcset="/static/images/woodstock-iconic.<hash>.320w.webp 320w, ...">
+        <img src="/static/images/woodstock-iconic.<hash>.jpg" srcset="... 320w, ..." sizes="..."
+             width="..." height="..." alt="Woodstock" loading="lazy" decoding="async">
+    </picture>
+so that the browser picks the smallest file that is large enough for the rendered width.
+If responsive.json has no entry for the image (the static files have not been built, or Pillow was missing
+when they were), a plain <img> is rendered instead. DEBUG does not matter: the variants of a built tree are
+served by the development view too (see music.assets.serve).
+"""
+
+from django import template
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(name, alt='', sizes='100vw', loading='lazy', css_class=''):
+    """Renders the <picture> element of the static image name (see the module docstring)."""
+
+    info = getattr(staticfiles_storage, 'responsive_images', {}).get(name)
+    if not info:
+        return format_html('<img src="{}" alt="{}" class="{}">', static(name), alt, css_class)
+
+    sources = []
+    for mime_type in dict.fromkeys(variant['type'] for variant in info['variants']):
+        srcset = ', '.join(f'{staticfiles_storage.variant_url(variant["name"])} {variant["width"]}w'
+                           for variant in info['variants'] if variant['type'] == mime_type)
+        sources.append((mime_type, srcset))
+    # The last format (JPEG) is the fallback, used by the <img> itself
+    fallback_srcset = sources.pop()[1]
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" class="{}" '
+        'loading="{}" decoding="async"></picture>',
+        format_html_join('', '<source type="{}" srcset="{}" sizes="{}">',
+                         ((mime_type, srcset, sizes) for mime_type, srcset in sources)),
+        static(name), fallback_srcset, sizes, info['width'], info['height'], alt, css_class, loading,
+    )
@@ -1,3 +1,1499 @@
-from django.test import TestCase
+import base64
+import csv
+import datetime
+import json
+import os
+import tempfile
+import threading
+import time
+from io import StringIO
+
+from asgiref.sync import async_to_sync
+
+from django.contrib.sessions.models import Session
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection, transaction
+from django.http import Http404, HttpResponse
+from django.template import Context, Template
+from django.test import (AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import NoReverseMatch, reverse
+from django.utils import timezone
+from django.utils.connection import ConnectionDoesNotExist
+from django.utils.http import http_date
+
+from music import (api, async_views, benchmark, bulk, counters, exporter, fragments, pagecache, search, seeding,
+                   stats, urlbuilder)
+from music.forms import PerformerForm
+from music.importer import LineupImporter, read_rows
+from music.models import CatalogueCounter, CatalogueStat, FestivalLineupStats, Performer, Festival
+from music.pagecache import cached_page
+from music.pagination import InvalidCursor, KeysetPaginator
+from woodstock_dj import instrumentation, routers
 
 # Create your tests here.
+
+
+class FestivalQueryCountTest(TestCase):
+    """The festival pages must run a constant number of queries, no matter how big the lineup is
+    (see FestivalQuerySet in music/models.py).
+    """
+
+    def setUp(self):
+        # Make sure the detail pages are rendered, not served from the fragment cache
+        cache.clear()
+
+    def create_festival(self, name, lineup_size):
+        festival = Festival.objects.create(name=name, location='Bethel, NY',
+                                           start=datetime.date(1969, 8, 15), end=datetime.date(1969, 8, 18))
+        Performer.objects.bulk_create(Performer(name=f'{name} performer {i}', festival=festival)
+                                      for i in range(lineup_size))
+        return festival
+
+    def test_festival_detail_query_count_does_not_depend_on_lineup_size(self):
+        for lineup_size in (1, 50):
+            festival = self.create_festival(f'Festival {lineup_size}', lineup_size)
+            # 1 query for the page state (ETag, see music/conditional.py),
+            # 1 query for the festival (with the lineup size annotated) + 1 query for the prefetched lineup
+            with self.assertNumQueries(3):
+                response = self.client.get(reverse('festival-detail', args=[festival.pk]))
+            self.assertContains(response, f'Festival {lineup_size} performer ', count=lineup_size)
+
+    def test_festival_list_query_count_does_not_depend_on_number_of_festivals(self):
+        for n_festivals in (1, 20):
+            with self.captureOnCommitCallbacks(execute=True):
+                for i in range(n_festivals):
+                    self.create_festival(f'Festival {n_festivals}/{i}', 3)
+            # 3 queries for the page state (the counters and max(updated_at) of festivals and performers);
+            # the lineup sizes are computed in the same query as the page of festivals
+            with self.assertNumQueries(4):
+                self.client.get(reverse('festival-list'))
+
+    def test_with_lineup_annotates_and_prefetches(self):
+        festival = self.create_festival('Woodstock', 5)
+        self.create_festival('Empty', 0)
+        with self.assertNumQueries(2):
+            festivals = {f.name: f for f in Festival.objects.with_lineup()}
+            self.assertEqual(festivals['Woodstock'].n_performers, 5)
+            self.assertEqual(festivals['Empty'].n_performers, 0)
+            self.assertEqual(len(festivals['Woodstock'].performer_set.all()), 5)
+        self.assertEqual(Festival.objects.with_lineup().get(pk=festival.pk).n_performers, 5)
+
+
+class ConditionalGetTest(TestCase):
+    """Unchanged catalogue pages are answered with 304 Not Modified (see music/conditional.py)."""
+
+    def setUp(self):
+        cache.clear()
+        self.festival = Festival.objects.create(name='Woodstock', location='Bethel, NY',
+                                                start=datetime.date(1969, 8, 15), end=datetime.date(1969, 8, 18))
+        self.performer = Performer.objects.create(name='Jimi Hendrix', festival=self.festival)
+
+    def assertNotModifiedUntilChanged(self, url, change):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        etag = response['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_festival_detail_changes_with_lineup(self):
+        self.assertNotModifiedUntilChanged(reverse('festival-detail', args=[self.festival.pk]),
+                                           lambda: self.performer.delete())
+
+    def test_performer_detail_changes_with_festival(self):
+        def rename_festival():
+            self.festival.name = 'Woodstock 1969'
+            self.festival.save()
+        self.assertNotModifiedUntilChanged(reverse('performer-detail', args=[self.performer.pk]), rename_festival)
+
+    def test_performer_detail_changes_with_more_festivals(self):
+        url = reverse('performer-detail', args=[self.performer.pk])
+
+        def create_festival():
+            with self.captureOnCommitCallbacks(execute=True):
+                Festival.objects.create(name='Monterey Pop', start=datetime.date(1967, 6, 16))
+        self.assertNotModifiedUntilChanged(url, create_festival)
+        self.assertContains(self.client.get(url), 'Monterey Pop')
+
+        def delete_festival():
+            with self.captureOnCommitCallbacks(execute=True):
+                Festival.objects.get(name='Monterey Pop').delete()
+        self.assertNotModifiedUntilChanged(url, delete_festival)
+        self.assertNotContains(self.client.get(url), 'Monterey Pop')
+
+    def test_lists_change_with_new_objects(self):
+        self.assertNotModifiedUntilChanged(reverse('performer-list'),
+                                           lambda: Performer.objects.create(name='Santana'))
+        self.assertNotModifiedUntilChanged(reverse('festival-list'),
+                                           lambda: Performer.objects.create(name='The Who', festival=self.festival))
+
+    def test_deletions_with_if_modified_since(self):
+        # max(updated_at) does not change when a row is deleted, so there is no Last-Modified to revalidate with
+        urls = [reverse('performer-list'), reverse('festival-list'),
+                reverse('festival-detail', args=[self.festival.pk]),
+                reverse('performer-detail', args=[self.performer.pk])]
+        for url in urls:
+            self.assertFalse(self.client.get(url).has_header('Last-Modified'))
+        with self.captureOnCommitCallbacks(execute=True):
+            Performer.objects.create(name='Santana', festival=self.festival)
+            self.performer.delete()
+        tomorrow = http_date(time.time() + 24 * 60 * 60)
+        for url in urls[:3]:
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=tomorrow)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotContains(response, 'Jimi Hendrix')
+
+
+class UrlBuilderTest(SimpleTestCase):
+    """urlbuilder.pk_url() must build the same URLs as reverse() (see music/urlbuilder.py)."""
+
+    routes = ('performer-detail', 'performer-update', 'performer-delete',
+              'festival-detail', 'festival-update', 'festival-delete')
+
+    def test_same_urls_as_reverse(self):
+        for name in self.routes:
+            for pk in (1, 42, '7', 10 ** 12):
+                self.assertEqual(urlbuilder.pk_url(name, pk), reverse(name, args=[pk]))
+
+    def test_invalid_pk(self):
+        for pk in (None, '', 'abc', -1):
+            with self.assertRaises(NoReverseMatch):
+                urlbuilder.pk_url('performer-detail', pk)
+
+    def test_model_urls(self):
+        self.assertEqual(Performer(pk=3).get_absolute_url(), reverse('performer-detail', args=[3]))
+        self.assertEqual(Festival(pk=5).get_absolute_url(), reverse('festival-detail', args=[5]))
+
+
+class InstrumentationTest(TestCase):
+    """InstrumentationMiddleware must report the queries of a request (see woodstock_dj/instrumentation.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.festival = Festival.objects.create(name='Woodstock', location='Bethel, NY',
+                                              start=datetime.date(1969, 8, 15), end=datetime.date(1969, 8, 18))
+        Performer.objects.create(name='Janis Joplin', festival=cls.festival)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_server_timing(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('festival-detail', args=[self.festival.pk]))
+        self.assertEqual(response.status_code, 200)
+        timing = response['Server-Timing']
+        self.assertIn(f'desc="{len(queries)} queries"', timing)
+        self.assertRegex(timing, r'^db;dur=[0-9.]+;desc="[0-9]+ queries", tpl;dur=[0-9.]+, total;dur=[0-9.]+$')
+
+    @override_settings(SLOW_REQUEST_MS=0, SLOW_QUERY_MS=0)
+    def test_slow_log(self):
+        with self.assertLogs('woodstock.performance') as logs:
+            self.client.get(reverse('festival-detail', args=[self.festival.pk]))
+        events = [json.loads(record.getMessage()) for record in logs.records]
+        self.assertIn('slow_query', {event['event'] for event in events})
+        request = [event for event in events if event['event'] == 'slow_request'][0]
+        self.assertEqual((request['route'], request['status']), ('festival-detail', 200))
+
+    def test_route_windows(self):
+        instrumentation.reset()
+        for _ in range(3):
+            self.client.get(reverse('performer-list'))
+        instrumentation.publish()
+        samples = instrumentation.collect()['performer-list']
+        self.assertEqual(len(samples), 3)
+        self.assertEqual(len(samples[0]), len(instrumentation.MEASUREMENTS))
+
+    @override_settings(TIMING_PUBLISH_SECONDS=0)
+    def test_concurrent_samples(self):
+        # Every thread publishes after each sample, while the others keep adding theirs: none may be lost
+        instrumentation.reset()
+
+        def add_samples(n):
+            for i in range(100):
+                instrumentation.add_sample('concurrent', (float(n), 0.0, i, 0.0))
+
+        threads = [threading.Thread(target=add_samples, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        instrumentation.publish()
+        self.assertEqual(len(instrumentation.collect()['concurrent']), 800)
+
+
+class SeedingTest(TestCase):
+    """The synthetic catalogue must be repeatable and leave the counters and statistics consistent
+    (see music/seeding.py).
+    """
+
+    def test_parse_count(self):
+        self.assertEqual([seeding.parse_count(value) for value in ('500', '10k', '10M')], [500, 10000, 10000000])
+        with self.assertRaises(ValueError):
+            seeding.parse_count('ten')
+
+    def test_seed(self):
+        seeder = seeding.CatalogueSeeder(performers=300, festivals=12, seed=7, batch_size=100).run()
+        self.assertEqual((seeder.festival_count, seeder.performer_count), (12, 300))
+        self.assertEqual(counters.get_counts(), {Performer: 300, Festival: 12})
+        names = list(Performer.objects.order_by('id').values_list('name', 'festival__name'))
+
+        materialized = (set(FestivalLineupStats.objects.values_list('festival_id', 'n_performers', 'n_bands')),
+                        set(CatalogueStat.objects.values_list('dimension', 'key', 'value')))
+        stats.rebuild()
+        self.assertEqual(materialized, (set(FestivalLineupStats.objects.values_list('festival_id', 'n_performers',
+                                                                                    'n_bands')),
+                                        set(CatalogueStat.objects.values_list('dimension', 'key', 'value'))))
+
+        seeding.clear()
+        self.assertEqual(counters.get_counts(), {Performer: 0, Festival: 0})
+        seeding.CatalogueSeeder(performers=300, festivals=12, seed=7, batch_size=100).run()
+        self.assertEqual(list(Performer.objects.order_by('id').values_list('name', 'festival__name')), names)
+
+    def test_clear_invalidates_fragments(self):
+        cache.clear()
+        festival = Festival.objects.create(name='Woodstock', start=datetime.date(1969, 8, 15),
+                                           end=datetime.date(1969, 8, 18))
+        performer = Performer.objects.create(name='Jimi Hendrix', festival=festival)
+        urls = [reverse('performer-detail', args=[performer.pk]), reverse('festival-detail', args=[festival.pk])]
+        for url in urls:
+            self.assertContains(self.client.get(url), 'Jimi Hendrix')
+        seeding.clear()
+        for url in urls:
+            self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class BenchmarkTest(TransactionTestCase):
+    """Every route of music/urls.py must be requestable by the benchmark (see music/benchmark.py)."""
+
+    def setUp(self):
+        cache.clear()
+        seeding.CatalogueSeeder(performers=50, festivals=5, seed=1).run()
+
+    def test_all_routes(self):
+        results = benchmark.run('client', requests=2, concurrency=2, warmup=0)
+        self.assertEqual(list(results['routes']), benchmark.routes())
+        for name, result in results['routes'].items():
+            self.assertEqual((name, result['errors']), (name, 0))
+            self.assertIsNotNone(result['queries_mean'])
+
+
+class AdminTest(TestCase):
+    """The admin changelists must not count or query per row, and the bulk actions must keep the statistics,
+    the counters and the caches consistent (see music/admin.py and music/bulk.py).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        from django.contrib.auth.models import User
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        seeding.CatalogueSeeder(performers=120, festivals=6, seed=3).run()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.changelist = reverse('admin:music_performer_changelist')
+
+    def assertStatsConsistent(self):
+        materialized = (set(FestivalLineupStats.objects.values_list('festival_id', 'n_performers', 'n_bands')),
+                        set(CatalogueStat.objects.values_list('dimension', 'key', 'value')))
+        stats.rebuild()
+        self.assertEqual(materialized, (set(FestivalLineupStats.objects.values_list('festival_id', 'n_performers',
+                                                                                    'n_bands')),
+                                        set(CatalogueStat.objects.values_list('dimension', 'key', 'value'))))
+
+    def test_changelist_queries(self):
+        self.client.get(self.changelist)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.changelist)
+        self.assertEqual(response.status_code, 200)
+        sql = [query['sql'] for query in queries]
+        self.assertFalse([query for query in sql if 'COUNT(' in query.upper()], sql)
+        self.assertLess(len(sql), 10)
+        self.assertContains(response, '120 performers')
+
+    def test_search(self):
+        name = Performer.objects.values_list('name', flat=True).first()
+        response = self.client.get(self.changelist, {'q': name})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, name)
+
+    def test_festival_autocomplete(self):
+        festival = Festival.objects.order_by('id').first()
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'music', 'model_name': 'performer', 'field_name': 'festival',
+            'term': festival.name.split()[0]})
+        self.assertIn(str(festival.pk), [result['id'] for result in response.json()['results']])
+
+    def test_toggle_band(self):
+        selected = list(Performer.objects.order_by('id').values_list('pk', flat=True)[:30])
+        bands = Performer.objects.filter(pk__in=selected, is_band=True).count()
+        url = Performer.objects.get(pk=selected[0]).get_absolute_url()
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.changelist, {'action': 'toggle_band', '_selected_action': selected})
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('UPDATE "music_performer"')]), 1)
+        self.assertEqual(Performer.objects.filter(pk__in=selected, is_band=True).count(), len(selected) - bands)
+        self.assertStatsConsistent()
+        self.assertContains(self.client.get(url), str(Performer.objects.get(pk=selected[0])))
+
+    def test_reassign_festival(self):
+        festival = Festival.objects.order_by('id').first()
+        data = {'action': 'reassign_festival', 'select_across': '1',
+                '_selected_action': Performer.objects.values_list('pk', flat=True)[:1]}
+        response = self.client.post(self.changelist, data)
+        self.assertContains(response, '120 selected performers')
+        self.client.post(self.changelist, {**data, 'apply': 'yes', 'festival': festival.pk})
+        self.assertEqual(Performer.objects.filter(festival=festival).count(), 120)
+        self.assertEqual(counters.get_counts(), {Performer: 120, Festival: 6})
+        self.assertStatsConsistent()
+
+    def test_delete_festivals_permissions(self):
+        from django.contrib.auth.models import Permission, User
+        staff = User.objects.create_user('staff', is_staff=True)
+        staff.user_permissions.set(Permission.objects.filter(codename__in=['view_festival', 'delete_festival']))
+        self.client.force_login(staff)
+        festival = Festival.objects.filter(performer__isnull=False).distinct().first()
+        data = {'action': 'delete_selected', '_selected_action': [festival.pk]}
+        changelist = reverse('admin:music_festival_changelist')
+        # Deleting the festival would change its performers
+        response = self.client.post(changelist, data)
+        self.assertContains(response, "doesn't have permission to delete the following types of objects")
+        self.assertContains(response, '<li>performer</li>', html=True)
+        self.assertEqual(self.client.post(changelist, {**data, 'post': 'yes'}).status_code, 403)
+        self.assertTrue(Festival.objects.filter(pk=festival.pk).exists())
+
+        staff.user_permissions.add(Permission.objects.get(codename='change_performer'))
+        staff = User.objects.get(pk=staff.pk)
+        self.client.force_login(staff)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(changelist, {**data, 'post': 'yes'})
+        self.assertFalse(Festival.objects.filter(pk=festival.pk).exists())
+        self.assertStatsConsistent()
+
+
+class FestivalPickerTest(TestCase):
+    """The performer form must not load the festivals, and the lookup endpoint must return a bounded number
+    of matches (see music/forms.py and festival_lookup() in music/views.py).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.festival = Festival.objects.create(name='Woodstock', location='Bethel, NY',
+                                               start=datetime.date(1969, 8, 15), end=datetime.date(1969, 8, 18))
+        Festival.objects.bulk_create(Festival(name=f'Wood Festival {n}', location='Bethel, NY') for n in range(30))
+        cls.performer = Performer.objects.create(name='Joan Baez', festival=cls.festival)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_form_does_not_list_festivals(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('performer-update', args=[self.performer.pk]))
+        self.assertNotContains(response, '<select name="festival"')
+        self.assertNotContains(response, 'Wood Festival')
+        self.assertContains(response, 'value="Woodstock (1969), Bethel, NY"')
+        festival_queries = [query['sql'] for query in queries if 'FROM "music_festival"' in query['sql']]
+        self.assertFalse([sql for sql in festival_queries if 'WHERE' not in sql], festival_queries)
+
+    def test_invalid_festival(self):
+        # The submitted value is rendered again with the errors: values that are not ids get no label
+        for value in ('abc', '1.5', '-1', str(self.festival.pk + 1000)):
+            with self.subTest(value=value):
+                form = PerformerForm(data={'name': 'x', 'festival': value})
+                self.assertFalse(form.is_valid())
+                self.assertIn('id="id_festival" value=""', str(form['festival']))
+        form = PerformerForm(data={'name': 'x', 'festival': str(self.festival.pk)})
+        self.assertIn('value="Woodstock (1969), Bethel, NY"', str(form['festival']))
+        response = self.client.post(reverse('performer-update', args=[self.performer.pk]),
+                                    {'name': 'Joan Baez', 'is_band': 'False', 'festival': 'abc'})
+        self.assertContains(response, 'value="abc"')
+
+    def test_lookup(self):
+        results = self.client.get(reverse('festival-lookup'), {'q': 'wood'}).json()['results']
+        self.assertEqual(len(results), 10)
+        self.assertEqual(self.client.get(reverse('festival-lookup'), {'q': 'w'}).json(), {'results': []})
+        results = self.client.get(reverse('festival-lookup'), {'q': 'woodst'}).json()['results']
+        self.assertEqual(results, [{'id': self.festival.pk, 'label': 'Woodstock (1969), Bethel, NY'}])
+
+    def test_lookup_sees_new_festivals(self):
+        self.client.get(reverse('festival-lookup'), {'q': 'monterey'})
+        with self.captureOnCommitCallbacks(execute=True):
+            festival = Festival.objects.create(name='Monterey Pop', location='Monterey, CA')
+        results = self.client.get(reverse('festival-lookup'), {'q': 'monterey'}).json()['results']
+        self.assertEqual([result['id'] for result in results], [festival.pk])
+
+    def test_create_performer(self):
+        response = self.client.post(reverse('performer-create'),
+                                    {'name': 'Arlo Guthrie', 'is_band': 'False', 'festival': self.festival.pk})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Performer.objects.get(name='Arlo Guthrie').festival, self.festival)
+        response = self.client.post(reverse('performer-create'), {'name': 'Melanie', 'is_band': 'False'})
+        self.assertEqual(response.status_code, 302)
+        self.assertIsNone(Performer.objects.get(name='Melanie').festival)
+
+
+class LineupManagementTest(TestCase):
+    """Deleting a festival and moving/merging lineups must be set-based and keep the counters, the statistics
+    and the caches consistent (see music/bulk.py).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.source = Festival.objects.create(name='Woodstock', location='Bethel, NY',
+                                             start=datetime.date(1969, 8, 15), end=datetime.date(1969, 8, 18))
+        cls.target = Festival.objects.create(name='Monterey Pop', location='Monterey, CA',
+                                             start=datetime.date(1967, 6, 16), end=datetime.date(1967, 6, 18))
+        Performer.objects.bulk_create(Performer(name=f'Performer {n}', is_band=n % 3 == 0, festival=cls.source)
+                                      for n in range(40))
+        Performer.objects.create(name='Otis Redding', festival=cls.target)
+        counters.reconcile()
+        stats.rebuild()
+
+    def setUp(self):
+        cache.clear()
+
+    def assertStatsConsistent(self):
+        AdminTest.assertStatsConsistent(self)
+
+    def test_delete_festival(self):
+        url = reverse('festival-delete', args=[self.source.pk])
+        response = self.client.get(url)
+        self.assertContains(response, 'Its 40 performers')
+        self.assertContains(response, '(14 bands, 26 solo musicians)')
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url)
+        # The performers are detached with one UPDATE and never loaded one by one
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "music_performer"')]
+        self.assertEqual(len([sql for sql in updates if '"updated_at"' in sql]), 1, updates)
+        self.assertFalse([query['sql'] for query in queries
+                          if query['sql'].startswith('SELECT "music_performer"."id", "music_performer"."name"')])
+        self.assertRedirects(response, reverse('festival-list'))
+        self.assertEqual(Performer.objects.filter(festival__isnull=True).count(), 40)
+        self.assertEqual(counters.get_counts(), {Performer: 41, Festival: 1})
+        self.assertStatsConsistent()
+
+    def test_move_lineup(self):
+        url = reverse('festival-lineup', args=[self.source.pk])
+        self.client.get(self.target.get_absolute_url())
+        response = self.client.post(url, {'target': self.target.pk})
+        self.assertContains(response, 'Move all 40 performers')
+        self.assertContains(response, 'which has 1 performer?')
+        self.assertEqual(Performer.objects.filter(festival=self.target).count(), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {'target': self.target.pk, 'confirm': 'yes'})
+        self.assertRedirects(response, self.target.get_absolute_url())
+        self.assertEqual(Performer.objects.filter(festival=self.target).count(), 41)
+        self.assertTrue(Festival.objects.filter(pk=self.source.pk).exists())
+        self.assertContains(self.client.get(self.target.get_absolute_url()), 'Lineup (41 performers)')
+        self.assertStatsConsistent()
+
+    def test_merge_festivals(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('festival-lineup', args=[self.source.pk]),
+                             {'target': self.target.pk, 'merge': 'on', 'confirm': 'yes'})
+        self.assertFalse(Festival.objects.filter(pk=self.source.pk).exists())
+        self.assertEqual(Performer.objects.filter(festival=self.target).count(), 41)
+        self.assertEqual(counters.get_counts(), {Performer: 41, Festival: 1})
+        self.assertStatsConsistent()
+
+    def test_same_festival(self):
+        response = self.client.post(reverse('festival-lineup', args=[self.source.pk]), {'target': self.source.pk})
+        self.assertContains(response, 'Choose another festival.')
+
+
+class KeysetPaginationTest(TestCase):
+    """Keyset pagination (music/pagination.py) pages through every row exactly once, in both directions,
+    with NULL and duplicate sort keys, and seeks into the index instead of scanning it.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        starts = [None, None, datetime.date(1969, 8, 15), datetime.date(1969, 8, 15), datetime.date(1970, 8, 26),
+                  None, datetime.date(1967, 6, 16), datetime.date(1969, 8, 15)]
+        Festival.objects.bulk_create(Festival(name=f'Festival {i}', start=start) for i, start in enumerate(starts))
+        Performer.objects.bulk_create(Performer(name=name) for name in 'BACABBCAA')
+
+    def pages(self, paginator):
+        """The pages from the first to the last one (following next_cursor), then back (previous_cursor)."""
+
+        forward = [paginator.page()]
+        while forward[-1].has_next():
+            forward.append(paginator.page(forward[-1].next_cursor))
+        backward = [forward[-1]]
+        while backward[-1].has_previous():
+            backward.append(paginator.page(backward[-1].previous_cursor))
+        return forward, backward[::-1]
+
+    def assertPagesThrough(self, paginator, expected):
+        forward, backward = self.pages(paginator)
+        for pages in (forward, backward):
+            self.assertEqual([[obj.pk for obj in page] for page in pages],
+                             [expected[i:i + paginator.per_page] for i in range(0, len(expected), paginator.per_page)])
+        self.assertFalse(forward[0].has_previous())
+        self.assertTrue(all(page.has_previous() for page in forward[1:]))
+        self.assertFalse(forward[-1].has_next())
+
+    def test_duplicate_keys(self):
+        expected = [p.pk for p in sorted(Performer.objects.all(), key=lambda p: (p.name, p.pk))]
+        for per_page in (1, 2, 4, 9, 10):
+            with self.subTest(per_page=per_page):
+                self.assertPagesThrough(KeysetPaginator(Performer.objects.all(), ('name',), per_page), expected)
+
+    def test_null_keys(self):
+        expected = [f.pk for f in sorted(Festival.objects.all(),
+                                         key=lambda f: (f.start is not None, f.start or datetime.date.min, f.pk))]
+        for per_page in (1, 2, 3, 5, 8):
+            with self.subTest(per_page=per_page):
+                self.assertPagesThrough(KeysetPaginator(Festival.objects.all(), ('start',), per_page), expected)
+
+    def test_async_page(self):
+        paginator = KeysetPaginator(Festival.objects.all(), ('start',), 3)
+        page = paginator.page(paginator.page().next_cursor)
+        self.assertEqual([f.pk for f in async_to_sync(paginator.apage)(paginator.page().next_cursor)],
+                         [f.pk for f in page])
+
+    def test_index_seek(self):
+        paginator = KeysetPaginator(Performer.objects.all(), ('name',), 2)
+        cursor = paginator.page().next_cursor
+        (queryset, direction), = paginator._page_queries(cursor)
+        self.assertIn('SEARCH', queryset.explain())
+        self.assertIn('performer_name_id_idx', queryset.explain())
+        # One query per page, unless the cursor is in the section of NULL keys
+        with self.assertNumQueries(1):
+            paginator.page(cursor)
+
+    def test_tampered_cursor(self):
+        paginator = KeysetPaginator(Festival.objects.all(), ('start',), 3)
+
+        def token(payload):
+            return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+        for cursor in ('not a cursor', '!!!!', token([1, 2]), token({'d': 'n'}), token({'d': 'x', 'k': [None, 1]}),
+                       token({'d': 'n', 'k': [None]}), token({'d': 'n', 'k': [None, None]}),
+                       token({'d': 'n', 'k': ['someday', 1]}), token({'d': 'n', 'k': [None, 'one']})):
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                paginator.page(cursor)
+
+    def test_views(self):
+        response = self.client.get(reverse('performer-list'), {'cursor': 'not a cursor'})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse('api-festival-list'), {'cursor': 'not a cursor'})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get(reverse('api-festival-list'), {'limit': 3})
+        names = [festival['name'] for festival in response.json()['results']]
+        while response.json()['next']:
+            response = self.client.get(response.json()['next'])
+            names += [festival['name'] for festival in response.json()['results']]
+        self.assertEqual(sorted(names), sorted(Festival.objects.values_list('name', flat=True)))
+        self.assertEqual(len(names), 8)
+
+
+class CounterTest(TestCase):
+    """The Performer/Festival counters (music/counters.py) follow creations and deletions,
+    and are repaired from COUNT(*) when they are missing or have drifted.
+    """
+
+    def setUp(self):
+        cache.clear()
+        counters.reconcile()
+
+    def test_adjust_on_save_and_delete(self):
+        festival = Festival.objects.create(name='Woodstock')
+        performers = [Performer.objects.create(name=name, festival=festival) for name in ('Santana', 'The Who')]
+        self.assertEqual(counters.get_counts(), {Performer: 2, Festival: 1})
+        performers[0].name = 'Carlos Santana'
+        performers[0].save()
+        self.assertEqual(counters.get_counts(), {Performer: 2, Festival: 1})
+        performers[1].delete()
+        festival.delete()
+        self.assertEqual(counters.get_counts(), {Performer: 1, Festival: 0})
+
+    def test_missing_counter(self):
+        Performer.objects.bulk_create(Performer(name=f'Performer {i}') for i in range(3))
+        CatalogueCounter.objects.all().delete()
+        self.assertEqual(counters.get_counts([Performer]), {Performer: 3})
+        CatalogueCounter.objects.all().delete()
+        counters.adjust(Festival, 1)
+        self.assertEqual(CatalogueCounter.objects.get(name='music.festival').value, 0)
+
+    def test_reconcile_drift(self):
+        Performer.objects.bulk_create(Performer(name=f'Performer {i}') for i in range(3))
+        self.assertEqual(counters.get_counts([Performer]), {Performer: 0})
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('music.performer: 3 (was 0)', out.getvalue())
+        self.assertIn('music.festival: 0\n', out.getvalue())
+        self.assertEqual(counters.get_counts(), {Performer: 3, Festival: 0})
+
+    def test_index_reads_counters(self):
+        Performer.objects.create(name='Janis Joplin')
+        # The counters are read in one query, with no COUNT(*)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('index'))
+        self.assertContains(response, '<strong>Performers: </strong>1')
+        self.assertFalse([query['sql'] for query in queries if 'COUNT(' in query['sql']])
+        self.assertEqual(len(queries), 1)
+
+
+class FragmentCacheTest(TestCase):
+    """The detail page fragments (music/fragments.py) are served from the cache until something they show changes,
+    and the versions they depend on are bumped only when the change is committed.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.woodstock = Festival.objects.create(name='Woodstock', location='Bethel, NY',
+                                                 start=datetime.date(1969, 8, 15), end=datetime.date(1969, 8, 18))
+        self.monterey = Festival.objects.create(name='Monterey Pop', location='Monterey, CA',
+                                                start=datetime.date(1967, 6, 16), end=datetime.date(1967, 6, 18))
+        self.performer = Performer.objects.create(name='Jimi Hendrix', festival=self.woodstock)
+
+    def test_versions(self):
+        key = fragments.version_key('performer', 1)
+        self.assertIsNone(cache.get(key))
+        versions = fragments.current_versions([('performer', 1), ('festival', None)])
+        self.assertEqual(list(versions), [key])
+        fragments.bump('performer', 1, None)
+        self.assertEqual(cache.get(key), versions[key] + 1)
+        cache.delete(key)
+        fragments.bump('performer', 1)
+        self.assertNotEqual(cache.get(key), versions[key] + 1)
+        fragments.bump_many('performer', [1, 2, None])
+        self.assertEqual(len(cache.get_many([key, fragments.version_key('performer', 2)])), 2)
+
+    def test_stale_fragment(self):
+        fragments.set_fragment('performer-detail', 1, '<p>old</p>', [('performer', 1)])
+        self.assertEqual(fragments.get_fragment('performer-detail', 1), '<p>old</p>')
+        fragments.bump('performer', 1)
+        self.assertIsNone(fragments.get_fragment('performer-detail', 1))
+        self.assertIsNone(fragments.get_fragment('performer-detail', 2))
+        self.assertEqual(fragments.stats(['performer-detail'])['performer-detail'],
+                         {'hits': 1, 'misses': 1, 'stale': 1, 'hit_ratio': 1 / 3})
+
+    def test_detail_pages(self):
+        performer_url = reverse('performer-detail', args=[self.performer.pk])
+        woodstock_url = reverse('festival-detail', args=[self.woodstock.pk])
+        monterey_url = reverse('festival-detail', args=[self.monterey.pk])
+        for url in (performer_url, woodstock_url, monterey_url):
+            self.client.get(url)
+        # On a hit, only the page state (ETag, see music/conditional.py) is read from the database
+        with self.assertNumQueries(1):
+            self.assertContains(self.client.get(woodstock_url), 'Jimi Hendrix')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.performer.festival = self.monterey
+            self.performer.save()
+        self.assertNotContains(self.client.get(woodstock_url), 'Jimi Hendrix')
+        self.assertContains(self.client.get(monterey_url), 'Jimi Hendrix')
+        self.assertContains(self.client.get(performer_url), 'Monterey Pop')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.monterey.name = 'Monterey International Pop'
+            self.monterey.save()
+        self.assertContains(self.client.get(performer_url), 'Monterey International Pop')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.performer.delete()
+        self.assertNotContains(self.client.get(monterey_url), 'Jimi Hendrix')
+        self.assertEqual(self.client.get(performer_url).status_code, 404)
+
+    def test_bump_on_commit(self):
+        key = fragments.version_key('performer', self.performer.pk)
+        version = fragments.current_versions([('performer', self.performer.pk)])[key]
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.performer.name = 'Jimi'
+            self.performer.save()
+            # Not before the transaction is committed
+            self.assertEqual(cache.get(key), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(cache.get(key), version)
+
+        # Nor after a rollback
+        version = cache.get(key)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    self.performer.save()
+                    raise DatabaseError
+            except DatabaseError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertEqual(cache.get(key), version)
+
+
+class ImporterTest(TestCase):
+    """import_lineup (music/importer.py) validates every row, resolves the festivals of performers by name
+    and writes each batch in its own transaction, keeping the counters and the statistics in step.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_festivals_csv(self):
+        path = self.write('festivals.csv', 'name,start,end,location\n'
+                                           'Woodstock,1969-08-15,1969-08-18,"Bethel, NY"\n'
+                                           'Monterey Pop,1967-06-16,,\n'
+                                           ',1970-01-01,,\n'
+                                           'Backwards,1970-08-30,1970-08-26,\n'
+                                           'Bad date,1970-02-30,,\n'
+                                           f'{"x" * 101},,,\n')
+        errors = []
+        importer = LineupImporter('festivals', on_error=lambda number, message: errors.append((number, message)))
+        importer.run(read_rows(path))
+        self.assertEqual((importer.created, importer.errors), (3, 3))
+        self.assertEqual([number for number, message in errors], [4, 5, 6])
+        self.assertEqual(errors[0][1], 'end: the festival ends before it starts')
+        self.assertTrue(errors[1][1].startswith('start: '))
+        self.assertIn('at most 100 characters', errors[2][1])
+        # Empty optional columns get the field defaults
+        monterey = Festival.objects.get(name='Monterey Pop')
+        self.assertEqual((monterey.end, monterey.location), (None, 'location unknown'))
+        self.assertTrue(Festival.objects.filter(name='unknown', start=datetime.date(1970, 1, 1)).exists())
+        self.assertEqual(counters.get_counts([Festival]), {Festival: 3})
+        self.assertEqual(CatalogueStat.objects.get(dimension='year', key='1969').value, 1)
+
+    def test_performers_ndjson(self):
+        oldest = Festival.objects.create(name='Woodstock')
+        Festival.objects.create(name='Woodstock')
+        path = self.write('performers.ndjson', '\n'.join([
+            '{"name": "Santana", "festival": "Woodstock"}',
+            '{"name": "The Who", "is_band": "band", "festival": "Woodstock"}',
+            '{"name": "Nico", "is_band": false}',
+            '',
+            '{"name": "Otis Redding", "festival": "Monterey Pop"}',
+            '{"name": "Broken", ',
+            '{"name": "Maybe", "is_band": "perhaps"}',
+            '["not", "an", "object"]',
+        ]))
+        errors = []
+        importer = LineupImporter('performers', batch_size=2,
+                                  on_error=lambda number, message: errors.append((number, message)))
+        importer.run(read_rows(path))
+        self.assertEqual((importer.created, importer.errors), (3, 4))
+        self.assertEqual(errors[0], (4, "festival: unknown festival 'Monterey Pop'"))
+        self.assertTrue(errors[1][1].startswith('invalid JSON'))
+        self.assertEqual(errors[2], (6, "is_band: invalid value 'perhaps'"))
+        self.assertEqual(errors[3], (7, 'a row must be an object'))
+        # With duplicate festival names, the oldest festival wins
+        self.assertEqual(set(Performer.objects.filter(festival=oldest).values_list('name', flat=True)),
+                         {'Santana', 'The Who'})
+        self.assertEqual(Performer.objects.get(name='The Who').is_band, True)
+        self.assertEqual(counters.get_counts([Performer]), {Performer: 3})
+        self.assertEqual(FestivalLineupStats.objects.get(festival=oldest).n_performers, 2)
+
+    def test_create_festivals(self):
+        path = self.write('performers.csv', 'name,is_band,festival\n'
+                                            'Otis Redding,0,Monterey Pop\n'
+                                            'The Byrds,1,Monterey Pop\n'
+                                            'Nico,,\n')
+        importer = LineupImporter('performers', create_festivals=True)
+        importer.run(read_rows(path))
+        self.assertEqual((importer.created, importer.errors), (3, 0))
+        monterey = Festival.objects.get(name='Monterey Pop')
+        self.assertEqual(monterey.performer_set.count(), 2)
+        self.assertEqual(counters.get_counts(), {Performer: 3, Festival: 1})
+
+    def test_batch_rollback(self):
+        path = self.write('performers.csv', 'name\n' + ''.join(f'Performer {i}\n' for i in range(5)))
+        importer = LineupImporter('performers', batch_size=2)
+        refresh_stats = importer.refresh_stats
+        batches = []
+
+        def fail_on_second_batch(batch):
+            batches.append(batch)
+            refresh_stats(batch)
+            if len(batches) == 2:
+                raise DatabaseError('disk full')
+
+        importer.refresh_stats = fail_on_second_batch
+        with self.assertRaises(DatabaseError):
+            importer.run(read_rows(path))
+        # The first batch stays, the second one is rolled back with its counter and statistics updates
+        self.assertEqual(list(Performer.objects.order_by('name').values_list('name', flat=True)),
+                         ['Performer 0', 'Performer 1'])
+        self.assertEqual(importer.created, 2)
+        self.assertEqual(counters.get_counts([Performer]), {Performer: 2})
+        self.assertEqual(CatalogueStat.objects.get(dimension='kind', key='musician').value, 2)
+
+    def test_created_festivals_roll_back(self):
+        path = self.write('performers.csv', 'name,festival\n'
+                                            'Otis Redding,Monterey Pop\n'
+                                            'The Byrds,Monterey Pop\n'
+                                            'Jimi Hendrix,Monterey Pop\n'
+                                            'Santana,Woodstock\n')
+        importer = LineupImporter('performers', batch_size=2, create_festivals=True)
+        refresh_stats = importer.refresh_stats
+        batches = []
+
+        def fail_on_second_batch(batch):
+            batches.append(batch)
+            refresh_stats(batch)
+            if len(batches) == 2:
+                raise DatabaseError('disk full')
+
+        importer.refresh_stats = fail_on_second_batch
+        with self.assertRaises(DatabaseError):
+            importer.run(read_rows(path))
+        # The festival of the first batch is reused by the second one, whose own new festival is rolled back
+        self.assertEqual(list(Festival.objects.values_list('name', flat=True)), ['Monterey Pop'])
+        self.assertEqual(list(Performer.objects.order_by('name').values_list('name', 'festival__name')),
+                         [('Otis Redding', 'Monterey Pop'), ('The Byrds', 'Monterey Pop')])
+        self.assertEqual(counters.get_counts(), {Performer: 2, Festival: 1})
+        self.assertEqual(dict(importer.festival_ids), {'Monterey Pop': Festival.objects.get().pk})
+
+    def test_command(self):
+        path = self.write('festivals.ndjson', '{"name": "Woodstock", "start": "1969-08-15"}\n{"start": "x"}\n')
+        out, err = StringIO(), StringIO()
+        call_command('import_lineup', path, '--model', 'festivals', stdout=out, stderr=err)
+        self.assertIn('1 festivals imported, 1 invalid rows skipped', out.getvalue())
+        self.assertIn('row 2: ', err.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('import_lineup', os.path.join(self.directory.name, 'missing.csv'), '--model', 'festivals')
+
+
+class ExportTest(TestCase):
+    """The export view and export_lineup (music/exporter.py) stream every row, starting with the first line."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.festival = Festival.objects.create(name='Woodstock', location='Bethel, NY',
+                                               start=datetime.date(1969, 8, 15), end=datetime.date(1969, 8, 18))
+        Performer.objects.bulk_create([Performer(name='Santana', festival=cls.festival),
+                                       Performer(name='The Who, live', is_band=True, festival=cls.festival),
+                                       Performer(name='Nico')])
+
+    def test_chunks(self):
+        chunks = list(exporter.export_chunks('performers', 'ndjson', chunk_size=2))
+        self.assertEqual([chunk.count('\n') for chunk in chunks], [1, 2])
+        self.assertEqual(json.loads(chunks[0]), {'id': Performer.objects.get(name='Santana').pk, 'name': 'Santana',
+                                                 'is_band': False, 'festival': 'Woodstock'})
+        chunks = list(exporter.export_chunks('performers', 'csv', chunk_size=2))
+        self.assertEqual(chunks[0], 'id,name,is_band,festival\r\n')
+        self.assertEqual([chunk.count('\r\n') for chunk in chunks], [1, 2, 1])
+        self.assertEqual(list(exporter.export_chunks('festivals', 'ndjson', chunk_size=2))[1:], [])
+
+    def test_view(self):
+        response = self.client.get(reverse('export', args=['performers']))
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="performers.csv"')
+        rows = list(csv.DictReader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([(row['name'], row['is_band'], row['festival']) for row in rows],
+                         [('Santana', 'False', 'Woodstock'), ('The Who, live', 'True', 'Woodstock'),
+                          ('Nico', 'False', '')])
+
+        response = self.client.get(reverse('export', args=['festivals']), {'format': 'ndjson'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual([json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()],
+                         [{'id': self.festival.pk, 'name': 'Woodstock', 'start': '1969-08-15', 'end': '1969-08-18',
+                           'location': 'Bethel, NY'}])
+
+        self.assertEqual(self.client.get(reverse('export', args=['tickets'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('export', args=['festivals']), {'format': 'xml'}).status_code, 404)
+
+    def test_round_trip(self):
+        out = StringIO()
+        call_command('export_lineup', '--model', 'performers', stdout=out)
+        Performer.objects.all().delete()
+        importer = LineupImporter('performers')
+        importer.run(csv.DictReader(StringIO(out.getvalue())))
+        self.assertEqual((importer.created, importer.errors), (3, 0))
+        self.assertEqual(Performer.objects.get(name='The Who, live').festival, self.festival)
+
+
+class SearchTest(TestCase):
+    """The full-text index (music/search.py) follows every kind of write through its triggers."""
+
+    def setUp(self):
+        self.jimi = Performer.objects.create(name='Jimi Hendrix')
+        self.janis = Performer.objects.create(name='Janis Joplin')
+
+    def assertFound(self, query, *performers):
+        self.assertEqual(search.search(Performer, query), list(performers))
+        self.assertEqual(set(search.filter_queryset(Performer.objects.all(), query)), set(performers))
+
+    def assertIndexConsistent(self):
+        with connection.cursor() as cursor:
+            for fts_table, _, _ in search.FTS_TABLES.values():
+                cursor.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('integrity-check')")
+
+    def test_prefixes(self):
+        self.assertFound('jim hen', self.jimi)
+        self.assertFound('jo', self.janis)
+        # FTS5 syntax is dropped (it would otherwise be a syntax error or an unintended query)
+        self.assertFound('"jimi* -(:^', self.jimi)
+        self.assertFound('jimi OR janis')
+        self.assertFound('')
+
+    def test_save_and_delete(self):
+        self.jimi.name = 'Jimmy Page'
+        self.jimi.save()
+        self.assertFound('hendrix')
+        self.assertFound('page', self.jimi)
+        self.janis.delete()
+        self.assertFound('joplin')
+        self.assertIndexConsistent()
+
+    def test_bulk_and_raw_writes(self):
+        Performer.objects.filter(pk=self.jimi.pk).update(name='Jimmy Page')
+        self.assertFound('hendrix')
+        self.assertFound('jimmy', self.jimi)
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE music_performer SET name = %s WHERE id = %s', ['Joni Mitchell', self.janis.pk])
+        self.assertFound('joplin')
+        self.assertFound('mitch', self.janis)
+        Performer.objects.bulk_create([Performer(name='Joe Cocker')])
+        self.assertEqual(len(search.search(Performer, 'jo')), 2)
+        Performer.objects.filter(name__startswith='Jo').delete()
+        self.assertFound('jo')
+        self.assertIndexConsistent()
+
+    def test_festival_ranking(self):
+        woodstock = Festival.objects.create(name='Woodstock', location='Bethel, NY')
+        bethel = Festival.objects.create(name='Bethel Woods', location='Bethel, NY')
+        café = Festival.objects.create(name='Café Montréal', location='Montréal, QC')
+        # A match in the name weighs more than a match in the location
+        self.assertEqual(search.search(Festival, 'bethel'), [bethel, woodstock])
+        self.assertEqual(search.search(Festival, 'montreal cafe'), [café])
+        Festival.objects.filter(pk=woodstock.pk).update(location='Saugerties, NY')
+        self.assertEqual(search.search(Festival, 'bethel'), [bethel])
+
+    def test_rebuild(self):
+        search.uninstall()
+        search.install()
+        self.assertFound('jimi', self.jimi)
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertFound('janis', self.janis)
+        self.assertIndexConsistent()
+
+
+class FestivalDateRangeTest(TestCase):
+    """FestivalQuerySet.overlapping() and active_on() (music/models.py), and the festival calendar."""
+
+    @classmethod
+    def setUpTestData(cls):
+        def festival(name, start, end):
+            return Festival.objects.create(name=name, start=start, end=end)
+
+        cls.woodstock = festival('Woodstock', datetime.date(1969, 8, 15), datetime.date(1969, 8, 18))
+        cls.one_day = festival('One day', datetime.date(1969, 8, 20), None)
+        cls.new_year = festival('New Year', datetime.date(1969, 12, 30), datetime.date(1970, 1, 2))
+        cls.undated = festival('Undated', None, None)
+
+    def names(self, queryset):
+        return set(queryset.values_list('name', flat=True))
+
+    def test_overlapping(self):
+        overlapping = Festival.objects.overlapping
+        # Both ends are inclusive
+        self.assertEqual(self.names(overlapping(datetime.date(1969, 8, 18), datetime.date(1969, 8, 20))),
+                         {'Woodstock', 'One day'})
+        self.assertEqual(self.names(overlapping(datetime.date(1969, 8, 10), datetime.date(1969, 8, 15))),
+                         {'Woodstock'})
+        self.assertEqual(self.names(overlapping(datetime.date(1969, 8, 21), datetime.date(1969, 12, 29))), set())
+        self.assertEqual(self.names(overlapping(datetime.date(1970, 1, 1), datetime.date(1970, 12, 31))),
+                         {'New Year'})
+        self.assertEqual(self.names(overlapping(datetime.date(1900, 1, 1), datetime.date(2100, 1, 1))),
+                         {'Woodstock', 'One day', 'New Year'})
+
+    def test_active_on(self):
+        active_on = Festival.objects.active_on
+        self.assertEqual(self.names(active_on(datetime.date(1969, 8, 16))), {'Woodstock'})
+        self.assertEqual(self.names(active_on(datetime.date(1969, 8, 20))), {'One day'})
+        self.assertEqual(self.names(active_on(datetime.date(1969, 8, 21))), set())
+        self.assertEqual(self.names(active_on(datetime.date(1970, 1, 2))), {'New Year'})
+
+    def test_index(self):
+        plan = Festival.objects.overlapping(datetime.date(1969, 1, 1), datetime.date(1969, 12, 31)).explain()
+        self.assertIn('SEARCH music_festival USING INDEX festival_start_end_idx', plan)
+
+    def test_calendar(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('festival-calendar-year', args=[1969]))
+        months = {month.month: festivals for month, festivals in response.context['months']}
+        self.assertEqual(months[8], [self.woodstock, self.one_day])
+        self.assertEqual(months[12], [self.new_year])
+        self.assertEqual(sum(len(festivals) for festivals in months.values()), 3)
+        response = self.client.get(reverse('festival-calendar-year', args=[1970]))
+        self.assertEqual([month.month for month, festivals in response.context['months'] if festivals], [1])
+
+    def test_calendar_year_range(self):
+        for year in (0, 10000, 99999999):
+            with self.subTest(year=year):
+                response = self.client.get(reverse('festival-calendar-year', args=[year]))
+                self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse('festival-calendar-year', args=[9999]))
+        self.assertContains(response, reverse('festival-calendar-year', args=[9998]))
+        self.assertNotContains(response, '10000')
+        response = self.client.get(reverse('festival-calendar-year', args=[1]))
+        self.assertContains(response, reverse('festival-calendar-year', args=[2]))
+        self.assertNotContains(response, reverse('festival-calendar-year', args=[0]))
+        response = self.client.get(reverse('festival-calendar'))
+        self.assertEqual(response.context['year'], timezone.localdate().year)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReadReplicaRoutingTest(TestCase):
+    """The reads of the music app go to the replicas only in the safe requests of clients that have not
+    just written something (woodstock_dj/routers.py); everything else reads from the primary.
+    There is no 'replica' database in the tests, so a read routed to it fails with ConnectionDoesNotExist.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.router = routers.ReadReplicaRouter()
+
+    def in_request(self, method='get', cookies=None, view=lambda request: None):
+        """Runs view(request) in a request through ReadYourWritesMiddleware; returns the response."""
+
+        request = getattr(RequestFactory(), method)('/')
+        request.COOKIES.update(cookies or {})
+
+        def get_response(request):
+            view(request)
+            return HttpResponse()
+
+        return routers.ReadYourWritesMiddleware(get_response)(request)
+
+    def test_routing(self):
+        reads = []
+
+        def read(request):
+            reads.append((self.router.db_for_read(Performer), self.router.db_for_read(Session)))
+
+        self.in_request(view=read)
+        self.in_request(cookies={routers.STICKY_COOKIE: '1'}, view=read)
+        self.in_request('post', view=read)
+        # Outside the requests
+        read(None)
+        self.assertEqual(reads, [('replica', 'default')] + [('default', 'default')] * 3)
+
+    def test_read_your_writes(self):
+        reads = []
+
+        def write(request):
+            reads.append(self.router.db_for_read(Performer))
+            self.router.db_for_write(Performer)
+            reads.append(self.router.db_for_read(Performer))
+
+        response = self.in_request(view=write)
+        self.assertEqual(reads, ['replica', 'default'])
+        self.assertIn(routers.STICKY_COOKIE, response.cookies)
+        # Writes of other apps (e.g., the session of a safe request) do not pin the client to the primary
+        response = self.in_request(view=lambda request: self.router.db_for_write(Session))
+        self.assertNotIn(routers.STICKY_COOKIE, response.cookies)
+
+    def test_pages(self):
+        with self.assertRaises(ConnectionDoesNotExist):
+            self.client.get(reverse('performer-list'))
+        response = self.client.post(reverse('performer-create'), {'name': 'Joan Baez', 'is_band': 'False'})
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(routers.STICKY_COOKIE, response.cookies)
+        self.assertContains(self.client.get(reverse('performer-list')), 'Joan Baez')
+
+    def test_maintenance_reads_from_primary(self):
+        festival = Festival.objects.create(name='Woodstock', location='Bethel, NY')
+        performer = Performer.objects.create(name='Santana', festival=festival)
+
+        def maintain(request):
+            counters.reconcile()
+            stats.rebuild()
+            stats.refresh_lineups({festival.pk})
+            stats.refresh_locations({festival.location})
+            stats.refresh_years({stats.year_key(festival.start)})
+            stats.adjust_kind(False, 0)
+            bulk.set_band(Performer.objects.all(), True)
+            # Saved without having been loaded, so the signal handlers look up the previous state
+            Performer(pk=performer.pk, name='Carlos Santana', festival=None).save()
+            Festival(pk=festival.pk, name='Woodstock', location='Saugerties, NY').save()
+
+        maintain(None)
+        self.in_request(view=maintain)
+        self.assertEqual(counters.get_counts(), {Performer: 1, Festival: 1})
+        self.assertEqual(FestivalLineupStats.objects.get(festival=festival).n_performers, 0)
+        self.assertEqual(dict(stats.dimension(stats.LOCATION)), {'Saugerties, NY': 1})
+
+
+class AsyncViewTest(TestCase):
+    """The async views (music/async_views.py, served under ASGI) render the same pages as the sync views."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.festival = Festival.objects.create(name='Woodstock', location='Bethel, NY',
+                                               start=datetime.date(1969, 8, 15), end=datetime.date(1969, 8, 18))
+        Performer.objects.bulk_create(Performer(name=f'Performer {i:02}', festival=cls.festival) for i in range(60))
+        counters.reconcile()
+        stats.rebuild()
+        cls.performer = Performer.objects.order_by('name').first()
+
+    def setUp(self):
+        cache.clear()
+
+    def call(self, view, path, headers=None, **kwargs):
+        """Calls an async view the way the URL resolver does (the URL parameters as keyword arguments)."""
+
+        return async_to_sync(view)(AsyncRequestFactory().get(path, headers=headers), **kwargs)
+
+    def assertSamePage(self, view, url_name, query='', **kwargs):
+        path = reverse(url_name, kwargs=kwargs) + query
+        response = self.call(view, path, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        cache.clear()
+        self.assertEqual(response.content.decode(), self.client.get(path).content.decode())
+        return response
+
+    def test_index(self):
+        response = self.assertSamePage(async_views.index, 'index')
+        self.assertContains(response, '<strong>Performers: </strong>60')
+
+    def test_async_counts(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(async_to_sync(counters.aget_counts)(), {Performer: 60, Festival: 1})
+        # A missing counter is reconciled, like in get_counts()
+        CatalogueCounter.objects.filter(name=counters.counter_name(Festival)).delete()
+        self.assertEqual(async_to_sync(counters.aget_counts)([Festival]), {Festival: 1})
+        self.assertTrue(CatalogueCounter.objects.filter(name=counters.counter_name(Festival)).exists())
+
+    def test_lists(self):
+        response = self.assertSamePage(async_views.performer_list, 'performer-list')
+        self.assertContains(response, 'Performer 49')
+        self.assertNotContains(response, 'Performer 50')
+        page = KeysetPaginator(Performer.objects.for_list(), ('name',), 50).page()
+        response = self.assertSamePage(async_views.performer_list, 'performer-list',
+                                       query=f'?cursor={page.next_cursor}')
+        self.assertContains(response, 'Performer 59')
+        self.assertSamePage(async_views.performer_list, 'performer-list', query='?q=performer+5')
+        self.assertSamePage(async_views.festival_list, 'festival-list')
+        with self.assertRaises(Http404):
+            self.call(async_views.performer_list, reverse('performer-list') + '?cursor=invalid')
+
+    def test_details(self):
+        self.assertSamePage(async_views.performer_detail, 'performer-detail', pk=self.performer.pk)
+        response = self.assertSamePage(async_views.festival_detail, 'festival-detail', pk=self.festival.pk)
+        self.assertContains(response, 'Performer 59')
+        # The fragment rendered by the async view is cached for both
+        cache.clear()
+        self.call(async_views.festival_detail, reverse('festival-detail', args=[self.festival.pk]), pk=self.festival.pk)
+        self.assertIsNotNone(fragments.get_fragment('festival-detail', self.festival.pk))
+        with self.assertRaises(Http404):
+            self.call(async_views.performer_detail, reverse('performer-detail', args=[0]), pk=0)
+
+    def test_not_modified(self):
+        path = reverse('festival-detail', args=[self.festival.pk])
+        etag = self.call(async_views.festival_detail, path, pk=self.festival.pk)['ETag']
+        response = self.call(async_views.festival_detail, path, {'If-None-Match': etag}, pk=self.festival.pk)
+        self.assertEqual(response.status_code, 304)
+
+
+class PageCacheTest(TestCase):
+    """cached_page (music/pagecache.py) serves a page from the cache until a model it shows changes,
+    and only caches what is safe to share.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def view(self, status=200, cookie=False):
+        @cached_page(Performer)
+        def view(request):
+            self.calls += 1
+            response = HttpResponse(f'page {self.calls}', status=status)
+            response['X-Page'] = 'yes'
+            if cookie:
+                response.set_cookie('flavour', 'chocolate')
+            return response
+        return view
+
+    def get(self, view, path='/page/', method='get'):
+        return view(getattr(RequestFactory(), method)(path))
+
+    def test_hit(self):
+        view = self.view()
+        self.assertEqual(self.get(view).content, b'page 1')
+        response = self.get(view)
+        self.assertEqual((response.content, response['X-Page']), (b'page 1', 'yes'))
+        self.assertEqual(self.get(view, method='head').content, b'page 1')
+        self.assertEqual(self.get(view, '/page/?cursor=x').content, b'page 2')
+        self.assertEqual(self.get(view, method='post').content, b'page 3')
+        self.assertEqual(self.calls, 3)
+
+    def test_not_cached(self):
+        for view in (self.view(status=404), self.view(cookie=True)):
+            self.get(view)
+            self.get(view)
+        self.assertEqual(self.calls, 4)
+
+    def test_invalidated_on_commit(self):
+        view = self.view()
+        self.get(view)
+        with self.captureOnCommitCallbacks(execute=True):
+            Performer.objects.create(name='Nico')
+            # Until the transaction is committed, the page cannot change
+            self.assertEqual(self.get(view).content, b'page 1')
+        self.assertEqual(self.get(view).content, b'page 2')
+        # Festivals are not shown by the page
+        with self.captureOnCommitCallbacks(execute=True):
+            Festival.objects.create(name='Woodstock')
+        self.assertEqual(self.get(view).content, b'page 2')
+
+    def test_index_hit_runs_no_query(self):
+        self.client.get(reverse('index'))
+        with self.assertNumQueries(0):
+            self.client.get(reverse('index'))
+
+    def test_stampede(self):
+        view = self.view()
+        key = pagecache.page_key(RequestFactory().get('/page/'), [Performer])
+        # Another request is rendering the page: this one waits for it instead of rendering it as well
+        cache.add(f'{key}:lock', 1)
+        timer = threading.Timer(0.1, lambda: cache.set(key, (b'rendered elsewhere', 200, {}), 60))
+        timer.start()
+        self.assertEqual(self.get(view).content, b'rendered elsewhere')
+        timer.join()
+        self.assertEqual(self.calls, 0)
+        # ... unless the other request gives up without storing the page
+        cache.delete(key)
+        cache.add(f'{key}:lock', 1)
+        timer = threading.Timer(0.1, lambda: cache.delete(f'{key}:lock'))
+        timer.start()
+        self.assertEqual(self.get(view).content, b'page 1')
+        timer.join()
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_pinned_requests_bypass_the_cache(self):
+        view = self.view()
+        with routers.use_primary():
+            self.get(view)
+        # Outside a request (e.g., in this test), the reads are pinned to the primary
+        self.assertEqual(self.get(view).content, b'page 2')
+        response = routers.ReadYourWritesMiddleware(lambda request: view(request))(RequestFactory().get('/page/'))
+        self.assertEqual(response.content, b'page 3')
+        response = routers.ReadYourWritesMiddleware(lambda request: view(request))(RequestFactory().get('/page/'))
+        self.assertEqual(response.content, b'page 3')
+
+
+class ResponsiveImageTest(SimpleTestCase):
+    """The responsive_image tag renders a <picture> whenever responsive.json has an entry for the image."""
+
+    info = {'width': 640, 'height': 480, 'variants': [
+        {'name': 'images/photo.abc.320w.webp', 'width': 320, 'type': 'image/webp'},
+        {'name': 'images/photo.abc.320w.jpg', 'width': 320, 'type': 'image/jpeg'},
+    ]}
+
+    def render(self):
+        return Template("{% load responsive %}{% responsive_image 'images/photo.jpg' alt='Photo' %}").render(Context())
+
+    def setUp(self):
+        manifest = getattr(staticfiles_storage, 'responsive_images', None)
+        staticfiles_storage.responsive_images = {'images/photo.jpg': self.info}
+        self.addCleanup(setattr, staticfiles_storage, 'responsive_images', manifest)
+
+    def test_picture(self):
+        for debug in (False, True):
+            with self.subTest(debug=debug), override_settings(DEBUG=debug):
+                html = self.render()
+                self.assertIn('<picture><source type="image/webp" srcset="/static/images/photo.abc.320w.webp 320w"',
+                              html)
+                self.assertIn('srcset="/static/images/photo.abc.320w.jpg 320w"', html)
+                self.assertIn('width="640" height="480" alt="Photo"', html)
+
+    def test_missing_manifest_entry(self):
+        staticfiles_storage.responsive_images = {}
+        self.assertEqual(self.render(), '<img src="/static/images/photo.jpg" alt="Photo" class="">')
+
+
+class ApiTest(TestCase):
+    """The JSON API (music/api.py): sparse fieldsets, batches of ids, pagination and the answers to invalid requests."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.festival = Festival.objects.create(name='Woodstock', start=datetime.date(1969, 8, 15),
+                                               end=datetime.date(1969, 8, 18), location='Bethel')
+        cls.performers = [Performer.objects.create(name=name, festival=cls.festival)
+                          for name in ('Janis Joplin', 'Jimi Hendrix', 'Santana')]
+
+    def get(self, url_name, **params):
+        return self.client.get(reverse(url_name), params)
+
+    def assertError(self, response, message, status=400):
+        self.assertEqual(response.status_code, status)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertIn(message, response.json()['error'])
+
+    def test_fields(self):
+        janis = self.performers[0]
+        response = self.client.get(reverse('api-performer-detail', args=[janis.pk]))
+        self.assertEqual(list(response.json()), api.RESOURCES['performers'].field_names)
+        self.assertEqual(response.json()['festival'], self.festival.pk)
+        self.assertEqual(response.json()['url'], reverse('performer-detail', args=[janis.pk]))
+
+        # The requested fields, in the requested order, without duplicates
+        response = self.client.get(reverse('api-performer-detail', args=[janis.pk]), {'fields': 'name, id,name'})
+        self.assertEqual(response.json(), {'name': 'Janis Joplin', 'id': janis.pk})
+        response = self.get('api-festival-list', fields='name,n_performers')
+        self.assertEqual(response.json()['results'], [{'name': 'Woodstock', 'n_performers': 3}])
+
+        for fields in ('name,password', ',', 'url,,__class__'):
+            with self.subTest(fields=fields):
+                self.assertError(self.get('api-performer-list', fields=fields), 'Unknown fields')
+
+    def test_ids(self):
+        janis, jimi, santana = (performer.pk for performer in self.performers)
+        response = self.get('api-performer-list', ids=f'{santana},0,{janis},{santana}', fields='id')
+        self.assertEqual(response.json(), {'results': [{'id': santana}, {'id': janis}]})
+        self.assertEqual(self.get('api-performer-list', ids='').json(), {'results': []})
+
+        for ids in ('1,two', '1;2', '1.5'):
+            with self.subTest(ids=ids):
+                self.assertError(self.get('api-performer-list', ids=ids), 'comma-separated list of integers')
+        self.assertError(self.get('api-performer-list', ids=','.join(map(str, range(api.MAX_IDS + 1)))),
+                         f'At most {api.MAX_IDS} ids')
+        self.assertEqual(self.get('api-performer-list', ids=','.join(map(str, range(api.MAX_IDS)))).status_code, 200)
+
+    def test_limit(self):
+        response = self.get('api-performer-list', limit=2, fields='name')
+        self.assertEqual(response.json()['results'], [{'name': 'Janis Joplin'}, {'name': 'Jimi Hendrix'}])
+        self.assertIsNone(response.json()['previous'])
+        response = self.client.get(response.json()['next'])
+        self.assertEqual(response.json()['results'], [{'name': 'Santana'}])
+        self.assertIsNone(response.json()['next'])
+        self.assertEqual(len(self.get('api-performer-list', limit=api.MAX_LIMIT).json()['results']), 3)
+
+        for limit in (0, -1, api.MAX_LIMIT + 1):
+            with self.subTest(limit=limit):
+                self.assertError(self.get('api-performer-list', limit=limit), f'between 1 and {api.MAX_LIMIT}')
+        self.assertError(self.get('api-performer-list', limit='ten'), 'limit must be an integer')
+
+    def test_cursor(self):
+        for cursor in ('not a cursor', base64.urlsafe_b64encode(b'{"d": "n", "k": [1]}').decode()):
+            with self.subTest(cursor=cursor):
+                self.assertError(self.get('api-performer-list', cursor=cursor), 'Invalid cursor')
+
+    def test_not_found(self):
+        response = self.client.get(reverse('api-festival-detail', args=[self.festival.pk + 1]))
+        self.assertError(response, f'Festival {self.festival.pk + 1} not found', status=404)
+
+    def test_errors_are_not_cached(self):
+        self.assertError(self.get('api-performer-list', limit=0), 'limit')
+        self.assertEqual(self.get('api-performer-list', limit=1).status_code, 200)
+        self.assertError(self.get('api-performer-list', limit=0), 'limit')
+
+
+class StatsTest(TestCase):
+    """The materialized statistics (music/stats.py): the refresh_*() functions recompute just the given groups,
+    the signal handlers keep the tables equal to a rebuild, and summary() reads them back.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.woodstock = Festival.objects.create(name='Woodstock', start=datetime.date(1969, 8, 15), location='Bethel')
+        cls.wight = Festival.objects.create(name='Isle of Wight', start=datetime.date(1970, 8, 26), location='Wight')
+        cls.unknown = Festival.objects.create(name='Unknown', location='Bethel')
+        Performer.objects.bulk_create([Performer(name='The Who', is_band=True, festival=cls.woodstock),
+                                       Performer(name='Janis Joplin', festival=cls.woodstock),
+                                       Performer(name='Jimi Hendrix', festival=cls.wight),
+                                       Performer(name='Joni Mitchell')])
+        stats.rebuild()
+
+    def materialized(self):
+        return (set(FestivalLineupStats.objects.values_list('festival_id', 'n_performers', 'n_bands', 'n_musicians')),
+                set(CatalogueStat.objects.values_list('dimension', 'key', 'value')))
+
+    def assertRebuilt(self):
+        materialized = self.materialized()
+        stats.rebuild()
+        self.assertEqual(materialized, self.materialized())
+
+    def test_rebuild(self):
+        self.assertEqual(self.materialized(), (
+            {(self.woodstock.pk, 2, 1, 1), (self.wight.pk, 1, 0, 1), (self.unknown.pk, 0, 0, 0)},
+            {('location', 'Bethel', 2), ('location', 'Wight', 1), ('year', '1969', 1), ('year', '1970', 1),
+             ('year', '', 1), ('kind', 'band', 1), ('kind', 'musician', 3)},
+        ))
+
+    def test_refresh_lineups(self):
+        # update() bypasses the signals, so the lineups are stale until they are refreshed
+        Performer.objects.filter(festival=self.woodstock).update(festival=self.unknown)
+        self.assertEqual(FestivalLineupStats.objects.get(festival=self.unknown).n_performers, 0)
+        with self.assertNumQueries(2):
+            stats.refresh_lineups({self.woodstock.pk, self.unknown.pk, None})
+        self.assertRebuilt()
+        with self.assertNumQueries(0):
+            stats.refresh_lineups({None})
+
+    def test_refresh_locations_and_years(self):
+        Festival.objects.filter(pk=self.wight.pk).update(location='Bethel', start=None)
+        stats.refresh_locations({'Bethel'})
+        self.assertEqual(dict(stats.dimension(stats.LOCATION)), {'Bethel': 3, 'Wight': 1})
+        # The groups left without festivals are deleted
+        stats.refresh_locations({'Wight', 'Nowhere'})
+        stats.refresh_years({'1970', ''})
+        self.assertRebuilt()
+        self.assertEqual(dict(stats.dimension(stats.LOCATION)), {'Bethel': 3})
+        self.assertEqual(stats.dimension(stats.YEAR), [('', 2), ('1969', 1)])
+        with self.assertNumQueries(0):
+            stats.refresh_locations(())
+            stats.refresh_years(())
+
+    def test_adjust_kind(self):
+        stats.adjust_kind(True, 2)
+        self.assertEqual(dict(stats.dimension(stats.KIND)), {'band': 3, 'musician': 3})
+        # Without its row, the split is recomputed from the performers
+        CatalogueStat.objects.filter(dimension=stats.KIND).delete()
+        stats.adjust_kind(False, -1)
+        self.assertEqual(dict(stats.dimension(stats.KIND)), {'band': 1, 'musician': 3})
+
+    def test_signals(self):
+        performer = Performer.objects.create(name='Santana', festival=self.woodstock)
+        self.assertRebuilt()
+        performer.festival, performer.is_band = self.wight, True
+        performer.save()
+        self.assertRebuilt()
+        performer.delete()
+        self.assertRebuilt()
+        self.woodstock.location, self.woodstock.start = 'Saugerties', datetime.date(1994, 8, 12)
+        self.woodstock.save()
+        self.assertRebuilt()
+        self.wight.delete()
+        self.assertRebuilt()
+        Festival.objects.create(name='Monterey', start=datetime.date(1967, 6, 16), location='Monterey')
+        self.assertRebuilt()
+
+    def test_summary(self):
+        summary = stats.summary()
+        self.assertEqual({key: value for key, value in summary.items() if key != 'ranking'}, {
+            'bands': 1, 'musicians': 3, 'festivals': 3, 'performers_in_lineups': 3, 'average_lineup': 1,
+            'locations': [('Bethel', 2), ('Wight', 1)], 'years': [('', 1), ('1969', 1), ('1970', 1)],
+        })
+        self.assertEqual([row.festival for row in summary['ranking']], [self.woodstock, self.wight, self.unknown])
+        with self.assertNumQueries(5):
+            summary = stats.summary(limit=1)
+        self.assertEqual([row.festival.name for row in summary['ranking']], ['Woodstock'])
+        self.assertEqual(summary['locations'], [('Bethel', 2)])
+        self.assertEqual(len(summary['years']), 3)
+
+    def test_empty_summary(self):
+        FestivalLineupStats.objects.all().delete()
+        CatalogueStat.objects.all().delete()
+        self.assertEqual(stats.summary(), {'bands': 0, 'musicians': 0, 'festivals': 0, 'performers_in_lineups': 0,
+                                           'average_lineup': 0, 'ranking': [], 'locations': [], 'years': []})
@@ -0,0 +1,72 @@
+"""Fast URL building for the pk-based routes of the music app (performer-detail, festival-update etc.).
+reverse() resolves the route and checks the arguments against its pattern on every call, which adds up
+when a list page links every one of its (up to tens of thousands of) rows. For a route with a single pk
+parameter, the URL is always <prefix><pk><suffix>, so the prefix and the suffix are found with reverse() once
+per route and every URL after that is just formatted:
+    pk_url('performer-detail', 42)      # '/music/performers/42/'
+It is used by get_absolute_url() of Performer and Festival, and in templates by the pk_url filter
+(see music/templatetags/music_urls.py):
+    {% load music_urls %}
+    <a href="{{ performer.pk|pk_url:'performer-detail' }}">{{ performer.name }}</a>
+The parts include the script prefix (the path the project is mounted at), so they assume that a process serves
+the project under one script prefix and with one URLconf, which is how it is deployed; they are recomputed
+when a request comes with a different script prefix and when ROOT_URLCONF changes (e.g., in tests).
+Compare with reverse():
+    manage.py@<project_site>  > url_benchmark [--rows <n>]
+"""
+
+from django.core.signals import request_started, setting_changed
+from django.dispatch import receiver
+from django.urls import NoReverseMatch, get_script_prefix, reverse
+
+
+# Any pk that cannot appear elsewhere in the URL of a route
+SENTINEL_PK = 9876543210123
+_url_parts = {}
+_script_prefix = None
+
+
+def _split(name):
+    url = reverse(name, kwargs={'pk': SENTINEL_PK})
+    prefix, _, suffix = url.partition(str(SENTINEL_PK))
+    return prefix, suffix
+
+
+def pk_url(name, pk):
+    """Returns the URL of the route name for pk, the same as reverse(name, kwargs={'pk': pk})."""
+
+    if not isinstance(pk, int):
+        try:
+            pk = int(pk)
+        except (TypeError, ValueError):
+            raise NoReverseMatch(f"Reverse for '{name}' with pk {pk!r} not found.")
+    if pk < 0:
+        raise NoReverseMatch(f"Reverse for '{name}' with pk {pk!r} not found.")
+    try:
+        prefix, suffix = _url_parts[name]
+    except KeyError:
+        prefix, suffix = _url_parts[name] = _split(name)
+    return f'{prefix}{pk}{suffix}'
+
+
+def clear():
+    _url_parts.clear()
+
+
+@receiver(request_started)
+def check_script_prefix(**kwargs):
+    """Forgets the URL parts if the script prefix (set by the handler from the request's SCRIPT_NAME) has changed."""
+
+    global _script_prefix
+    script_prefix = get_script_prefix()
+    if script_prefix != _script_prefix:
+        clear()
+        _script_prefix = script_prefix
+
+
+@receiver(setting_changed)
+def clear_on_urlconf_change(setting, **kwargs):
+    """Forgets the URL parts when ROOT_URLCONF changes (e.g., with override_settings() in tests)."""
+
+    if setting == 'ROOT_URLCONF':
+        clear()
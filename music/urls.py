@@ -10,8 +10,9 @@ Different URL patterns for an app are typically specified in the following ways:
         ]
 """
 
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, views
 
 
 urlpatterns = [
@@ -44,6 +45,46 @@ urlpatterns += [
     path('festivals/create/', views.FestivalCreateView.as_view(), name='festival-create'),
     path('festivals/<int:pk>/update/', views.FestivalUpdateView.as_view(), name='festival-update'),
     path('festivals/<int:pk>/delete/', views.FestivalDeleteView.as_view(), name='festival-delete'),
+    path('festivals/<int:pk>/lineup/', views.FestivalLineupView.as_view(), name='festival-lineup'),
 ]
 
+urlpatterns += [
+    path('export/<str:model_name>/', views.export, name='export'),
+]
+
+urlpatterns += [
+    path('search/', views.catalogue_search, name='search'),
+]
+
+urlpatterns += [
+    path('festivals/calendar/', views.festival_calendar, name='festival-calendar'),
+    path('festivals/calendar/<int:year>/', views.festival_calendar, name='festival-calendar-year'),
+]
+
+urlpatterns += [
+    path('festivals/lookup/', views.festival_lookup, name='festival-lookup'),
+]
+
+urlpatterns += [
+    path('festivals/statistics/', views.festival_statistics, name='festival-statistics'),
+]
+
+urlpatterns += [
+    path('api/performers/', api.performer_list, name='api-performer-list'),
+    path('api/performers/<int:pk>/', api.performer_detail, name='api-performer-detail'),
+    path('api/festivals/', api.festival_list, name='api-festival-list'),
+    path('api/festivals/<int:pk>/', api.festival_detail, name='api-festival-detail'),
+]
+
+# Under ASGI, the read-only pages are served by their async versions instead (see music/async_views.py);
+# the patterns are put first, so they take precedence over the sync ones above
+if settings.ASYNC_VIEWS:
+    from . import async_views
 
+    urlpatterns = [
+        path('', async_views.index, name='index'),
+        path('performers/', async_views.performer_list, name='performer-list'),
+        path('performers/<int:pk>/', async_views.performer_detail, name='performer-detail'),
+        path('festivals/', async_views.festival_list, name='festival-list'),
+        path('festivals/<int:pk>/', async_views.festival_detail, name='festival-detail'),
+    ] + urlpatterns
@@ -1,9 +1,27 @@
-from django.http import HttpResponse
+import datetime
+import hashlib
+
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseRedirect, StreamingHttpResponse, Http404
 from django.shortcuts import render
 from django.urls import reverse_lazy
-from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
-
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import require_safe
+from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, FormView
+from django.views.generic.detail import SingleObjectMixin
+
+from music import bulk, counters, exporter, fragments, search, stats
+from music.api import json_response
+from music.conditional import conditional_page, performer_state, festival_state, performer_list_state, \
+    festival_list_state
+from music.forms import LineupForm, PerformerForm, festival_label
+from music.fragments import FragmentCacheMixin
+from music.pagecache import cached_page
 from music.models import Performer, Festival
+from music.pagination import KeysetPaginationMixin
+from music.search import SearchFilterMixin
 
 
 # Create your views here.
@@ -14,18 +32,22 @@ from music.models import Performer, Festival
 # def index(request):
 #     return HttpResponse("<h1>Woodstock</h1>")
 
+@cached_page(Performer, Festival)
 def index(request):
     """The index view that defines a context to be rendered in index.html.
     This context includes, e.g., the numbers of Performer and Festival objects in the database.
-    These numbers can be retrieved using <Model>.objects.all().count().
+    These numbers could be retrieved using <Model>.objects.all().count(), but that is a full table scan,
+    so they are read from the denormalized counters maintained by signals instead (see music/counters.py).
+    The rendered page is cached until a performer or a festival changes (see music/pagecache.py).
     The context is specified as a dictionary with the items in the format:
         '<string to be used in the index.html template>': <data item (e.g., the number of performers)>
     The view returns the result of the render() function,
     passing it the request, the template file name, and the context.
     """
 
-    n_performers = Performer.objects.all().count()
-    n_festivals = Festival.objects.all().count()
+    counts = counters.get_counts([Performer, Festival])
+    n_performers = counts[Performer]
+    n_festivals = counts[Festival]
     context = {
         'n_p': n_performers,
         'n_f': n_festivals
@@ -33,7 +55,113 @@ def index(request):
     return render(request, 'index.html', context=context)
 
 
-class PerformerListView(ListView):
+@cached_page(Performer, Festival)
+def catalogue_search(request):
+    """The search view that defines a context to be rendered in music/search.html.
+    This context includes the search query (?q=...) and the best matching performers and festivals
+    (at most search_limit of each), found in the full-text search index, see music/search.py.
+    """
+
+    search_limit = 20
+    query = request.GET.get('q', '').strip()
+    context = {
+        'search_query': query,
+        'performers': search.search(Performer, query, search_limit),
+        'festivals': search.search(Festival, query, search_limit),
+    }
+    return render(request, 'music/search.html', context=context)
+
+
+@require_safe
+def festival_lookup(request):
+    """The JSON endpoint behind the festival picker of the performer form (see music/forms.py).
+    It returns at most lookup_limit festivals whose name or location has words starting with the words of ?q=...,
+    found by prefix matching in the full-text search index (see music/search.py), best matches first:
+        {"results": [{"id": 1, "label": "Woodstock (1969), Bethel, NY"}, ...]}
+    Queries shorter than lookup_min_length characters get no results (they would match too much).
+    The results are cached for lookup_timeout seconds, under a key that includes the version of the festivals
+    (see music/fragments.py), so that a saved festival shows up right away; browsers may cache them as well.
+    """
+
+    lookup_limit, lookup_min_length, lookup_timeout = 10, 2, 60
+    query = ' '.join(search.search_terms(request.GET.get('q', ''))).lower()
+    if len(query) < lookup_min_length:
+        results = []
+    else:
+        version = fragments.current_versions([('model', Festival._meta.label_lower)]).popitem()[1]
+        key = f'music:festival-lookup:{version}:{hashlib.md5(query.encode(), usedforsecurity=False).hexdigest()}'
+        results = cache.get(key)
+        if results is None:
+            results = [{'id': festival.pk, 'label': festival_label(festival.name, festival.start, festival.location)}
+                       for festival in search.search(Festival, query, lookup_limit)]
+            cache.set(key, results, lookup_timeout)
+    response = json_response({'results': results})
+    patch_cache_control(response, max_age=lookup_timeout)
+    return response
+
+
+@cached_page(Festival)
+def festival_calendar(request, year=None):
+    """The calendar view that defines a context to be rendered in music/festival-calendar.html.
+    This context includes the festivals running in the given year (the current year by default),
+    grouped by month; a festival that runs through several months is shown in each of them.
+    All the festivals of the year are fetched in a single range query, see FestivalQuerySet.overlapping().
+    Years that datetime.date cannot represent (outside MINYEAR..MAXYEAR) are not found, and have no links.
+    """
+
+    if year is None:
+        year = timezone.localdate().year
+    elif not datetime.MINYEAR <= year <= datetime.MAXYEAR:
+        raise Http404('No calendar for this year.')
+    first_day, last_day = datetime.date(year, 1, 1), datetime.date(year, 12, 31)
+    festivals = (Festival.objects
+                 .overlapping(first_day, last_day)
+                 .only('id', 'name', 'start', 'end', 'location')
+                 .order_by('start', 'id'))
+    months = [(datetime.date(year, month, 1), []) for month in range(1, 13)]
+    for festival in festivals:
+        first_month = max(festival.start, first_day).month
+        last_month = min(festival.end or festival.start, last_day).month
+        for month in range(first_month, last_month + 1):
+            months[month - 1][1].append(festival)
+    context = {
+        'year': year,
+        'months': months,
+        'previous_year': year - 1 if year > datetime.MINYEAR else None,
+        'next_year': year + 1 if year < datetime.MAXYEAR else None,
+    }
+    return render(request, 'music/festival-calendar.html', context=context)
+
+
+@cached_page(Performer, Festival)
+def festival_statistics(request):
+    """The statistics view that defines a context to be rendered in music/festival-statistics.html.
+    This context includes the band/solo musician split, the festivals ranked by lineup size,
+    and the festivals per location and per year. All of it is read from the summary tables
+    that the signal handlers keep up to date (see music/stats.py), so no performer is loaded or counted here.
+    """
+
+    return render(request, 'music/festival-statistics.html', context=stats.summary(limit=20))
+
+
+def export(request, model_name):
+    """The view that streams all objects of a model (performers or festivals) as a downloadable file,
+    in the format given by the format query parameter (?format=csv (default) or ?format=ndjson).
+    It returns a StreamingHttpResponse, so the first bytes are sent before the whole table is read,
+    see music/exporter.py.
+    """
+
+    file_format = request.GET.get('format', 'csv')
+    if model_name not in exporter.EXPORTS or file_format not in exporter.FORMATS:
+        raise Http404('Unknown export.')
+    response = StreamingHttpResponse(exporter.export_chunks(model_name, file_format),
+                                     content_type=exporter.FORMATS[file_format])
+    response['Content-Disposition'] = f'attachment; filename="{model_name}.{file_format}"'
+    return response
+
+
+@method_decorator([conditional_page(performer_list_state), cached_page(Performer)], name='dispatch')
+class PerformerListView(SearchFilterMixin, KeysetPaginationMixin, ListView):
     """Class-based view that handles lists of Performer objects.
     Typical fields that ListView-based classes specify include:
         - model (class name of the corresponding <Model> class
@@ -43,16 +171,23 @@ class PerformerListView(ListView):
     In case more context is needed, which is completely optional and depends on the application
     (see https://docs.djangoproject.com/en/dev/topics/class-based-views/generic-display/#adding-extra-context),
     it is also necessary to override ListView.get_context_data() and add more dictionary entries.
+    The list is paginated by keyset (cursor) pagination on (name, id), see music/pagination.py,
+    and can be filtered by a full-text search query (?q=...), see music/search.py.
+    Conditional GET requests are answered with 304 Not Modified when nothing shown has changed,
+    see music/conditional.py; other requests are served from the page cache, see music/pagecache.py.
     """
 
     model = Performer
     template_name = 'music/performer-list.html'
+    paginate_by = 50
+    keyset_ordering = ('name',)
 
     def get_queryset(self):
-        return Performer.objects.all()
+        return self.search_queryset(Performer.objects.for_list())
 
 
-class PerformerDetailView(DetailView):
+@method_decorator([conditional_page(performer_state), cached_page(Performer, Festival)], name='dispatch')
+class PerformerDetailView(FragmentCacheMixin, DetailView):
     """Class-based view that handles individual Performer objects.
     Typical fields that DetailView-based classes specify include:
         - model (class name of the corresponding <Model> class
@@ -60,43 +195,84 @@ class PerformerDetailView(DetailView):
     In case more context is needed, which is completely optional and depends on the application
     (see https://docs.djangoproject.com/en/dev/topics/class-based-views/generic-display/#adding-extra-context),
     it is also necessary to override ListView.get_context_data() and add more dictionary entries.
+    The content of the page is cached per performer, see music/fragments.py.
+    Only what the page renders is loaded: the performer along with its festival (in one query),
+    and a bounded, cached first page of festivals for the "More festivals" panel
+    (the full, paginated list is in FestivalListView).
+    Conditional GET requests are answered with 304 Not Modified when nothing shown has changed,
+    see music/conditional.py; other requests are served from the page cache, see music/pagecache.py.
     """
 
     model = Performer
     template_name = 'music/performer-detail.html'
+    fragment_name = 'performer-detail'
+    fragment_template_name = 'music/fragments/performer-detail.html'
+    more_festivals_limit = 10
+    more_festivals_timeout = 60
 
-    # Get more context - enable showing info about all festivals in the database (along with performer details)
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['all_festivals'] = Festival.objects.all()
-        return context
+    def get_queryset(self):
+        return Performer.objects.with_festival()
+
+    def get_fragment_dependencies(self, obj):
+        return [('performer', obj.pk), ('festival', obj.festival_id)]
 
+    # Get more context - enable showing the first few festivals in the database (along with performer details);
+    # the key includes the version of the festivals (see music/fragments.py), so a saved festival shows up right away
+    # (and the panel always matches the page's ETag, see performer_state() in music/conditional.py)
+    def get_page_context_data(self):
+        version = fragments.current_versions([('model', Festival._meta.label_lower)]).popitem()[1]
+        more_festivals = cache.get_or_set(
+            f'music:more-festivals:{self.more_festivals_limit}:{version}',
+            lambda: list(Festival.objects.order_by('start', 'id').values('id', 'name')[:self.more_festivals_limit]),
+            self.more_festivals_timeout)
+        return {'more_festivals': more_festivals}
 
-class FestivalListView(ListView):
+
+@method_decorator([conditional_page(festival_list_state), cached_page(Festival, Performer)], name='dispatch')
+class FestivalListView(SearchFilterMixin, KeysetPaginationMixin, ListView):
     """Class-based view that handles lists of Festival objects.
     Typical fields that ListView-based classes specify include:
         - model (class name of the corresponding <Model> class
         - template_name ('<app>/<template file name>'; default: '<app>/<model>_list.html')
     Typically, such views also override ListView.get_queryset(),
     making it return a QuerySet of objects (such as (possibly filtered) <Model>.objects.all()))
+    The list is paginated by keyset (cursor) pagination on (start, id), see music/pagination.py,
+    and can be filtered by a full-text search query (?q=...), see music/search.py.
+    Conditional GET requests are answered with 304 Not Modified when nothing shown has changed,
+    see music/conditional.py; other requests are served from the page cache, see music/pagecache.py.
     """
 
     model = Festival
     template_name = 'music/festival-list.html'
+    paginate_by = 50
+    keyset_ordering = ('start',)
 
     def get_queryset(self):
-        return Festival.objects.all()
+        return self.search_queryset(Festival.objects.with_performer_count())
 
 
-class FestivalDetailView(DetailView):
+@method_decorator([conditional_page(festival_state), cached_page(Festival, Performer)], name='dispatch')
+class FestivalDetailView(FragmentCacheMixin, DetailView):
     """Class-based view that handles individual Festival objects.
     Typical fields that DetailView-based classes specify include:
         - model (class name of the corresponding <Model> class
         - template_name ('<app>/<template file name>'; default: '<app>/<model>_detail.html')
+    The content of the page (including the festival's lineup) is cached per festival, see music/fragments.py.
+    Conditional GET requests are answered with 304 Not Modified when nothing shown has changed,
+    see music/conditional.py; other requests are served from the page cache, see music/pagecache.py.
     """
 
     model = Festival
     template_name = 'music/festival-detail.html'
+    fragment_name = 'festival-detail'
+    fragment_template_name = 'music/fragments/festival-detail.html'
+
+    def get_queryset(self):
+        # The lineup is prefetched, so the template runs no query per performer
+        return Festival.objects.with_lineup()
+
+    def get_fragment_dependencies(self, obj):
+        return [('festival', obj.pk), ('lineup', obj.pk)]
 
 
 class PerformerCreateView(CreateView):
@@ -106,11 +282,12 @@ class PerformerCreateView(CreateView):
         - fields (a list of model fields to appear on the form,
           e.g. fields = ['<model_field_1>', '<model_field_1>',...];
           to include all fields from the model: model = '__all__')
+          or form_class (a ModelForm class, here with the festival picker of music/forms.py)
         - template_name ('<app>/<template file name>'; default: '<app>/<model>_form.html')
     """
 
     model = Performer
-    fields = '__all__'
+    form_class = PerformerForm
     template_name = 'music/performer-form.html'
 
 
@@ -121,11 +298,12 @@ class PerformerUpdateView(UpdateView):
         - fields (a list of model fields to appear on the form,
           e.g. fields = ['<model_field_1>', '<model_field_1>',...];
           to include all fields from the model: model = '__all__')
+          or form_class (a ModelForm class, here with the festival picker of music/forms.py)
         - template_name ('<app>/<template file name>'; default: '<app>/<model>_form.html')
     """
 
     model = Performer
-    fields = '__all__'
+    form_class = PerformerForm
     template_name = 'music/performer-form.html'
 
 
@@ -180,10 +358,59 @@ class FestivalDeleteView(DeleteView):
         - success_url (the page to return to after deleting an object through a dialog form;
           typically provided by success_url = reverse_lazy('<view_name>'); '<view_name>' is, e.g., '<model>-list')
         - template_name ('<app>/<template file name>'; default: '<app>/<model>_confirm_delete.html')
+    The festival's performers are kept, without a festival. Instead of letting Django's collector load every one
+    of them to set its festival to NULL (the on_delete=SET_NULL of Performer.festival), they are detached
+    with one UPDATE (see music/bulk.py), and the confirmation page shows just the size of the lineup,
+    read from the precomputed statistics.
     """
 
     model = Festival
     success_url = reverse_lazy('festival-list')
     template_name = 'music/festival-confirm-delete.html'
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['lineup'] = bulk.lineup_counts(self.object)
+        return context
+
+    def form_valid(self, form):
+        bulk.delete_festival(self.object)
+        return HttpResponseRedirect(self.get_success_url())
+
+
+class FestivalLineupView(SingleObjectMixin, FormView):
+    """Class-based view that moves the whole lineup of a festival to another festival, or merges the festival
+    into another one (moves the lineup and deletes the emptied festival).
+    The target festival is chosen with the festival picker (see music/forms.py); the first valid submission
+    shows a confirmation page with the sizes of both lineups (from the precomputed statistics),
+    and the confirmed one moves all the performers with one UPDATE (see music/bulk.py).
+    """
+
+    model = Festival
+    form_class = LineupForm
+    template_name = 'music/festival-lineup.html'
+
+    def dispatch(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_form_kwargs(self):
+        return {**super().get_form_kwargs(), 'festival': self.object}
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['lineup'] = bulk.lineup_counts(self.object)
+        return context
+
+    def form_valid(self, form):
+        target, merge = form.cleaned_data['target'], form.cleaned_data['merge']
+        if 'confirm' not in self.request.POST:
+            return self.render_to_response(self.get_context_data(
+                form=form, confirm=True, target=target, merge=merge, target_lineup=bulk.lineup_counts(target)))
+        if merge:
+            bulk.merge_festivals(self.object, target)
+        else:
+            bulk.move_lineup(self.object, target)
+        return HttpResponseRedirect(target.get_absolute_url())
+
 
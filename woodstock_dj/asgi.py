@@ -0,0 +1,20 @@
+"""
+ASGI config for woodstock_dj project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Under ASGI, the read-only pages of the music app are served by the async views in music/async_views.py
+(see ASYNC_VIEWS in settings/base.py). Run it with an ASGI server, e.g.:
+    uvicorn woodstock_dj.asgi:application --workers 4
+
+For more information on this file, see
+https://docs.djangoproject.com/en/dev/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'woodstock_dj.settings')
+os.environ.setdefault('WOODSTOCK_ASYNC_VIEWS', '1')
+
+application = get_asgi_application()
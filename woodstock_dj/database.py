@@ -0,0 +1,48 @@
+"""Database configuration of the woodstock_dj project.
+Every new SQLite connection is tuned with the PRAGMAs in settings.SQLITE_PRAGMAS (DEFAULT_SQLITE_PRAGMAS by default):
+    - journal_mode = WAL - readers no longer block behind a writer (and vice versa);
+      the mode is stored in the database file, so it only has to be switched once
+    - synchronous = NORMAL - in WAL mode, still safe against corruption, and no fsync() on every commit
+    - mmap_size - reads go through memory-mapped I/O instead of read() system calls
+    - cache_size - a bigger page cache per connection (negative values are in KiB)
+    - temp_store = MEMORY - temporary tables and indexes (e.g., for sorting) are kept in memory
+How long a connection waits for a lock (SQLite's busy timeout) is not set here, but with OPTIONS['timeout']
+of the database in DATABASES, which sqlite3.connect() applies.
+Together with persistent connections (CONN_MAX_AGE in DATABASES), the PRAGMAs are applied once per connection,
+not once per request. The hook is connected when the music app is ready (see MusicConfig.ready()).
+To measure the effect, run:
+    manage.py@<project_site>  > sqlite_benchmark
+"""
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -20000,
+    'temp_store': 'MEMORY',
+}
+
+
+def sqlite_pragmas():
+    return getattr(settings, 'SQLITE_PRAGMAS', DEFAULT_SQLITE_PRAGMAS)
+
+
+def apply_pragmas(cursor, pragmas):
+    """Executes PRAGMA <name> = <value> for each item of pragmas on a (DB-API) cursor."""
+
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """Applies the PRAGMAs to each new SQLite connection (in-memory test databases ignore journal_mode)."""
+
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            apply_pragmas(cursor, sqlite_pragmas())
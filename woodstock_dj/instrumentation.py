@@ -0,0 +1,275 @@
+"""Per-request instrumentation of the woodstock_dj project: what a request costs in SQL queries, template rendering
+and in total, for every page (index, PerformerListView, FestivalDetailView, the API etc.).
+InstrumentationMiddleware (see MIDDLEWARE in settings/base.py) measures each request and:
+    - reports the measurements in a Server-Timing header, which the browser's developer tools show
+      in the timing tab of the request:
+        Server-Timing: db;dur=3.1;desc="4 queries", tpl;dur=12.0, total;dur=17.6
+      (db - the time spent in SQL queries and their number, tpl - the time spent rendering templates,
+      including the queries run from templates, total - the whole request through the middleware below this one)
+    - logs the requests slower than settings.SLOW_REQUEST_MS and the SQL queries slower than settings.SLOW_QUERY_MS
+      to the 'woodstock.performance' logger, as one JSON object per line:
+        {"event": "slow_request", "route": "performer-list", "path": "/music/performers/", "status": 200,
+         "total_ms": 812.4, "db_ms": 640.2, "queries": 3, "template_ms": 150.8}
+    - keeps the measurements of the last settings.TIMING_WINDOW requests of each route (the name of the URL pattern),
+      for percentiles per route:
+        manage.py@<project_site>  > request_timings [--route <name>] [--reset]
+The queries are counted by a wrapper added to every database connection's execute_wrappers
+(the mechanism behind connection.execute_wrapper()) when the connection is opened, so the queries of the replica
+and those run by async views (in sync_to_async() threads) are counted as well; the hook is connected
+when the music app is ready (see MusicConfig.ready()). The template time is measured
+by the InstrumentedDjangoTemplates backend (the BACKEND in TEMPLATES).
+The measurements of the current request are kept in a context variable, so concurrent requests (threads or
+async tasks) do not mix. The samples are buffered in memory (shared by the threads of the process, under a lock)
+and appended to the windows in the cache (one entry per process) every settings.TIMING_PUBLISH_SECONDS,
+so a request does not touch the cache. With LocMemCache, the command therefore only sees its own process;
+use a shared backend (e.g., the one in settings/prod.py) to see the running server's numbers.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+
+logger = logging.getLogger('woodstock.performance')
+
+TIMINGS_KEY = 'woodstock:timings'
+PROCESSES_KEY = f'{TIMINGS_KEY}:processes'
+TIMINGS_TIMEOUT = 24 * 60 * 60
+UNRESOLVED = '<unresolved>'
+# The measurements kept per request, in this order
+MEASUREMENTS = ('total_ms', 'db_ms', 'queries', 'template_ms')
+
+_current = ContextVar('woodstock_request_timings', default=None)
+
+
+class RequestTimings:
+    """The measurements of one request (times in seconds)."""
+
+    __slots__ = ('method', 'path', 'queries', 'db', 'template', '_depth', '_template_start')
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.queries = 0
+        self.db = 0.0
+        self.template = 0.0
+        self._depth = 0
+        self._template_start = 0.0
+
+    def template_started(self):
+        # A template rendered while another one is being rendered (e.g., render_to_string() in a template tag)
+        # is already included in the outer one's time
+        if not self._depth:
+            self._template_start = time.perf_counter()
+        self._depth += 1
+
+    def template_finished(self):
+        self._depth -= 1
+        if not self._depth:
+            self.template += time.perf_counter() - self._template_start
+
+
+def current():
+    """The RequestTimings of the request being processed (None outside of InstrumentationMiddleware)."""
+
+    return _current.get()
+
+
+def log(event, **fields):
+    logger.warning(json.dumps({'event': event, **fields}, default=str))
+
+
+# SQL queries
+
+def record_query(execute, sql, params, many, context):
+    """The execute wrapper: counts and times the queries of the current request and logs the slow ones."""
+
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        timings.queries += 1
+        timings.db += duration
+        if duration * 1000 >= getattr(settings, 'SLOW_QUERY_MS', 100):
+            log('slow_query', method=timings.method, path=timings.path, ms=round(duration * 1000, 1),
+                alias=context['connection'].alias, many=many, sql=sql)
+
+
+@receiver(connection_created)
+def install_query_wrapper(sender, connection, **kwargs):
+    """Adds record_query() to the execute wrappers of a newly opened connection (once per connection object,
+    which outlives the reconnections of persistent connections).
+    """
+
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+# Templates
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        timings = _current.get()
+        if timings is None:
+            return super().render(context, request)
+        timings.template_started()
+        try:
+            return super().render(context, request)
+        finally:
+            timings.template_finished()
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with the render time of the templates added to the current request's timings."""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return InstrumentedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+# Rolling windows per route
+
+# _pending_lock guards _pending and _last_published (held only to append or take the samples),
+# _publish_lock serializes the read-modify-write of this process's windows in the cache
+_pending = defaultdict(lambda: deque(maxlen=getattr(settings, 'TIMING_WINDOW', 1000)))
+_pending_lock = threading.Lock()
+_publish_lock = threading.Lock()
+_last_published = time.monotonic()
+
+
+def process_key(pid):
+    return f'{TIMINGS_KEY}:{pid}'
+
+
+def add_sample(route, sample):
+    with _pending_lock:
+        _pending[route].append(sample)
+        due = time.monotonic() - _last_published >= getattr(settings, 'TIMING_PUBLISH_SECONDS', 10)
+    if due:
+        publish()
+
+
+def publish():
+    """Appends the samples recorded since the last call to this process's windows in the cache
+    (only this process writes them, and its threads take turns), keeping the last settings.TIMING_WINDOW per route.
+    """
+
+    global _last_published
+    with _publish_lock:
+        with _pending_lock:
+            _last_published = time.monotonic()
+            pending = {route: list(samples) for route, samples in _pending.items() if samples}
+            _pending.clear()
+        if not pending:
+            return
+        size = getattr(settings, 'TIMING_WINDOW', 1000)
+        pid = os.getpid()
+        windows = cache.get(process_key(pid), {})
+        for route, samples in pending.items():
+            windows[route] = (windows.get(route, []) + samples)[-size:]
+        cache.set(process_key(pid), windows, TIMINGS_TIMEOUT)
+        processes = cache.get(PROCESSES_KEY, set())
+        if pid not in processes:
+            cache.set(PROCESSES_KEY, processes | {pid}, TIMINGS_TIMEOUT)
+
+
+def collect():
+    """{route: [(total_ms, db_ms, queries, template_ms), ...]} - the published windows of all processes."""
+
+    processes = cache.get(PROCESSES_KEY, set())
+    windows = cache.get_many([process_key(pid) for pid in processes])
+    routes = defaultdict(list)
+    for process_windows in windows.values():
+        for route, samples in process_windows.items():
+            routes[route].extend(samples)
+    return dict(routes)
+
+
+def reset():
+    """Forgets the published timings and this process's pending samples
+    (the other processes start new windows when they publish next).
+    """
+
+    with _pending_lock:
+        _pending.clear()
+    processes = cache.get(PROCESSES_KEY, set())
+    cache.delete_many([PROCESSES_KEY, *(process_key(pid) for pid in processes)])
+
+
+# The middleware
+
+def route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNRESOLVED
+    return match.view_name or match.route
+
+
+class InstrumentationMiddleware:
+    """Middleware that measures the requests (see the module docstring); it should come first in MIDDLEWARE,
+    so that the total includes the other middleware.
+    It works both under WSGI and under ASGI (without being adapted to sync/async by Django).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = RequestTimings(request.method, request.path)
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        timings = RequestTimings(request.method, request.path)
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings, time.perf_counter() - start)
+
+    def finish(self, request, response, timings, total):
+        total_ms, db_ms, template_ms = total * 1000, timings.db * 1000, timings.template * 1000
+        response['Server-Timing'] = (f'db;dur={db_ms:.1f};desc="{timings.queries} queries", '
+                                     f'tpl;dur={template_ms:.1f}, total;dur={total_ms:.1f}')
+        route = route_name(request)
+        if total_ms >= getattr(settings, 'SLOW_REQUEST_MS', 500):
+            log('slow_request', route=route, method=timings.method, path=timings.path,
+                status=response.status_code, total_ms=round(total_ms, 1), db_ms=round(db_ms, 1),
+                queries=timings.queries, template_ms=round(template_ms, 1))
+        add_sample(route, (total_ms, db_ms, timings.queries, template_ms))
+        return response
@@ -0,0 +1,130 @@
+"""Database routing of the woodstock_dj project: reads from read replicas, writes to the primary.
+    - reads of the music app's models in the safe requests (the list and detail views) go to a randomly chosen
+      replica from settings.DATABASE_REPLICAS (or to 'default' if there are none)
+    - all writes (the create/update/delete views, the admin, the signal handlers...) go to 'default', the primary
+    - everything else (auth, sessions, admin...) is read from the primary as well
+    - outside the requests (management commands, the shell, background jobs), every read goes to the primary:
+      the replicas are only used once ReadYourWritesMiddleware has decided a request can read from them.
+      Code that reads in order to write (e.g., music/counters.py, music/stats.py) reads from the database
+      it writes to (router.db_for_write()), so it never copies stale replica data to the primary.
+Read-your-writes: replicas lag behind the primary, so a client that has just written something
+would not necessarily see it on the next page. ReadYourWritesMiddleware therefore pins all the reads of
+a request to the primary when
+    - the request is not a safe one (POST etc.), or
+    - the request has already written something to the music app's models, or
+    - the same client has written something in the last settings.REPLICA_STICKY_SECONDS seconds
+      (remembered in a short-lived cookie set on the response of the request that wrote; writes of other apps,
+      like the session of a safe request, do not count).
+A local stand-in replica is a copy of db.sqlite3, see DATABASE_REPLICAS in settings/base.py and:
+    manage.py@<project_site>  > sync_replicas
+"""
+
+import contextvars
+import random
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+
+# Outside ReadYourWritesMiddleware (i.e., outside the requests), all the reads go to the primary
+_use_primary = contextvars.ContextVar('use_primary', default=True)
+_wrote = contextvars.ContextVar('wrote', default=False)
+
+ROUTED_APPS = {'music'}
+STICKY_COOKIE = 'woodstock_primary'
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def reads_pinned():
+    """Whether the reads of the current request are pinned to the primary while there are replicas
+    (e.g., for read-your-writes); such a request must not be answered from caches filled from the replicas.
+    """
+
+    return bool(replicas()) and _use_primary.get()
+
+
+@contextmanager
+def use_primary():
+    """Sends all the reads in the with block to the primary."""
+
+    token = _use_primary.set(True)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+class ReadReplicaRouter:
+    """Database router that sends reads of ROUTED_APPS to the replicas and all writes to the primary
+    (see the module docstring).
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in ROUTED_APPS and not _use_primary.get() and replicas():
+            return random.choice(replicas())
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label in ROUTED_APPS:
+            # The rest of the request, and the next requests of the client, read what has been written
+            _wrote.set(True)
+            _use_primary.set(True)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold the same data as the primary
+        databases = {'default', *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replicas are copies of the primary; they are never migrated directly
+        return db not in replicas()
+
+
+class ReadYourWritesMiddleware:
+    """Middleware that pins the reads of a request to the primary for clients that have just written something
+    (see the module docstring); it should come before any middleware that reads from the database.
+    It works both under WSGI and under ASGI (without being adapted to sync/async by Django).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        primary_token, wrote_token = self.start(request)
+        try:
+            return self.finish(self.get_response(request))
+        finally:
+            _use_primary.reset(primary_token)
+            _wrote.reset(wrote_token)
+
+    async def __acall__(self, request):
+        primary_token, wrote_token = self.start(request)
+        try:
+            return self.finish(await self.get_response(request))
+        finally:
+            _use_primary.reset(primary_token)
+            _wrote.reset(wrote_token)
+
+    def start(self, request):
+        pinned = request.method not in ('GET', 'HEAD', 'OPTIONS') or STICKY_COOKIE in request.COOKIES
+        return _use_primary.set(pinned), _wrote.set(False)
+
+    def finish(self, response):
+        if _wrote.get():
+            response.set_cookie(STICKY_COOKIE, '1', max_age=getattr(settings, 'REPLICA_STICKY_SECONDS', 10),
+                                httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,24 @@
+"""Settings of the woodstock_dj project, split into:
+    - base.py - the settings shared by all environments
+    - dev.py - development (DEBUG)
+    - prod.py - production (cached template loader, no DEBUG, a shared cache, secrets and hosts from the environment)
+The environment variable WOODSTOCK_SETTINGS selects the settings that this module imports ('dev' by default,
+which manage.py, wsgi.py and asgi.py use through DJANGO_SETTINGS_MODULE=woodstock_dj.settings):
+    WOODSTOCK_SETTINGS=prod gunicorn woodstock_dj.wsgi
+Pointing DJANGO_SETTINGS_MODULE at a module works as well:
+    DJANGO_SETTINGS_MODULE=woodstock_dj.settings.prod gunicorn woodstock_dj.wsgi
+"""
+
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+
+WOODSTOCK_SETTINGS = os.environ.get('WOODSTOCK_SETTINGS', 'dev')
+
+if WOODSTOCK_SETTINGS == 'dev':
+    from .dev import *  # noqa: F401,F403
+elif WOODSTOCK_SETTINGS == 'prod':
+    from .prod import *  # noqa: F401,F403
+else:
+    raise ImproperlyConfigured(f"WOODSTOCK_SETTINGS must be 'dev' or 'prod', not {WOODSTOCK_SETTINGS!r}")
@@ -0,0 +1,227 @@
+"""
+Django settings for woodstock_dj project - the settings shared by development (dev.py) and production (prod.py).
+
+Generated by 'django-admin startproject' using Django 2.1.3
+(as woodstock_dj/settings.py, later split into the woodstock_dj/settings package).
+
+For more information on this file, see
+https://docs.djangoproject.com/en/2.1/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/2.1/ref/settings/
+"""
+
+import os
+
+# Build paths inside the project like this: os.path.join(BASE_DIR, ...)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# Quick-start development settings - unsuitable for production
+# See https://docs.djangoproject.com/en/2.1/howto/deployment/checklist/
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = ')58ncork0zs@2!ed7gd#ctva9-4yx$4$!pt1salshmdf=1^h(x'
+
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = True
+
+ALLOWED_HOSTS = []
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'music.apps.MusicConfig',
+]
+
+# InstrumentationMiddleware comes first, so that its total includes the other middleware
+MIDDLEWARE = [
+    'woodstock_dj.instrumentation.InstrumentationMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'woodstock_dj.routers.ReadYourWritesMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'woodstock_dj.urls'
+
+# The Django template backend, with the render times reported by woodstock_dj/instrumentation.py
+TEMPLATES = [
+    {
+        'BACKEND': 'woodstock_dj.instrumentation.InstrumentedDjangoTemplates',
+        'DIRS': [os.path.join(BASE_DIR, 'templates')]
+        ,
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'woodstock_dj.wsgi.application'
+
+ASGI_APPLICATION = 'woodstock_dj.asgi.application'
+
+# Serve the read-only pages of the music app with the async views in music/async_views.py
+# (set by woodstock_dj/asgi.py; under WSGI, the sync views are faster)
+ASYNC_VIEWS = os.environ.get('WOODSTOCK_ASYNC_VIEWS') == '1'
+
+
+# Database
+# https://docs.djangoproject.com/en/2.1/ref/settings/#databases
+
+# Connections are persistent (reused by the requests of a worker for up to CONN_MAX_AGE seconds),
+# and each new SQLite connection is tuned with PRAGMAs (WAL etc.), see woodstock_dj/database.py.
+# OPTIONS['timeout'] is how long (in seconds) a connection waits for a lock held by another one
+# before failing with 'database is locked' (sqlite3.connect() sets SQLite's busy timeout from it)
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {
+            'timeout': 5,
+        },
+    }
+}
+
+# Read replicas: aliases of DATABASES entries that serve the reads of the music app (see woodstock_dj/routers.py).
+# A local stand-in replica (a copy of db.sqlite3, updated by manage.py sync_replicas) is enabled
+# by setting the environment variable WOODSTOCK_SQLITE_REPLICA=1
+
+DATABASE_REPLICAS = []
+
+if os.environ.get('WOODSTOCK_SQLITE_REPLICA'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.replica.sqlite3'),
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {
+            'timeout': 5,
+        },
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    }
+    DATABASE_REPLICAS.append('replica')
+
+DATABASE_ROUTERS = ['woodstock_dj.routers.ReadReplicaRouter']
+
+# How long (in seconds) the reads of a client that has written something keep going to the primary
+REPLICA_STICKY_SECONDS = 10
+
+# The PRAGMAs applied to each new SQLite connection default to DEFAULT_SQLITE_PRAGMAS in woodstock_dj/database.py;
+# to change them, set SQLITE_PRAGMAS here (a dictionary of PRAGMA name: value)
+
+
+# Request instrumentation (see woodstock_dj/instrumentation.py): the requests and the SQL queries slower than
+# these thresholds (in ms) are logged to the 'woodstock.performance' logger, and the percentiles per route
+# are computed over the last TIMING_WINDOW requests of each route, published to the cache every TIMING_PUBLISH_SECONDS
+
+SLOW_REQUEST_MS = 500
+SLOW_QUERY_MS = 100
+TIMING_WINDOW = 1000
+TIMING_PUBLISH_SECONDS = 10
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'woodstock.performance': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.1/topics/cache/
+# Local-memory cache for development: it is per process, so the page and fragment versions
+# (music/pagecache.py, music/fragments.py) are not shared between processes; production uses a shared cache
+# (settings/prod.py)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'woodstock',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+}
+
+
+# Password validation
+# https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/2.1/topics/i18n/
+
+LANGUAGE_CODE = 'en-us'
+
+TIME_ZONE = 'Europe/Belgrade'
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/2.1/howto/static-files/
+
+STATIC_URL = '/static/'
+
+# The static files are built (hashed names, .gz/.br variants, resized images) into STATIC_ROOT
+# by 'manage.py build_static', see music/assets.py
+STATIC_ROOT = os.path.join(BASE_DIR, 'static_build')
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'music.assets.AssetStorage',
+    },
+}
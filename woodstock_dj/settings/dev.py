@@ -0,0 +1,9 @@
+"""Development settings: DEBUG.
+Templates go through Django's default loaders, i.e. the cached loader, whose cache the development server
+clears whenever a template changes (so changes are picked up without a restart).
+"""
+
+from .base import *  # noqa: F401,F403
+
+
+DEBUG = True
@@ -0,0 +1,59 @@
+"""Production settings:
+    WOODSTOCK_SETTINGS=prod  (or DJANGO_SETTINGS_MODULE=woodstock_dj.settings.prod)
+Templates go through the cached loader: each one is read and compiled once per process and then kept in memory
+(base.html, performer-list.html etc. are otherwise re-read from disk and re-parsed on every render;
+see 'manage.py template_benchmark' for the difference). Template changes therefore need a restart.
+The cache is shared by all the server processes: the page and fragment caches (music/pagecache.py,
+music/fragments.py) keep their version counters in it, so with a per-process cache every worker would keep
+serving its own stale pages after another worker has handled a write. By default, it is a file-based cache
+in a directory of the server, which needs no other service (its incr() is not atomic across processes,
+so two concurrent bumps of a version may count as one - the version still changes, which is what invalidates).
+With several servers, or for faster cache calls, use Redis instead (requires the redis package).
+The secret key, the allowed hosts and the cache come from the environment:
+    WOODSTOCK_SECRET_KEY=<secret key>
+    WOODSTOCK_ALLOWED_HOSTS=<host>[,<host>...]
+    WOODSTOCK_CACHE_DIR=<directory>  (the file-based cache; default: <project>/cache)
+    WOODSTOCK_REDIS_URL=redis://<host>:<port>/<db>  (Redis instead of the file-based cache)
+"""
+
+import copy
+import os
+
+from .base import *  # noqa: F401,F403
+from .base import TEMPLATES
+
+
+DEBUG = False
+
+SECRET_KEY = os.environ.get('WOODSTOCK_SECRET_KEY', SECRET_KEY)  # noqa: F405
+
+ALLOWED_HOSTS = [host for host in os.environ.get('WOODSTOCK_ALLOWED_HOSTS', 'localhost').split(',') if host]
+
+# A copy, so that base.TEMPLATES (imported by the other settings modules too) is left as it is
+TEMPLATES = copy.deepcopy(TEMPLATES)
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+
+if os.environ.get('WOODSTOCK_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['WOODSTOCK_REDIS_URL'],
+            'KEY_PREFIX': 'woodstock',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('WOODSTOCK_CACHE_DIR', os.path.join(BASE_DIR, 'cache')),  # noqa: F405
+            'OPTIONS': {
+                'MAX_ENTRIES': 10000,
+            },
+        }
+    }
@@ -19,7 +19,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.views.generic import RedirectView
 
-from music import views
+from music import assets, views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -39,4 +39,5 @@ urlpatterns += [
     path('', RedirectView.as_view(url='music/'))
 ]
 
-urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
+# Only with DEBUG = True; serves the built static files (if any) with their .br/.gz variants and caching headers
+urlpatterns += static(settings.STATIC_URL, view=assets.serve, document_root=settings.STATIC_ROOT)